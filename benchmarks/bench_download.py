@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+# time downloading subtitles for a batch of titles from a mock subliminal provider (see mockprovider.py),
+# which simulates a provider's session setup and query delays:
+#   per_title:  each title downloaded on its own (so with its own provider pool, as cleanvid does for one title)
+#   batch:      all of the titles through one provider pool (as cleanvid-batch does)
+#   batch_warm: the batch again, with the subtitles found before already on disk and the titles that had
+#               none remembered in the --subs-cache (so nothing is queried)
+#
+#   python3 benchmarks/bench_download.py [--titles 20] [--missing 0.25] [--init-delay 0.5] [--query-delay 0.1]
+#                                        [--json results.json] [--compare baseline.json]
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+
+from benchutil import CompareResults, PrintComparison, SaveResults, TimeIt
+
+from subliminal import provider_manager
+
+from cleanvid.subsdownloader import SUBTITLE_CACHE_NOT_FOUND_FILE, SubtitleDownloader
+from mockprovider import MOCK_PROVIDER_ENTRY_POINT, MOCK_PROVIDER_NAME, MockProvider
+
+
+######## MakeTitles ###########################################################
+# empty video files named as a season's episodes (subliminal only goes by the name), missing of which have no subtitles
+def MakeTitles(titlesDir, count, missing):
+    result = []
+    os.makedirs(titlesDir, exist_ok=True)
+    for idx in range(1, count + 1):
+        name = 'Show.nosubs' if idx <= int(count * missing) else 'Show'
+        fileSpec = os.path.join(titlesDir, f"{name}.S01E{idx:02d}.720p.mkv")
+        open(fileSpec, 'w').close()
+        result.append(fileSpec)
+    return result
+
+
+######## ClearDownloads #######################################################
+def ClearDownloads(titlesDir, cacheDir=None):
+    for fileSpec in glob.glob(os.path.join(titlesDir, '*.srt')):
+        os.remove(fileSpec)
+    if cacheDir and os.path.isfile(notFoundFileSpec := os.path.join(cacheDir, SUBTITLE_CACHE_NOT_FOUND_FILE)):
+        os.remove(notFoundFileSpec)
+
+
+######## TimeCase #############################################################
+def TimeCase(name, func, titles, repeat, setup):
+    def _setup():
+        setup()
+        MockProvider.ResetCounts()
+
+    case = {'case': name}
+    case['download_seconds'], downloaded = TimeIt(lambda x: func(), repeat, setup=_setup)
+    case['downloaded'] = len([x for x in downloaded.values() if x])
+    case['titles'] = len(titles)
+    case.update({f"provider_{k}": v for k, v in sorted(MockProvider.calls.items())})
+    return case
+
+
+#################################################################################
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--titles', type=int, default=20, help='number of titles')
+    parser.add_argument('--missing', type=float, default=0.25, help='fraction of titles with no subtitles')
+    parser.add_argument('--init-delay', type=float, default=0.5, help='seconds for the provider to start a session')
+    parser.add_argument('--query-delay', type=float, default=0.1, help='seconds for each provider query/download')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this JSON file', default=None)
+    parser.add_argument('--compare', help='compare results against this baseline JSON file', default=None)
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='slowdown (vs. --compare) reported as a regression'
+    )
+    args = parser.parse_args()
+
+    provider_manager.register(MOCK_PROVIDER_ENTRY_POINT)
+    MockProvider.initializeDelay = args.init_delay
+    MockProvider.queryDelay = args.query_delay
+
+    cases = []
+    with tempfile.TemporaryDirectory() as workDir:
+        titlesDir = os.path.join(workDir, 'titles')
+        cacheDir = os.path.join(workDir, 'cache')
+        titles = MakeTitles(titlesDir, args.titles, args.missing)
+        uncached = SubtitleDownloader(cacheDir, notFoundHours=0, providers=[MOCK_PROVIDER_NAME])
+        cached = SubtitleDownloader(cacheDir, providers=[MOCK_PROVIDER_NAME])
+
+        def _warm():
+            ClearDownloads(titlesDir, cacheDir)
+            cached.DownloadMany(titles, 'eng')
+
+        for case in (
+            TimeCase(
+                'per_title',
+                lambda: {x: uncached.Download(x, 'eng') for x in titles},
+                titles,
+                args.repeat,
+                lambda: ClearDownloads(titlesDir),
+            ),
+            TimeCase(
+                'batch',
+                lambda: uncached.DownloadMany(titles, 'eng'),
+                titles,
+                args.repeat,
+                lambda: ClearDownloads(titlesDir),
+            ),
+            TimeCase('batch_warm', lambda: cached.DownloadMany(titles, 'eng'), titles, args.repeat, _warm),
+        ):
+            print(
+                f"{case['case']}: {case['download_seconds']:.3f}s ({case['downloaded']}/{case['titles']} downloaded, "
+                + f"{case.get('provider_initialize', 0)} sessions, {case.get('provider_list_subtitles', 0)} queries)",
+                file=sys.stderr,
+            )
+            cases.append(case)
+
+    results = SaveResults(args.json, 'download', cases)
+    print(json.dumps(results, indent=4))
+    if args.compare:
+        comparison, regressions = CompareResults(args.compare, results, args.threshold)
+        PrintComparison(comparison, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
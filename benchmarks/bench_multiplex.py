@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# time VidCleaner.MultiplexCleanVideo end to end over small ffmpeg-generated (lavfi) test media in:
+#   copy:      the video stream is copied, only the audio is filtered and encoded (the default)
+#   reencode:  --re-encode-audio
+#   segmented: --segment-audio (only the audio around mute regions is re-encoded)
+#   all_audio: --audio-stream-language (every one of the --audio-streams audio tracks is cleaned, in one pass)
+# the other modes clean the first audio track (copying any others)
+#
+#   python3 benchmarks/bench_multiplex.py [--seconds 60,600] [--density 0.05] [--modes copy,reencode,segmented]
+#                                         [--audio-streams 1] [--json results.json] [--compare baseline.json]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchutil import (
+    CompareResults,
+    MakeTestMedia,
+    PrintComparison,
+    SaveResults,
+    SWEARS_FILE_SPEC,
+    SyntheticSwearsMap,
+    TimeIt,
+    WriteSyntheticSrt,
+)
+
+import cleanvid.cleanvid as cv
+
+MULTIPLEX_MODES = {
+    'copy': {},
+    'reencode': {'reEncodeAudio': True},
+    'segmented': {'segmentAudio': True},
+    'all_audio': {'audioStreamIdx': None, 'audioStreamLang': 'eng'},
+}
+
+
+######## TimeCase #############################################################
+def TimeCase(workDir, vidFileSpec, seconds, density, mode, repeat, audioStreams=1):
+    swearsMap = SyntheticSwearsMap()
+    srtFileSpec = os.path.join(workDir, f"subs_{seconds}_{density}.srt")
+    if not os.path.isfile(srtFileSpec):
+        # about one cue every 2.75 seconds (see WriteSyntheticSrt), ending before the media does
+        WriteSyntheticSrt(srtFileSpec, max(1, int((seconds - 4) / 2.75)), density, list(swearsMap.keys()))
+    outFileSpec = os.path.join(workDir, f"clean_{mode}.mkv")
+
+    def _cleaner():
+        if os.path.isfile(outFileSpec):
+            os.remove(outFileSpec)
+        cleaner = cv.VidCleaner(
+            vidFileSpec,
+            srtFileSpec,
+            outFileSpec,
+            os.path.join(workDir, f"clean_{mode}.srt"),
+            SWEARS_FILE_SPEC,
+            swearsMap=swearsMap,
+            **{'audioStreamIdx': 1, **MULTIPLEX_MODES[mode]},
+        )
+        cleaner.CreateCleanSubAndMuteList()
+        return cleaner
+
+    case = {
+        'case': f"seconds={seconds},density={density},mode={mode}"
+        + (f",audio_streams={audioStreams}" if audioStreams > 1 else ''),
+        'seconds': seconds,
+        'density': density,
+        'mode': mode,
+        'audio_streams': audioStreams,
+    }
+    case['multiplex_seconds'], _ = TimeIt(lambda x: x.MultiplexCleanVideo(), repeat, setup=_cleaner)
+    case['output_bytes'] = os.path.getsize(outFileSpec) if os.path.isfile(outFileSpec) else None
+    case['realtime_factor'] = (seconds / case['multiplex_seconds']) if case['multiplex_seconds'] else None
+    return case
+
+
+######## CommaList ############################################################
+def CommaList(value, kind):
+    return [kind(x) for x in value.split(',') if x.strip()]
+
+
+#################################################################################
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', default='60,600', help='comma-separated test media durations (seconds)')
+    parser.add_argument('--density', default='0.05', help='comma-separated fractions of cues containing profanity')
+    parser.add_argument('--modes', default=','.join(MULTIPLEX_MODES.keys()), help='comma-separated modes')
+    parser.add_argument('--audio-streams', type=int, default=1, help='number of audio tracks in the test media')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this JSON file', default=None)
+    parser.add_argument('--compare', help='compare results against this baseline JSON file', default=None)
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='slowdown (vs. --compare) reported as a regression'
+    )
+    args = parser.parse_args()
+
+    cases = []
+    with tempfile.TemporaryDirectory() as workDir:
+        for seconds in CommaList(args.seconds, int):
+            vidFileSpec = MakeTestMedia(
+                os.path.join(workDir, f"test_{seconds}.mkv"), seconds, audioStreams=args.audio_streams
+            )
+            for density in CommaList(args.density, float):
+                for mode in CommaList(args.modes, str):
+                    if mode not in MULTIPLEX_MODES:
+                        raise ValueError(f'Unknown mode {mode}')
+                    case = TimeCase(workDir, vidFileSpec, seconds, density, mode, args.repeat, args.audio_streams)
+                    print(f"{case['case']}: {case['multiplex_seconds']:.3f}s", file=sys.stderr)
+                    cases.append(case)
+
+    results = SaveResults(args.json, 'multiplex', cases)
+    print(json.dumps(results, indent=4))
+    if args.compare:
+        comparison, regressions = CompareResults(args.compare, results, args.threshold)
+        PrintComparison(comparison, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# time refining mute regions (--refine-mutes) over small ffmpeg-generated (lavfi) test media of each of
+# --seconds, with synthetic subtitles about --density of which contain profanity:
+#   refine_seconds:   the whole refine stage (decoding the audio during those subtitles and analyzing it)
+#   analyze_seconds:  just the word aligner's (--aligner, see wordaligner.py) analysis of as much audio as was decoded
+# along with how much audio was decoded and how much shorter the mute regions became
+#
+#   python3 benchmarks/bench_refine.py [--seconds 600,3600] [--density 0.05] [--aligner energy] [--model <dir>]
+#                                      [--json results.json] [--compare baseline.json]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchutil import (
+    CompareResults,
+    MakeTestMedia,
+    PrintComparison,
+    SaveResults,
+    SWEARS_FILE_SPEC,
+    SyntheticSwearsMap,
+    TimeIt,
+    WriteSyntheticSrt,
+)
+
+import cleanvid.cleanvid as cv
+import cleanvid.muterefiner as mr
+from cleanvid.wordaligner import WORD_ALIGNER_DEFAULT, WORD_ALIGNERS
+
+
+######## TimeCase #############################################################
+def TimeCase(workDir, vidFileSpec, seconds, density, repeat, aligner, model):
+    np = mr.ImportNumpy()
+    swearsMap = SyntheticSwearsMap()
+    srtFileSpec = os.path.join(workDir, f"subs_{seconds}_{density}.srt")
+    # about one cue every 2.75 seconds (see WriteSyntheticSrt), ending before the media does
+    WriteSyntheticSrt(srtFileSpec, max(1, int((seconds - 4) / 2.75)), density, list(swearsMap.keys()))
+
+    def _cleaner():
+        cleaner = cv.VidCleaner(
+            vidFileSpec,
+            srtFileSpec,
+            os.path.join(workDir, 'clean.mkv'),
+            os.path.join(workDir, 'clean.srt'),
+            SWEARS_FILE_SPEC,
+            swearsMap=swearsMap,
+            refineMutes=True,
+            refineAligner=aligner,
+            refineModel=model,
+        )
+        return cleaner, cleaner.CreateCleanSub()
+
+    def _refine(setup):
+        cleaner, candidates = setup
+        stage = dict()
+        cv.RunFFSteps(cleaner.RefineMuteSteps(candidates, stage))
+        return stage
+
+    case = {'case': f"seconds={seconds},density={density}", 'seconds': seconds, 'density': density, 'aligner': aligner}
+    case['refine_seconds'], stage = TimeIt(_refine, repeat, setup=_cleaner)
+    case.update({k: v for k, v in stage.items()})
+
+    # the analysis alone, over as much (synthetic, speech-like) audio as was decoded
+    cleaner, candidates = _cleaner()
+    toRefine = [x for x in candidates if x[2]]
+    rng = np.random.default_rng(0)
+    pcmFileSpecs = []
+    for cueIdx, (start, end, fractions, text) in enumerate(toRefine):
+        samples = (end - start + 2 * mr.REFINE_CONTEXT_MILLISEC) * mr.REFINE_SAMPLE_RATE // 1000
+        # bursts of noise ("words") a few hundred milliseconds long, with quieter gaps between them
+        envelope = np.repeat(rng.random(samples // 4000 + 1) > 0.3, 4000)[:samples] * 0.9 + 0.05
+        pcmFileSpecs.append(os.path.join(workDir, f'{cueIdx}.pcm'))
+        (rng.standard_normal(samples) * 3000 * envelope).astype('<i2').tofile(pcmFileSpecs[-1])
+
+    def _analyze():
+        return cleaner.wordAligner.Align(toRefine, pcmFileSpecs, cleaner.refineMarginMillisec)
+
+    case['analyze_seconds'], _ = TimeIt(_analyze, repeat)
+    return case
+
+
+######## CommaList ############################################################
+def CommaList(value, kind):
+    return [kind(x) for x in value.split(',') if x.strip()]
+
+
+#################################################################################
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', default='600,3600', help='comma-separated test media durations (seconds)')
+    parser.add_argument('--density', default='0.05', help='comma-separated fractions of cues containing profanity')
+    parser.add_argument('--aligner', default=WORD_ALIGNER_DEFAULT, choices=list(WORD_ALIGNERS.keys()))
+    parser.add_argument('--model', help='speech recognition model (directory) for --aligner', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this JSON file', default=None)
+    parser.add_argument('--compare', help='compare results against this baseline JSON file', default=None)
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='slowdown (vs. --compare) reported as a regression'
+    )
+    args = parser.parse_args()
+
+    cases = []
+    with tempfile.TemporaryDirectory() as workDir:
+        for seconds in CommaList(args.seconds, int):
+            # the video is only a placeholder, only the audio is decoded
+            vidFileSpec = MakeTestMedia(os.path.join(workDir, f"test_{seconds}.mkv"), seconds, size='64x48', rate=1)
+            for density in CommaList(args.density, float):
+                case = TimeCase(workDir, vidFileSpec, seconds, density, args.repeat, args.aligner, args.model)
+                print(
+                    f"{case['case']}: {case['refine_seconds']:.3f}s ({case['candidates']} subtitles, "
+                    + f"{case['decoded_seconds']:.1f}s decoded, analyzed in {case['analyze_seconds']:.3f}s)",
+                    file=sys.stderr,
+                )
+                cases.append(case)
+
+    results = SaveResults(args.json, 'refine', cases)
+    print(json.dumps(results, indent=4))
+    if args.compare:
+        comparison, regressions = CompareResults(args.compare, results, args.threshold)
+        PrintComparison(comparison, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+# time each stage of subtitle scrubbing and mute-list generation over synthetic subtitles:
+#   load (profanity list), compile (matcher), parse (subtitles), match, pad, merge (mute regions),
+#   filters (ffmpeg mute filters), edl, plex (PlexAutoSkip JSON), json (--json-dump) and total
+#   (VidCleaner.CreateCleanSubAndMuteList, end to end)
+#
+#   python3 benchmarks/bench_scrub.py [--cues 100,1000,10000,100000] [--density 0.05] [--swears-sizes 400,4000]
+#                                     [--pad 0,0.5] [--json results.json] [--compare baseline.json]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchutil import (
+    CompareResults,
+    PrintComparison,
+    SaveResults,
+    SyntheticSwearsMap,
+    TimeIt,
+    WriteSwearsFile,
+    WriteSyntheticSrt,
+)
+
+import cleanvid.cleanvid as cv
+from cleanvid.srtstream import FormatSrtTime, StreamSubtitles
+from cleanvid.swearsmatcher import SwearsMatcher
+
+
+######## TimeCase #############################################################
+def TimeCase(workDir, cues, density, swearsSize, padSec, repeat):
+    swearsMap = SyntheticSwearsMap(swearsSize or None)
+    swearsFileSpec = os.path.join(workDir, f"swears_{swearsSize}.txt")
+    WriteSwearsFile(swearsFileSpec, swearsMap)
+    srtFileSpec = os.path.join(workDir, f"subs_{cues}_{density}_{swearsSize}.srt")
+    if not os.path.isfile(srtFileSpec):
+        WriteSyntheticSrt(srtFileSpec, cues, density, list(swearsMap.keys()))
+    padMillisec = round(padSec * 1000.0)
+
+    # the video is never read: its probe is primed so the JSON dump doesn't run ffprobe
+    vidFileSpec = os.path.join(workDir, 'dummy.mkv')
+    if not os.path.isfile(vidFileSpec):
+        open(vidFileSpec, 'w').close()
+    cv._mediaProbeCache[cv.ProbeCacheKey(vidFileSpec)] = cv.MediaProbe(vidFileSpec, {'format': {}, 'streams': []})
+
+    case = {
+        'case': f"cues={cues},density={density},swears={swearsSize},pad={padSec}",
+        'cues': cues,
+        'density': density,
+        'swears': swearsSize,
+        'swears_entries': len(list(swearsMap.keys())),
+        'pad': padSec,
+    }
+
+    case['load_seconds'], _ = TimeIt(lambda: cv.LoadSwearsMap(swearsFileSpec), repeat)
+    case['compile_seconds'], matcher = TimeIt(lambda: SwearsMatcher(swearsMap), repeat)
+
+    def _parse():
+        with cv.OpenSubtitleText(srtFileSpec) as f:
+            return list(StreamSubtitles(f))
+
+    case['parse_seconds'], subs = TimeIt(_parse, repeat)
+    case['match_seconds'], scrubbed = TimeIt(lambda: list(cv.ScrubSubtitles(subs, matcher)), repeat)
+    case['pad_seconds'], padded = TimeIt(lambda: list(cv.PadSubtitles(scrubbed, padMillisec)), repeat)
+
+    intervals = [
+        ((max(sub.start - padMillisec, 0), sub.end + padMillisec) if subScrubbed else (sub.start, sub.end))
+        for sub, newText, subScrubbed, subIncluded in padded
+        if subIncluded
+    ]
+    case['merge_seconds'], muteIntervals = TimeIt(lambda: cv.MergeIntervals(intervals), repeat)
+    case['scrubbed_cues'] = sum([1 for x in scrubbed if x[2]])
+    case['mute_intervals'] = len(muteIntervals)
+
+    finalMillisec = subs[-1].end + 2000 if subs else None
+    case['filters_seconds'], _ = TimeIt(
+        lambda: cv.MuteFilters(muteIntervals, finalMillisec, cv.MUTE_FILTER_AFADE), repeat
+    )
+    case['filters_volume_seconds'], _ = TimeIt(
+        lambda: cv.MuteFilters(muteIntervals, finalMillisec, cv.MUTE_FILTER_VOLUME), repeat
+    )
+
+    def _cleaner():
+        cleaner = cv.VidCleaner(
+            vidFileSpec,
+            srtFileSpec,
+            None,
+            os.path.join(workDir, 'clean.srt'),
+            swearsFileSpec,
+            swearsPadSec=padSec,
+            edl=True,
+            jsonDump=True,
+            plexAutoSkipJson=os.path.join(workDir, 'plex.json'),
+            plexAutoSkipId='bench',
+            swearsMap=swearsMap,
+        )
+        cleaner.muteIntervals = muteIntervals
+        cleaner.jsonDumpList = [
+            {'old': sub.text, 'new': newText, 'start': FormatSrtTime(sub.start), 'end': FormatSrtTime(sub.end)}
+            for sub, newText, subScrubbed in scrubbed
+            if subScrubbed
+        ]
+        cleaner.edlFileSpec = os.path.join(workDir, 'clean.edl')
+        cleaner.jsonFileSpec = os.path.join(workDir, 'clean.json')
+        return cleaner
+
+    case['edl_seconds'], _ = TimeIt(lambda x: x.WriteEdl(), repeat, setup=_cleaner)
+    case['plex_seconds'], _ = TimeIt(lambda x: x.WritePlexAutoSkipJson(), repeat, setup=_cleaner)
+    case['json_seconds'], _ = TimeIt(lambda x: x.WriteJsonDump(), repeat, setup=_cleaner)
+
+    def _freshCleaner():
+        cleaner = _cleaner()
+        cleaner.muteIntervals = []
+        cleaner.jsonDumpList = []
+        return cleaner
+
+    case['total_seconds'], _ = TimeIt(lambda x: x.CreateCleanSubAndMuteList(), repeat, setup=_freshCleaner)
+
+    return case
+
+
+######## CommaList ############################################################
+def CommaList(value, kind):
+    return [kind(x) for x in value.split(',') if x.strip()]
+
+
+#################################################################################
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cues', default='100,1000,10000,100000', help='comma-separated subtitle cue counts')
+    parser.add_argument('--density', default='0.05', help='comma-separated fractions of cues containing profanity')
+    parser.add_argument(
+        '--swears-sizes',
+        dest='swearsSizes',
+        default='0,4000',
+        help='comma-separated profanity list sizes (0 for the stock list)',
+    )
+    parser.add_argument('--pad', default='0,0.5', help='comma-separated pad settings (seconds)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this JSON file', default=None)
+    parser.add_argument('--compare', help='compare results against this baseline JSON file', default=None)
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='slowdown (vs. --compare) reported as a regression'
+    )
+    args = parser.parse_args()
+
+    cases = []
+    with tempfile.TemporaryDirectory() as workDir:
+        for cues in CommaList(args.cues, int):
+            for density in CommaList(args.density, float):
+                for swearsSize in CommaList(args.swearsSizes, int):
+                    for padSec in CommaList(args.pad, float):
+                        case = TimeCase(workDir, cues, density, swearsSize, padSec, args.repeat)
+                        print(f"{case['case']}: {case['total_seconds']:.6f}s", file=sys.stderr)
+                        cases.append(case)
+
+    results = SaveResults(args.json, 'scrub', cases)
+    print(json.dumps(results, indent=4))
+    if args.compare:
+        comparison, regressions = CompareResults(args.compare, results, args.threshold)
+        PrintComparison(comparison, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
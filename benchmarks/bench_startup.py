@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# time how long cleanvid takes to start (in a fresh interpreter, as the command line tools are run) for:
+#   import:            "import cleanvid"
+#   help:              cleanvid --help
+#   audio_stream_list: cleanvid --audio-stream-list (one ffprobe)
+#   edl:               cleanvid --edl with local subtitles (no ffmpeg, and nothing to download)
+#   import_batch:      "import cleanvid.batch"
+# and which of the slower optional modules (subliminal, babelfish, chardet, numpy, asyncio, ...) each of them loaded
+#
+#   python3 benchmarks/bench_startup.py [--cases import,help,...] [--repeat 10]
+#                                       [--json results.json] [--compare baseline.json]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchutil import (
+    CompareResults,
+    MakeTestMedia,
+    PrintComparison,
+    SaveResults,
+    SyntheticSwearsMap,
+    TimeIt,
+    WriteSyntheticSrt,
+)
+
+SRC_DIR = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+
+# modules whose import is noticeably slow, and which only some invocations need
+HEAVY_MODULES = (
+    'subliminal',
+    'babelfish',
+    'chardet',
+    'numpy',
+    'vosk',
+    'asyncio',
+    'concurrent.futures',
+    'cProfile',
+    'tracemalloc',
+)
+
+# run in the fresh interpreter: the case's code, then (at exit) write which of HEAVY_MODULES were loaded
+RUNNER_CODE = '''
+import atexit, json, os, sys
+def _loaded():
+    with open(os.environ["BENCH_STARTUP_MODULES"], "w") as f:
+        json.dump([x for x in json.loads(os.environ["BENCH_STARTUP_HEAVY"]) if x in sys.modules], f)
+atexit.register(_loaded)
+{code}
+'''
+
+RUN_CLEANVID_CODE = 'sys.argv[0] = "cleanvid"\nfrom cleanvid import RunCleanvid\nRunCleanvid()'
+
+STARTUP_CASES = {
+    'import': ('import cleanvid', []),
+    'help': (RUN_CLEANVID_CODE, ['--help']),
+    'audio_stream_list': (RUN_CLEANVID_CODE, ['-i', '{video}', '--audio-stream-list']),
+    'edl': (RUN_CLEANVID_CODE, ['-i', '{video}', '-s', '{subs}', '--subs-output', '{subsOut}', '--edl']),
+    'import_batch': ('import cleanvid.batch', []),
+}
+
+
+######## TimeCase #############################################################
+def TimeCase(workDir, name, media, repeat):
+    code, argv = STARTUP_CASES[name]
+    modulesFileSpec = os.path.join(workDir, f"modules_{name}.json")
+    cmd = [sys.executable, '-c', RUNNER_CODE.format(code=code)] + [x.format(**media) for x in argv]
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([SRC_DIR] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    env['BENCH_STARTUP_MODULES'] = modulesFileSpec
+    env['BENCH_STARTUP_HEAVY'] = json.dumps(HEAVY_MODULES)
+
+    def _run():
+        result = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            print(cmd[3:])
+            print(result.stderr)
+            raise ValueError(f'Startup case {name} failed')
+
+    case = {'case': name}
+    case['startup_seconds'], _ = TimeIt(_run, repeat)
+    with open(modulesFileSpec, 'r') as f:
+        case['heavy_modules'] = json.load(f)
+    return case
+
+
+######## CommaList ############################################################
+def CommaList(value, kind):
+    return [kind(x) for x in value.split(',') if x.strip()]
+
+
+#################################################################################
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cases', default=','.join(STARTUP_CASES.keys()), help='comma-separated cases')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', help='write results to this JSON file', default=None)
+    parser.add_argument('--compare', help='compare results against this baseline JSON file', default=None)
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='slowdown (vs. --compare) reported as a regression'
+    )
+    args = parser.parse_args()
+
+    cases = []
+    with tempfile.TemporaryDirectory() as workDir:
+        media = {
+            'video': os.path.join(workDir, 'test.mkv'),
+            'subs': os.path.join(workDir, 'test.srt'),
+            'subsOut': os.path.join(workDir, 'test_clean.srt'),
+        }
+        names = CommaList(args.cases, str)
+        for name in names:
+            if name not in STARTUP_CASES:
+                raise ValueError(f'Unknown case {name}')
+        if any('{video}' in x for name in names for x in STARTUP_CASES[name][1]):
+            MakeTestMedia(media['video'], 10)
+            WriteSyntheticSrt(media['subs'], 3, 0.5, list(SyntheticSwearsMap().keys()))
+        for name in names:
+            case = TimeCase(workDir, name, media, args.repeat)
+            print(f"{case['case']}: {case['startup_seconds']:.3f}s {case['heavy_modules']}", file=sys.stderr)
+            cases.append(case)
+
+    results = SaveResults(args.json, 'startup', cases)
+    print(json.dumps(results, indent=4))
+    if args.compare:
+        comparison, regressions = CompareResults(args.compare, results, args.threshold)
+        PrintComparison(comparison, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
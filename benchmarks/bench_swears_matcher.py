@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# compare the profanity matcher against the original alternation regex
+#
+#   python3 benchmarks/bench_swears_matcher.py [--lines 200000] [--density 0.05] [--swears <profanity file>]
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+
+from cleanvid.caselessdictionary import CaselessDictionary
+from cleanvid.swearsmatcher import SwearsMatcher
+
+FILLER_WORDS = (
+    'the quick brown fox jumps over lazy dog and then we went to the store because it was '
+    'raining outside so nobody wanted to stay home all day long asking assistance class grass'
+).split()
+
+
+######## LoadSwears ###########################################################
+def LoadSwears(swearsFileSpec):
+    swearsMap = CaselessDictionary({})
+    with open(swearsFileSpec) as f:
+        for line in [x.rstrip('\n') for x in f]:
+            lineMap = line.split("|")
+            swearsMap[lineMap[0]] = lineMap[1] if len(lineMap) > 1 else "*****"
+    return swearsMap
+
+
+######## SyntheticLines #######################################################
+def SyntheticLines(count, density, swears, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(3, 12))]
+        if rng.random() < density:
+            words.insert(
+                rng.randint(0, len(words)), rng.choice(swears).upper() if rng.random() < 0.2 else rng.choice(swears)
+            )
+        lines.append(' '.join(words))
+    return lines
+
+
+######## TimeIt ###############################################################
+def TimeIt(func, lines, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        startTime = time.perf_counter()
+        result = [func(line) for line in lines]
+        elapsed = time.perf_counter() - startTime
+        best = elapsed if (best is None) or (elapsed < best) else best
+    return best, result
+
+
+#################################################################################
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--swears',
+        default=os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src', 'cleanvid', 'swears.txt'),
+    )
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--density', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this JSON file', default=None)
+    args = parser.parse_args()
+
+    swearsMap = LoadSwears(args.swears)
+    lines = SyntheticLines(args.lines, args.density, list(swearsMap.keys()))
+
+    startTime = time.perf_counter()
+    legacy = re.compile(r'\b(' + '|'.join(swearsMap.keys()) + r')\b', re.IGNORECASE)
+    legacyCompile = time.perf_counter() - startTime
+    startTime = time.perf_counter()
+    matcher = SwearsMatcher(swearsMap)
+    matcherCompile = time.perf_counter() - startTime
+
+    legacyTime, legacyResult = TimeIt(lambda x: legacy.sub(lambda m: swearsMap[m.group()], x), lines, args.repeat)
+    matcherTime, matcherResult = TimeIt(matcher.Sub, lines, args.repeat)
+
+    results = {
+        'lines': args.lines,
+        'density': args.density,
+        'swears': len(list(swearsMap.keys())),
+        'legacy': {'compile_seconds': legacyCompile, 'scan_seconds': legacyTime},
+        'matcher': {'compile_seconds': matcherCompile, 'scan_seconds': matcherTime},
+        'speedup': legacyTime / matcherTime if matcherTime else None,
+        'scrubbed_lines': {
+            'legacy': sum([1 for x, y in zip(lines, legacyResult) if x != y]),
+            'matcher': sum([1 for x, y in zip(lines, matcherResult) if x != y]),
+        },
+        'differing_lines': sum([1 for x, y in zip(legacyResult, matcherResult) if x != y]),
+    }
+    print(json.dumps(results, indent=4))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
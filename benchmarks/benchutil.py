@@ -0,0 +1,191 @@
+# shared helpers for the benchmarks: synthetic inputs, machine information and result comparison
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+
+from cleanvid.caselessdictionary import CaselessDictionary
+from cleanvid.cleanvid import LoadSwearsMap
+
+SWEARS_FILE_SPEC = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src', 'cleanvid', 'swears.txt')
+
+FILLER_WORDS = (
+    'the quick brown fox jumps over lazy dog and then we went to the store because it was '
+    'raining outside so nobody wanted to stay home all day long asking assistance class grass'
+).split()
+
+
+######## SyntheticSwearsMap ###################################################
+# the stock profanity list, padded out to size entries with made-up words (or truncated to size)
+def SyntheticSwearsMap(size=None, seed=0):
+    stock = LoadSwearsMap(SWEARS_FILE_SPEC)
+    items = list(stock.items())
+    if size is not None:
+        rng = random.Random(seed)
+        items = items[:size]
+        while len(items) < size:
+            word = ''.join([rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(5, 10))])
+            items.append((f"zz{word}", "*****"))
+    return CaselessDictionary(items)
+
+
+######## WriteSwearsFile ######################################################
+def WriteSwearsFile(fileSpec, swearsMap):
+    with open(fileSpec, 'w') as f:
+        for key, val in swearsMap.items():
+            f.write(f"{key}|{val}\n")
+
+
+######## SrtTimestamp #########################################################
+def SrtTimestamp(millisec):
+    hours, millisec = divmod(millisec, 3600000)
+    minutes, millisec = divmod(millisec, 60000)
+    seconds, millisec = divmod(millisec, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millisec:03d}"
+
+
+######## WriteSyntheticSrt ####################################################
+# write an .srt of count cues, about density of which contain a word from swears. cues are
+# 1-3 seconds long with 0-1.5 second gaps (so small pads reach some neighbors and not others),
+# with one or two lines of text. returns the duration (in seconds) the subtitles span
+def WriteSyntheticSrt(fileSpec, count, density, swears, seed=0):
+    rng = random.Random(seed)
+    millisec = 1000
+    with open(fileSpec, 'w', encoding='utf-8', newline='\n') as f:
+        for idx in range(1, count + 1):
+            start = millisec
+            end = start + rng.randint(1000, 3000)
+            millisec = end + rng.randint(0, 1500)
+            lines = []
+            for _ in range(rng.randint(1, 2)):
+                lines.append([rng.choice(FILLER_WORDS) for _ in range(rng.randint(3, 8))])
+            if rng.random() < density:
+                words = rng.choice(lines)
+                swear = rng.choice(swears)
+                words.insert(rng.randint(0, len(words)), swear.upper() if rng.random() < 0.2 else swear)
+            text = '\n'.join([' '.join(x) for x in lines])
+            f.write(f"{idx}\n{SrtTimestamp(start)} --> {SrtTimestamp(end)}\n{text}\n\n")
+    return millisec / 1000.0
+
+
+######## MakeTestMedia ########################################################
+# generate a test pattern video with sine wave audio track(s) (if more than one, each tagged as English)
+# using ffmpeg's lavfi sources
+def MakeTestMedia(fileSpec, seconds, size='320x240', rate=25, audioStreams=1):
+    ffmpegCmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-nostdin',
+        '-y',
+        '-f',
+        'lavfi',
+        '-i',
+        f"testsrc=size={size}:rate={rate}",
+    ]
+    for idx in range(audioStreams):
+        ffmpegCmd += ['-f', 'lavfi', '-i', f'sine=frequency={440 * (idx + 1)}:sample_rate=48000']
+    if audioStreams > 1:
+        ffmpegCmd += ['-map', '0:v'] + [x for idx in range(audioStreams) for x in ('-map', f'{idx + 1}:a')]
+        ffmpegCmd += ['-metadata:s:a', 'language=eng']
+    ffmpegCmd += [
+        '-t',
+        str(seconds),
+        '-c:v',
+        'libx264',
+        '-preset',
+        'ultrafast',
+        '-g',
+        str(rate * 2),
+        '-c:a',
+        'aac',
+        '-ac',
+        '2',
+        fileSpec,
+    ]
+    ffmpegResult = subprocess.run(ffmpegCmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if (ffmpegResult.returncode != 0) or (not os.path.isfile(fileSpec)):
+        print(ffmpegCmd)
+        print(ffmpegResult.stderr)
+        raise ValueError(f'Could not generate test media {fileSpec}')
+    return fileSpec
+
+
+######## TimeIt ###############################################################
+# best of repeat calls of func (with setup's result as its argument, if specified), and func's last result
+def TimeIt(func, repeat=3, setup=None):
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        arg = setup() if setup else None
+        startTime = time.perf_counter()
+        result = func(arg) if setup else func()
+        elapsed = time.perf_counter() - startTime
+        best = elapsed if (best is None) or (elapsed < best) else best
+    return best, result
+
+
+######## MachineInfo ##########################################################
+def MachineInfo():
+    try:
+        gitCommit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.realpath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        gitCommit = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'commit': gitCommit or None,
+    }
+
+
+######## SaveResults ##########################################################
+def SaveResults(fileSpec, name, cases):
+    results = {
+        'benchmark': name,
+        'machine': MachineInfo(),
+        'cases': cases,
+    }
+    if fileSpec:
+        with open(fileSpec, 'w') as f:
+            json.dump(results, f, indent=4)
+    return results
+
+
+######## CompareResults #######################################################
+# compare the timings ("*_seconds" fields) of each case (matched by its "case" name) against a
+# baseline saved with SaveResults. returns a list of (case, field, baseline, current, ratio), and
+# the subset of it which are more than threshold (e.g., 0.1 for 10%) slower than the baseline
+def CompareResults(baselineFileSpec, results, threshold=0.1):
+    with open(baselineFileSpec, 'r') as f:
+        baseline = json.load(f)
+    baselineCases = {x['case']: x for x in baseline.get('cases', [])}
+    comparison = []
+    for case in results['cases']:
+        if (baselineCase := baselineCases.get(case['case'], None)) is None:
+            continue
+        for field, current in case.items():
+            if field.endswith('_seconds') and (previous := baselineCase.get(field, None)):
+                comparison.append((case['case'], field, previous, current, current / previous))
+    regressions = [x for x in comparison if x[4] > (1.0 + threshold)]
+    return comparison, regressions
+
+
+######## PrintComparison ######################################################
+def PrintComparison(comparison, regressions):
+    for case, field, previous, current, ratio in comparison:
+        flag = ' REGRESSION' if (case, field, previous, current, ratio) in regressions else ''
+        print(f"{case} {field}: {previous:.6f}s -> {current:.6f}s ({ratio:.2f}x){flag}", file=sys.stderr)
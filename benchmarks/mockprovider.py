@@ -0,0 +1,74 @@
+# a subliminal provider answering from memory after simulated network delays, to measure (or try out)
+# subtitle downloading without a network: register it and name it in the providers to use, e.g.
+#
+#   from subliminal import provider_manager
+#   provider_manager.register(MOCK_PROVIDER_ENTRY_POINT)
+#   SubtitleDownloader(providers=[MOCK_PROVIDER_NAME])   # or cleanvid --subs-providers mock
+#
+# titles whose names contain "nosubs" have no subtitles
+
+import threading
+import time
+
+from babelfish import Language
+from subliminal import Episode, Movie, Provider, Subtitle
+
+MOCK_PROVIDER_NAME = 'mock'
+MOCK_PROVIDER_ENTRY_POINT = f'{MOCK_PROVIDER_NAME} = mockprovider:MockProvider'
+MOCK_SUBTITLE_CONTENT = (
+    b'1\n00:00:01,000 --> 00:00:02,500\nwhat the hell\n\n2\n00:00:03,000 --> 00:00:04,000\nhello\n\n'
+)
+
+
+######## MockSubtitle #########################################################
+class MockSubtitle(Subtitle):
+    provider_name = MOCK_PROVIDER_NAME
+
+    def get_matches(self, video):
+        return set()
+
+
+#################################################################################
+class MockProvider(Provider):
+    languages = {Language('eng')}
+    video_types = (Episode, Movie)
+    subtitle_class = MockSubtitle
+
+    # seconds taken to establish a session, and by each query and download
+    initializeDelay = 0.5
+    queryDelay = 0.1
+
+    # how many times each of initialize/list_subtitles/download_subtitle was called (by every instance)
+    calls = dict()
+    callsLock = threading.Lock()
+
+    ######## Count ################################################################
+    @classmethod
+    def Count(cls, call):
+        with cls.callsLock:
+            cls.calls[call] = cls.calls.get(call, 0) + 1
+
+    ######## ResetCounts ##########################################################
+    @classmethod
+    def ResetCounts(cls):
+        with cls.callsLock:
+            cls.calls = dict()
+
+    def initialize(self):
+        self.Count('initialize')
+        time.sleep(self.initializeDelay)
+
+    def terminate(self):
+        pass
+
+    def list_subtitles(self, video, languages):
+        self.Count('list_subtitles')
+        time.sleep(self.queryDelay)
+        if 'nosubs' in video.name:
+            return []
+        return [MockSubtitle(language, f"{video.name}.{language}") for language in languages]
+
+    def download_subtitle(self, subtitle):
+        self.Count('download_subtitle')
+        time.sleep(self.queryDelay)
+        subtitle.content = MOCK_SUBTITLE_CONTENT
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+try:
+    from cleanvid.cleanvid import (
+        AddCleaningArguments,
+        CleanTitle,
+        ExtraOutputs,
+        GetMediaProbe,
+        GetSubtitles,
+        LoadSwearsMap,
+        SplitLanguageIfForced,
+        TitleSpoolFileSpec,
+        TitleStageReport,
+        TitleStageTimer,
+        TitleSubtitleDownloader,
+    )
+    from cleanvid.ffrunner import PrintProgress
+except ImportError:
+    from cleanvid import (
+        AddCleaningArguments,
+        CleanTitle,
+        ExtraOutputs,
+        GetMediaProbe,
+        GetSubtitles,
+        LoadSwearsMap,
+        SplitLanguageIfForced,
+        TitleSpoolFileSpec,
+        TitleStageReport,
+        TitleStageTimer,
+        TitleSubtitleDownloader,
+    )
+    from ffrunner import PrintProgress
+
+VIDEO_DEFAULT_EXTENSIONS = 'avi,m4v,mkv,mov,mp4,mpg,mpeg,ts,webm,wmv'
+BATCH_DEFAULT_STATUS_FILE = 'cleanvid_batch_status.json'
+# x264 stops scaling well past a handful of threads, so an encode job doesn't get more than this by default
+ENCODE_THREADS_PER_JOB_MAX = 8
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# the swears map for this worker process, loaded once by the parent and handed to each worker when it starts
+_workerSwearsMap = None
+
+
+######## FindBatchItems #######################################################
+# build the list of titles to process from directories/files and/or a manifest. each manifest
+# line is "input video[|output video[|input srt]]" (the same "|" convention as the swears file)
+def FindBatchItems(inputs, manifestFileSpec=None, extensions=VIDEO_DEFAULT_EXTENSIONS, outputDir=None):
+    items = []
+    exts = tuple(['.' + x.strip().lower().lstrip('.') for x in extensions.split(',') if x.strip()])
+
+    def _outputFor(inFile, root=None):
+        inFileParts = os.path.splitext(inFile)
+        if outputDir:
+            relParts = os.path.splitext(os.path.relpath(inFile, root) if root else os.path.basename(inFile))
+            return os.path.join(outputDir, relParts[0] + "_clean" + relParts[1])
+        else:
+            return inFileParts[0] + "_clean" + inFileParts[1]
+
+    for inputSpec in inputs if inputs else []:
+        if os.path.isdir(inputSpec):
+            for root, dirs, files in os.walk(inputSpec):
+                dirs.sort()
+                for fileName in sorted(files):
+                    fileParts = os.path.splitext(fileName)
+                    # don't pick up our own output from a previous run
+                    if (fileParts[1].lower() in exts) and (not fileParts[0].endswith('_clean')):
+                        inFile = os.path.join(root, fileName)
+                        items.append({'input': inFile, 'output': _outputFor(inFile, inputSpec), 'subs': None})
+        elif os.path.isfile(inputSpec):
+            items.append({'input': inputSpec, 'output': _outputFor(inputSpec), 'subs': None})
+        else:
+            print(f"{inputSpec} not found", file=sys.stderr)
+
+    if manifestFileSpec:
+        with open(manifestFileSpec) as f:
+            for line in [x.strip() for x in f]:
+                if line and (not line.startswith('#')):
+                    lineMap = line.split("|")
+                    inFile = lineMap[0]
+                    items.append(
+                        {
+                            'input': inFile,
+                            'output': lineMap[1] if (len(lineMap) > 1) and lineMap[1] else _outputFor(inFile),
+                            'subs': lineMap[2] if (len(lineMap) > 2) and lineMap[2] else None,
+                        }
+                    )
+
+    return items
+
+
+######## BatchWorkerPlan ######################################################
+# decide how many titles to process at once, how many threads each title's ffmpeg gets, how many
+# chunks (with --chunked-video) each title encodes at once and how many processes each title decodes
+# audio for --refine-mutes with, so that (jobs * chunk workers * threads) doesn't oversubscribe the
+# machine. a title that re-encodes video keeps several cores busy (each of its chunk encoders, with
+# --chunked-video), one that only re-encodes (or copies) audio needs about one, and a subtitle-only
+# title is pure Python and needs one
+def BatchWorkerPlan(args, cpuCount=None):
+    if not cpuCount:
+        cpuCount = os.cpu_count() or 1
+    threads = args.threads
+    chunkWorkers = args.chunkWorkers if args.chunkWorkers else max(1, cpuCount // 4)
+    if (args.reEncodeVideo or args.hardCode) and args.chunkedVideo:
+        if not threads:
+            threads = max(1, cpuCount // ((args.jobs if args.jobs else 1) * chunkWorkers))
+        jobs = args.jobs if args.jobs else max(1, cpuCount // (chunkWorkers * threads))
+    else:
+        if args.reEncodeVideo or args.hardCode:
+            if not threads:
+                threads = min(cpuCount, ENCODE_THREADS_PER_JOB_MAX)
+        elif not threads:
+            threads = 1
+        jobs = args.jobs if args.jobs else max(1, cpuCount // threads)
+    refineWorkers = args.refineWorkers if args.refineWorkers else max(1, cpuCount // jobs)
+    return jobs, threads, chunkWorkers, refineWorkers
+
+
+######## ApplyBatchWorkerPlan #################################################
+# make the plan (see BatchWorkerPlan) for args, filling in its threads, chunk workers and refine workers
+# where they weren't given. returns how many titles to process at once
+def ApplyBatchWorkerPlan(args, cpuCount=None):
+    jobs, threads, chunkWorkers, refineWorkers = BatchWorkerPlan(args, cpuCount)
+    if args.threads is None:
+        args.threads = threads
+    if args.chunkWorkers is None:
+        args.chunkWorkers = chunkWorkers
+    if args.refineWorkers is None:
+        args.refineWorkers = refineWorkers
+    return jobs
+
+
+######## LoadBatchStatus ######################################################
+def LoadBatchStatus(statusFileSpec):
+    result = {}
+    if statusFileSpec and os.path.isfile(statusFileSpec):
+        try:
+            with open(statusFileSpec, 'r') as f:
+                result = json.load(f).get('titles', {})
+        except (OSError, ValueError):
+            result = {}
+    return result
+
+
+######## SaveBatchStatus ######################################################
+# rewritten after every title so an interrupted batch can be resumed
+def SaveBatchStatus(statusFileSpec, titles):
+    if statusFileSpec:
+        tmpFileSpec = f"{statusFileSpec}.{os.getpid()}.tmp"
+        with open(tmpFileSpec, 'w') as f:
+            json.dump(
+                {
+                    "now": datetime.now().isoformat(),
+                    "summary": {
+                        status: len([x for x in titles.values() if x.get('status', None) == status])
+                        for status in (STATUS_DONE, STATUS_FAILED)
+                    },
+                    "titles": titles,
+                },
+                f,
+                indent=4,
+            )
+        os.replace(tmpFileSpec, statusFileSpec)
+
+
+######## IsBatchItemDone ######################################################
+# a title is finished if a previous run said so and everything it produced is still there
+def IsBatchItemDone(item, previousStatus):
+    return (
+        (previousStatus is not None)
+        and (previousStatus.get('status', None) == STATUS_DONE)
+        and all([os.path.isfile(x) for x in previousStatus.get('artifacts', [])])
+    )
+
+
+######## BatchDownloadSubtitles ##############################################
+# download the subtitles of every title that needs them (it has no subtitle file of its own, nor a
+# text subtitle stream in the language to extract) at once, through one set of subliminal providers
+# (see subsdownloader.SubtitleDownloader), rather than each title's worker setting up its own. each
+# of those titles gets what was downloaded as its "subs", and isn't looked for again by its worker
+def BatchDownloadSubtitles(items, args):
+    lang, forceIndex = SplitLanguageIfForced(args.lang)
+    if args.offline or (forceIndex is not None):
+        return
+
+    needed = []
+    for item in items:
+        if (not item['subs']) and os.path.isfile(item['input']):
+            probe = GetMediaProbe(item['input'], args.probeCache)
+            if probe and (probe.TextSubtitleStream(lang) is None):
+                needed.append(item)
+
+    if needed:
+        try:
+            downloaded = TitleSubtitleDownloader(args).DownloadMany([x['input'] for x in needed], lang)
+        except Exception as e:
+            # each title's worker will try for itself
+            print(f"Downloading subtitles failed: {e}", file=sys.stderr)
+        else:
+            for item in needed:
+                item['subs'] = downloaded.get(item['input'], "") or None
+                item['download'] = False
+
+
+######## BatchProfileFileSpec ################################################
+# the --profile file for a title of the batch: the title's output file name is appended to it
+def BatchProfileFileSpec(profileFileSpec, item):
+    return f"{profileFileSpec}.{os.path.basename(item['output'] or item['input'])}"
+
+
+######## _InitBatchWorker #####################################################
+def _InitBatchWorker(swearsMap):
+    global _workerSwearsMap
+    _workerSwearsMap = swearsMap
+
+
+######## CleanBatchItem #######################################################
+# clean one title: item has its "input", "output" and "subs" (any of which may be None but "input")
+# and, optionally, "subsOut", "plexFile", "plexAutoSkipId", "extraOutputs", "extraOutputsDownmix" and
+# "cleanAudio" (see cleanvid's options of the same names) and "download" (False if subtitles aren't to be downloaded for it, see BatchDownloadSubtitles).
+# the swears map (and matcher built from it), a subliminal ProviderPool and a SubtitleDownloader may be
+# passed in by a caller that keeps them for many titles, otherwise this worker process's swears map is used
+def CleanBatchItem(item, args, swearsMap=None, swearsMatcher=None, providerPool=None, downloader=None):
+    startTime = time.time()
+    result = {'input': item['input'], 'output': item['output'], 'artifacts': []}
+
+    # the last progress report of each of this title's ffmpeg jobs, recorded for its throughput
+    jobProgress = {}
+
+    def _progress(progress):
+        jobProgress[progress.get('job', None)] = progress
+        if args.progress:
+            PrintProgress(progress)
+
+    stageTimer = TitleStageTimer(args)
+    try:
+        if item['output']:
+            os.makedirs(os.path.dirname(os.path.abspath(item['output'])), exist_ok=True)
+        spoolFile = None
+        if item['subs']:
+            subsFile = item['subs']
+        else:
+            # (there's no output video to spool for with PlexAutoSkip)
+            spoolFile = TitleSpoolFileSpec(args, item['output']) if not item.get('plexAutoSkipId', None) else None
+            subsFile = GetSubtitles(
+                item['input'],
+                args.lang,
+                args.offline or (not item.get('download', True)),
+                args.probeCache,
+                spoolFile,
+                stageTimer,
+                providerPool,
+                downloader if downloader is not None else TitleSubtitleDownloader(args),
+            )
+        cleaner = CleanTitle(
+            args,
+            item['input'],
+            item['output'],
+            subsFile,
+            subsOut=item.get('subsOut', None),
+            plexFile=item.get('plexFile', None),
+            plexAutoSkipId=item.get('plexAutoSkipId', None),
+            swearsMap=swearsMap if swearsMap is not None else _workerSwearsMap,
+            progressCallback=_progress,
+            spoolFileSpec=spoolFile,
+            stageTimer=stageTimer,
+            swearsMatcher=swearsMatcher,
+            extraOutputs=ExtraOutputs(item.get('extraOutputs', None), item.get('extraOutputsDownmix', None)),
+            cleanAudioFileSpec=item.get('cleanAudio', None),
+        )
+        result['artifacts'] = [
+            x
+            for x in (
+                cleaner.outputVidFileSpec if not cleaner.unalteredVideo else None,
+                cleaner.cleanSubsFileSpec,
+                cleaner.edlFileSpec if cleaner.edl else None,
+                cleaner.jsonFileSpec if cleaner.jsonDumpList is not None else None,
+                cleaner.plexAutoSkipJson if cleaner.plexAutoSkipId else None,
+                cleaner.cleanAudioFileSpec if cleaner.keepCleanAudio else None,
+            )
+            + tuple([x for x, downmix in cleaner.extraOutputs])
+            if x and os.path.isfile(x)
+        ]
+        result['unaltered'] = cleaner.unalteredVideo
+        result['status'] = STATUS_DONE
+    except Exception as e:
+        result['status'] = STATUS_FAILED
+        result['error'] = str(e)
+        if args.verbose:
+            result['traceback'] = traceback.format_exc()
+    if jobProgress:
+        result['ffmpeg'] = {
+            job: {k: progress.get(k, None) for k in ('out_time', 'frame', 'fps', 'speed', 'total_size')}
+            for job, progress in jobProgress.items()
+        }
+    if stageTimer:
+        # each title is profiled (in its own worker process) to its own file
+        result['stages'] = TitleStageReport(
+            stageTimer, profileFileSpec=BatchProfileFileSpec(args.profile, item) if args.profile else None
+        )
+    result['seconds'] = round(time.time() - startTime, 3)
+    result['finished'] = datetime.now().isoformat()
+    return result
+
+
+#################################################################################
+def RunCleanvidBatch():
+    parser = argparse.ArgumentParser(description='clean a library of video files with cleanvid')
+    parser.add_argument(
+        'inputs',
+        nargs='*',
+        help='input video files and/or directories (searched recursively)',
+        metavar='<input video or directory>',
+    )
+    parser.add_argument(
+        '-m',
+        '--manifest',
+        help='text file listing titles to process, one "input video[|output video[|input srt]]" per line',
+        metavar='<manifest file>',
+        dest='manifest',
+    )
+    parser.add_argument(
+        '--output-dir',
+        help='directory for output video files (default is alongside each input)',
+        metavar='<directory>',
+        dest='outputDir',
+    )
+    parser.add_argument(
+        '--extensions',
+        help=f'comma-separated video file extensions to find in directories (default is "{VIDEO_DEFAULT_EXTENSIONS}")',
+        metavar='<extensions>',
+        dest='extensions',
+        default=VIDEO_DEFAULT_EXTENSIONS,
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        help='number of titles to process at once (default is based on CPU count and ffmpeg threads per title)',
+        metavar='<int>',
+        dest='jobs',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--status',
+        help=f'JSON file summarizing the status of each title (default is "{BATCH_DEFAULT_STATUS_FILE}")',
+        metavar='<status JSON>',
+        dest='statusFile',
+        default=BATCH_DEFAULT_STATUS_FILE,
+    )
+    parser.add_argument(
+        '--force',
+        help='reprocess titles the status file says are already done',
+        dest='force',
+        action='store_true',
+    )
+    parser.add_argument('--verbose', help='include tracebacks for failed titles', dest='verbose', action='store_true')
+    AddCleaningArguments(parser)
+    parser.set_defaults(force=False, verbose=False)
+    args = parser.parse_args()
+
+    items = FindBatchItems(args.inputs, args.manifest, args.extensions, args.outputDir)
+    if not items:
+        parser.error('no input titles found')
+
+    titles = LoadBatchStatus(args.statusFile)
+    todo = []
+    for item in items:
+        # in incremental mode every title's subtitles are rescanned (cheaply), and only titles whose
+        # mute regions have changed are multiplexed again
+        if (not args.force) and (not args.incremental) and IsBatchItemDone(item, titles.get(item['input'], None)):
+            print(f"{item['input']}: already done")
+        else:
+            todo.append(item)
+
+    jobs = ApplyBatchWorkerPlan(args)
+
+    BatchDownloadSubtitles(todo, args)
+
+    # the swears list is parsed once here rather than once per title
+    swearsMap = LoadSwearsMap(args.swears)
+
+    # the stage report of each title processed by this run (each is also in the status file)
+    stageReports = {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_InitBatchWorker, initargs=(swearsMap,)) as executor:
+        futures = [executor.submit(CleanBatchItem, item, args) for item in todo]
+        for future in as_completed(futures):
+            result = future.result()
+            titles[result['input']] = result
+            SaveBatchStatus(args.statusFile, titles)
+            if args.stageReport:
+                stageReports[result['input']] = result.get('stages', None)
+                with open(args.stageReport, 'w') as f:
+                    json.dump({"now": datetime.now().isoformat(), "titles": stageReports}, f, indent=4)
+            print(
+                f"{result['input']}: {result['status']} ({result['seconds']} seconds)"
+                + (f": {result['error']}" if 'error' in result else '')
+            )
+
+    if any([titles.get(item['input'], {}).get('status', None) == STATUS_FAILED for item in items]):
+        sys.exit(1)
+
+
+#################################################################################
+if __name__ == '__main__':
+    RunCleanvidBatch()
+
+#################################################################################
@@ -1,17 +1,41 @@
+from operator import itemgetter
+
+
 class CaselessDictionary(dict):
     """Dictionary that enables case insensitive searching while preserving case sensitivity
 when keys are listed, ie, via keys() or items() methods.
 
 Works by storing a lowercase version of the key as the new key and stores the original key-value
-pair as the key's value (values become dictionaries)."""
+pair as the key's value (values become (key, value) tuples)."""
+
+    # no per-instance __dict__, only the dict itself
+    __slots__ = ()
 
     def __init__(self, initval={}):
+        self.update(initval)
+
+    # the lowercase key (or key itself, if it's already lowercase or can't be lowercased)
+    @staticmethod
+    def _fold(key):
+        try:
+            folded = key.lower()
+        except AttributeError:
+            return key
+        # don't keep two copies of a key that's already lowercase
+        return key if folded == key else folded
+
+    # (original key, value) pairs from a dict (or CaselessDictionary) or an iterable of pairs, stored in bulk
+    def update(self, initval=(), **kwargs):
         if isinstance(initval, dict):
-            for key, value in initval.items():
-                self.__setitem__(key, value)
-        elif isinstance(initval, list):
-            for (key, value) in initval:
-                self.__setitem__(key, value)
+            initval = initval.items()
+        fold = self._fold
+        dict.update(self, ((fold(key), (key, value)) for (key, value) in initval))
+        if kwargs:
+            self.update(kwargs)
+
+    # pickled (e.g., to hand to worker processes) as its (original key, value) pairs, and rebuilt in bulk
+    def __reduce__(self):
+        return (self.__class__, (list(self.items()),))
 
     def __repr__(self):
         ans = dict()
@@ -24,20 +48,23 @@ pair as the key's value (values become dictionaries)."""
         return self.__repr__()
 
     def __contains__(self, key):
-        return dict.__contains__(self, key.lower())
+        return dict.__contains__(self, self._fold(key))
 
     def __getitem__(self, key):
-        return dict.__getitem__(self, key.lower())['val']
-
-    def __setitem__(self, key, value):
         try:
-            return dict.__setitem__(self, key.lower(), {'key': key, 'val': value})
+            return dict.__getitem__(self, key.lower())[1]
         except AttributeError:
-            return dict.__setitem__(self, key, {'key': key, 'val': value})
+            return dict.__getitem__(self, key)[1]
+
+    def __setitem__(self, key, value):
+        return dict.__setitem__(self, self._fold(key), (key, value))
+
+    def __delitem__(self, key):
+        return dict.__delitem__(self, self._fold(key))
 
     def get(self, key, default=None):
         try:
-            return dict.__getitem__(self, str(key).lower())['val']
+            return dict.__getitem__(self, str(key).lower())[1]
         except KeyError:
             return default
 
@@ -48,16 +75,13 @@ pair as the key's value (values become dictionaries)."""
             return False
 
     def items(self):
-        for v in dict.values(self):
-            yield (v['key'], v['val'])
+        return iter(dict.values(self))
 
     def keys(self):
-        for v in dict.values(self):
-            yield v['key']
+        return map(itemgetter(0), dict.values(self))
 
     def values(self):
-        for v in dict.values(self):
-            yield v['val']
+        return map(itemgetter(1), dict.values(self))
 
     def printable(self, sep=', ', key=None):
         if key is None:
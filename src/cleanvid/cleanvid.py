@@ -2,34 +2,96 @@
 
 import argparse
 import base64
-import chardet
 import codecs
 import errno
+import hashlib
 import json
 import os
 import shutil
 import sys
 import re
-import pysrt
-import delegator
+import tempfile
+import shlex
 from datetime import datetime
-from subliminal import *
-from babelfish import Language
 from collections import OrderedDict
 
 try:
     from cleanvid.caselessdictionary import CaselessDictionary
+    from cleanvid.ffrunner import FFCall, FFJob, FFJobs, PrintProgress, RunFFSteps, RunFFStepsAsync
+    from cleanvid.muterefiner import (
+        REFINE_BATCH_CUES,
+        REFINE_CONTEXT_MILLISEC,
+        REFINE_DEFAULT_MARGIN_SEC,
+        REFINE_SAMPLE_RATE,
+        SUBTITLE_TAGS_REGEX,
+        WordFractions,
+    )
+    from cleanvid.resultcache import RESULT_CACHE_DEFAULT_MAX_MB, CacheKey, FileDigest, ResultCache
+    from cleanvid.srtstream import FormatSrtTime, StreamSubtitles
+    from cleanvid.stagetimer import StageTimer, TimedStage
+    from cleanvid.subsdownloader import SUBTITLE_NOT_FOUND_DEFAULT_HOURS, SubtitleDownloader
+    from cleanvid.swearsmatcher import GetSwearsMatcher
+    from cleanvid.wordaligner import WORD_ALIGNER_DEFAULT, WORD_ALIGNERS, GetWordAligner
 except ImportError:
     from caselessdictionary import CaselessDictionary
-from itertools import tee
+    from ffrunner import FFCall, FFJob, FFJobs, PrintProgress, RunFFSteps, RunFFStepsAsync
+    from muterefiner import (
+        REFINE_BATCH_CUES,
+        REFINE_CONTEXT_MILLISEC,
+        REFINE_DEFAULT_MARGIN_SEC,
+        REFINE_SAMPLE_RATE,
+        SUBTITLE_TAGS_REGEX,
+        WordFractions,
+    )
+    from resultcache import RESULT_CACHE_DEFAULT_MAX_MB, CacheKey, FileDigest, ResultCache
+    from srtstream import FormatSrtTime, StreamSubtitles
+    from stagetimer import StageTimer, TimedStage
+    from subsdownloader import SUBTITLE_NOT_FOUND_DEFAULT_HOURS, SubtitleDownloader
+    from swearsmatcher import GetSwearsMatcher
+    from wordaligner import WORD_ALIGNER_DEFAULT, WORD_ALIGNERS, GetWordAligner
+from itertools import chain, tee
+
+# asyncio, chardet, babelfish, subliminal (by far the slowest), numpy and vosk are only imported by the code paths
+# that need them (the asyncio API, detecting a subtitle file's encoding, downloading subtitles and refining mute
+# regions), so that "import cleanvid" and runs that don't use them (e.g., with --subs, --offline or
+# --audio-stream-list) start quickly
 
 __script_location__ = os.path.dirname(os.path.realpath(__file__))
 
 VIDEO_DEFAULT_PARAMS = '-c:v libx264 -preset slow -crf 22'
 AUDIO_DEFAULT_PARAMS = '-c:a aac -ab 224k -ar 44100'
+# the tags of a cleaned audio stream kept in the output (others, e.g. BPS or DURATION, no longer apply)
+AUDIO_STREAM_METADATA_TAGS = ('language', 'title')
 # for downmixing, https://superuser.com/questions/852400 was helpful
 AUDIO_DOWNMIX_FILTER = 'pan=stereo|FL=0.8*FC + 0.6*FL + 0.6*BL + 0.5*LFE|FR=0.8*FC + 0.6*FR + 0.6*BR + 0.5*LFE'
 SUBTITLE_DEFAULT_LANG = 'eng'
+# image-based subtitle codecs, which can't be extracted to SRT
+SUBTITLE_BITMAP_CODECS = ('dvb_subtitle', 'dvd_subtitle', 'hdmv_pgs_subtitle', 'xsub')
+# chardet is only consulted for subtitles that aren't UTF-8, and only this much of them
+SUBTITLE_DETECT_BYTES_MAX = 65536
+SUBTITLE_DETECT_CHUNK_BYTES = 4096
+SUBTITLE_FALLBACK_ENCODING = 'cp1252'
+MUTE_FILTER_AFADE = 'afade'
+MUTE_FILTER_VOLUME = 'volume'
+# encoders used to re-encode short spans of an audio stream in its original format (see SegmentedCleanAudio)
+AUDIO_SEGMENT_ENCODERS = {
+    'aac': 'aac',
+    'ac3': 'ac3',
+    'eac3': 'eac3',
+    'flac': 'flac',
+    'mp2': 'mp2',
+    'mp3': 'libmp3lame',
+    'opus': 'libopus',
+    'vorbis': 'libvorbis',
+}
+AUDIO_SEGMENT_DEFAULT_MARGIN_SEC = 1.0
+VIDEO_CHUNK_DEFAULT_SEC = 60.0
+INCREMENTAL_SIDECAR_SUFFIX = '.cleanvid.json'
+SPOOL_SUFFIX = '.spool.mkv'
+# the cleaned audio stream rendered once for the output video and its extra outputs (see VidCleaner.CleanAudioSteps)
+CLEAN_AUDIO_SUFFIX = '.clean_audio.mka'
+# beyond this length the audio filter graph is passed to ffmpeg in a file (-filter_complex_script)
+FILTER_COMPLEX_ARG_MAX = 16384
 PLEX_AUTO_SKIP_DEFAULT_CONFIG = '{"markers":{},"offsets":{},"tags":{},"allowed":{"users":[],"clients":[],"keys":[]},"blocked":{"users":[],"clients":[],"keys":[]},"clients":{},"mode":{}}'
 
 
@@ -40,77 +102,262 @@ def pairwise(iterable):
     return zip(a, b)
 
 
-######## GetFormatAndStreamInfo ###############################################
-def GetFormatAndStreamInfo(vidFileSpec):
+######## MediaProbe ###########################################################
+# the result of a single "ffprobe -show_format -show_streams" of a media file, from
+# which all of the format/stream questions cleanvid asks of that file are answered
+class MediaProbe(object):
+    vidFileSpec = ""
+    info = None
+    keyframeTimes = None
+
+    def __init__(self, vidFileSpec, info):
+        self.vidFileSpec = vidFileSpec
+        self.info = info
+        self.keyframeTimes = None
+
+    def Streams(self, codecType=None):
+        return [
+            x for x in self.info.get('streams', []) if (codecType is None) or (x.get('codec_type', None) == codecType)
+        ]
+
+    def FormatAndStreamInfo(self):
+        return self.info
+
+    def AudioStreamsInfo(self):
+        # same shape as "-select_streams a -show_entries stream=index,codec_name,sample_rate,channel_layout:stream_tags=language"
+        streams = []
+        for stream in self.Streams('audio'):
+            entry = {k: stream[k] for k in ('index', 'codec_name', 'sample_rate', 'channel_layout') if k in stream}
+            if 'language' in stream.get('tags', {}):
+                entry['tags'] = {'language': stream['tags']['language']}
+            streams.append(entry)
+        return {'streams': streams}
+
+    def SubtitleStreamMap(self):
+        # e.g. for ara and chi, "-map 0:5 -map 0:7" or "-map 0:s:3 -map 0:s:5"
+        # 2,eng
+        # 3,eng
+        # 4,eng
+        # 5,ara
+        # 6,bul
+        # 7,chi
+        # 8,cze
+        # 9,dan
+        result = OrderedDict()
+        for stream in self.Streams('subtitle'):
+            result[int(stream['index'])] = stream.get('tags', {}).get('language', '')
+        return result
+
+    # the index of the first text (i.e., not image-based, so it can be converted to SRT) subtitle stream
+    # tagged with language, or None
+    def TextSubtitleStream(self, language):
+        return next(
+            iter(
+                [
+                    int(x['index'])
+                    for x in self.Streams('subtitle')
+                    if (x.get('tags', {}).get('language', '') == language)
+                    and (x.get('codec_name', None) not in SUBTITLE_BITMAP_CODECS)
+                ]
+            ),
+            None,
+        )
+
+    def HasAudioMoreThanStereo(self):
+        return any([x for x in [int(y.get('channels', 0)) for y in self.Streams('audio')] if x > 2])
+
+    def Duration(self):
+        try:
+            return float(self.info.get('format', {}).get('duration', None))
+        except (TypeError, ValueError):
+            return None
+
+    def StartTime(self):
+        try:
+            return float(self.info.get('format', {}).get('start_time', 0.0))
+        except (TypeError, ValueError):
+            return 0.0
+
+    # the (sorted) presentation times of the first video stream's keyframes. this reads (but doesn't
+    # decode) every video packet, so it's only done on demand, once
+    def KeyframeTimes(self):
+        return RunFFSteps(self.KeyframeTimesSteps())
+
+    async def KeyframeTimesAsync(self, limiter=None):
+        return await RunFFStepsAsync(self.KeyframeTimesSteps(), limiter=limiter)
+
+    def KeyframeTimesSteps(self):
+        if self.keyframeTimes is None:
+            keyframeTimes = []
+
+            # there's a line per packet, so they're handled as they're read rather than all buffered
+            def _packet(line):
+                packet = line.split(',')
+                if (len(packet) > 1) and ('K' in packet[1]):
+                    try:
+                        keyframeTimes.append(float(packet[0]))
+                    except ValueError:
+                        pass
+
+            [ffprobeResult] = yield FFJobs(
+                [
+                    FFJob(
+                        [
+                            'ffprobe',
+                            '-loglevel',
+                            'quiet',
+                            '-select_streams',
+                            'v:0',
+                            '-show_entries',
+                            'packet=pts_time,flags',
+                            '-of',
+                            'csv=p=0',
+                            self.vidFileSpec,
+                        ],
+                        outputCallback=_packet,
+                        progress=False,
+                    )
+                ]
+            )
+            self.keyframeTimes = sorted(keyframeTimes) if ffprobeResult.return_code == 0 else []
+        return self.keyframeTimes
+
+
+# in-memory probe results for this process, keyed on ProbeCacheKey
+_mediaProbeCache = dict()
+
+
+######## ProbeCacheKey ########################################################
+# a media file is considered unchanged (and its probe still valid) if its path, size and mtime match
+def ProbeCacheKey(vidFileSpec):
+    fileStat = os.stat(vidFileSpec)
+    return (os.path.realpath(vidFileSpec), fileStat.st_size, fileStat.st_mtime_ns)
+
+
+######## GetMediaProbe ########################################################
+# run ffprobe on vidFileSpec at most once, caching the result in memory and (optionally)
+# on disk under cacheDir so that subsequent runs over the same unchanged file skip probing
+def GetMediaProbe(vidFileSpec, cacheDir=None):
+    return RunFFSteps(MediaProbeSteps(vidFileSpec, cacheDir))
+
+
+######## GetMediaProbeAsync ###################################################
+async def GetMediaProbeAsync(vidFileSpec, cacheDir=None, limiter=None):
+    return await RunFFStepsAsync(MediaProbeSteps(vidFileSpec, cacheDir), limiter=limiter)
+
+
+######## MediaProbeSteps ######################################################
+# the steps (see ffrunner.FFJobs) of GetMediaProbe
+def MediaProbeSteps(vidFileSpec, cacheDir=None):
     result = None
     if os.path.isfile(vidFileSpec):
-        ffprobeCmd = "ffprobe -loglevel quiet -print_format json -show_format -show_streams \"" + vidFileSpec + "\""
-        ffprobeResult = delegator.run(ffprobeCmd, block=True)
-        if ffprobeResult.return_code == 0:
-            result = json.loads(ffprobeResult.out)
+        cacheKey = ProbeCacheKey(vidFileSpec)
+        if cacheKey in _mediaProbeCache:
+            return _mediaProbeCache[cacheKey]
+
+        info = None
+        cacheFileSpec = None
+        if cacheDir:
+            cacheFileSpec = os.path.join(
+                cacheDir, hashlib.sha256(json.dumps(cacheKey).encode('utf-8')).hexdigest() + '.json'
+            )
+            try:
+                with open(cacheFileSpec, 'r') as f:
+                    cached = json.load(f)
+                if cached.get('key', None) == list(cacheKey):
+                    info = cached.get('ffprobe', None)
+            except (OSError, ValueError):
+                info = None
+
+        if info is None:
+            [ffprobeResult] = yield FFJobs(
+                [
+                    FFJob(
+                        ['ffprobe', '-loglevel', 'quiet', '-print_format', 'json']
+                        + ['-show_format', '-show_streams', vidFileSpec],
+                        progress=False,
+                    )
+                ]
+            )
+            if ffprobeResult.return_code == 0:
+                info = json.loads(ffprobeResult.out)
+                if cacheFileSpec:
+                    try:
+                        os.makedirs(cacheDir, exist_ok=True)
+                        tmpFileSpec = f"{cacheFileSpec}.{os.getpid()}.tmp"
+                        with open(tmpFileSpec, 'w') as f:
+                            json.dump({'key': list(cacheKey), 'ffprobe': info}, f)
+                        os.replace(tmpFileSpec, cacheFileSpec)
+                    except OSError:
+                        pass
+
+        if info is not None:
+            result = MediaProbe(vidFileSpec, info)
+            _mediaProbeCache[cacheKey] = result
+
     return result
 
 
+######## GetFormatAndStreamInfo ###############################################
+def GetFormatAndStreamInfo(vidFileSpec, cacheDir=None):
+    probe = GetMediaProbe(vidFileSpec, cacheDir)
+    return probe.FormatAndStreamInfo() if probe else None
+
+
 ######## GetAudioStreamsInfo ###############################################
-def GetAudioStreamsInfo(vidFileSpec):
-    result = None
-    if os.path.isfile(vidFileSpec):
-        ffprobeCmd = (
-            "ffprobe -loglevel quiet -select_streams a -show_entries stream=index,codec_name,sample_rate,channel_layout:stream_tags=language -of json \""
-            + vidFileSpec
-            + "\""
-        )
-        ffprobeResult = delegator.run(ffprobeCmd, block=True)
-        if ffprobeResult.return_code == 0:
-            result = json.loads(ffprobeResult.out)
-    return result
+def GetAudioStreamsInfo(vidFileSpec, cacheDir=None):
+    probe = GetMediaProbe(vidFileSpec, cacheDir)
+    return probe.AudioStreamsInfo() if probe else None
 
 
 ######## GetStreamSubtitleMap ###############################################
-def GetStreamSubtitleMap(vidFileSpec):
-    result = None
-    if os.path.isfile(vidFileSpec):
-        ffprobeCmd = (
-            "ffprobe -loglevel quiet -select_streams s -show_entries stream=index:stream_tags=language -of csv=p=0 \""
-            + vidFileSpec
-            + "\""
-        )
-        ffprobeResult = delegator.run(ffprobeCmd, block=True)
-        if ffprobeResult.return_code == 0:
-            # e.g. for ara and chi, "-map 0:5 -map 0:7" or "-map 0:s:3 -map 0:s:5"
-            # 2,eng
-            # 3,eng
-            # 4,eng
-            # 5,ara
-            # 6,bul
-            # 7,chi
-            # 8,cze
-            # 9,dan
-            result = OrderedDict()
-            for l in [x.split(',') for x in ffprobeResult.out.split()]:
-                result[int(l[0])] = l[1]
-    return result
+def GetStreamSubtitleMap(vidFileSpec, cacheDir=None):
+    probe = GetMediaProbe(vidFileSpec, cacheDir)
+    return probe.SubtitleStreamMap() if probe else None
 
 
 ######## HasAudioMoreThanStereo ###############################################
-def HasAudioMoreThanStereo(vidFileSpec):
-    result = False
-    if os.path.isfile(vidFileSpec):
-        ffprobeCmd = (
-            "ffprobe -loglevel quiet -select_streams a -show_entries stream=channels -of csv=p=0 \""
-            + vidFileSpec
-            + "\""
-        )
-        ffprobeResult = delegator.run(ffprobeCmd, block=True)
-        if ffprobeResult.return_code == 0:
-            result = any(
-                [
-                    x
-                    for x in [int(''.join([z for z in y if z.isdigit()])) for y in list(set(ffprobeResult.out.split()))]
-                    if x > 2
-                ]
-            )
-    return result
+def HasAudioMoreThanStereo(vidFileSpec, cacheDir=None):
+    probe = GetMediaProbe(vidFileSpec, cacheDir)
+    return probe.HasAudioMoreThanStereo() if probe else False
+
+
+######## GetFormatAndStreamInfoAsync ##########################################
+async def GetFormatAndStreamInfoAsync(vidFileSpec, cacheDir=None, limiter=None):
+    probe = await GetMediaProbeAsync(vidFileSpec, cacheDir, limiter)
+    return probe.FormatAndStreamInfo() if probe else None
+
+
+######## GetAudioStreamsInfoAsync #############################################
+async def GetAudioStreamsInfoAsync(vidFileSpec, cacheDir=None, limiter=None):
+    probe = await GetMediaProbeAsync(vidFileSpec, cacheDir, limiter)
+    return probe.AudioStreamsInfo() if probe else None
+
+
+######## GetStreamSubtitleMapAsync ############################################
+async def GetStreamSubtitleMapAsync(vidFileSpec, cacheDir=None, limiter=None):
+    probe = await GetMediaProbeAsync(vidFileSpec, cacheDir, limiter)
+    return probe.SubtitleStreamMap() if probe else None
+
+
+######## HasAudioMoreThanStereoAsync ##########################################
+async def HasAudioMoreThanStereoAsync(vidFileSpec, cacheDir=None, limiter=None):
+    probe = await GetMediaProbeAsync(vidFileSpec, cacheDir, limiter)
+    return probe.HasAudioMoreThanStereo() if probe else False
+
+
+######## FileBytes ###########################################################
+# the total size of whichever of fileSpecs exist
+def FileBytes(*fileSpecs):
+    return sum([os.path.getsize(x) for x in fileSpecs if x and os.path.isfile(x)])
+
+
+######## FilterArgEscape ######################################################
+# escape a value (e.g., a file name) for use as a filter option in an ffmpeg filter graph: once
+# for the filter's option string, then again for the filter graph it's part of
+def FilterArgEscape(value):
+    value = re.sub(r"([\\':])", r"\\\1", value)
+    return re.sub(r"([\\'\[\],;])", r"\\\1", value)
 
 
 ######## SplitLanguageIfForced #####################################################
@@ -122,77 +369,392 @@ def SplitLanguageIfForced(lang):
 
 
 ######## ExtractSubtitles #####################################################
-def ExtractSubtitles(vidFileSpec, srtLanguage):
-    subFileSpec = ""
-    srtLanguage, srtForceIndex = SplitLanguageIfForced(srtLanguage)
-    if (streamInfo := GetStreamSubtitleMap(vidFileSpec)) and (
-        stream := (
-            next(iter([k for k, v in streamInfo.items() if (v == srtLanguage)]), None)
-            if not srtForceIndex
-            else srtForceIndex
-        )
-    ):
+# extract the subtitle stream for srtLanguage (e.g., "eng", or "eng:3" to force stream 3) from
+# vidFileSpec to an SRT file alongside it, returning its name (or "" if it couldn't be extracted).
+# srtLanguage may also be a list of languages, in which case the result is a dict of each language's
+# SRT file name (or "")
+# if spoolFileSpec is specified, the same ffmpeg also copies the video and audio streams to it, so
+# that (for a file on slow or network storage) they can be multiplexed from there rather than
+# reading the input again (see VidCleaner.MediaInput)
+# the probe and extraction are timed as stages of stageTimer (see stagetimer.StageTimer), if specified
+def ExtractSubtitles(vidFileSpec, srtLanguage, probeCacheDir=None, spoolFileSpec=None, stageTimer=None):
+    return RunFFSteps(ExtractSubtitlesSteps(vidFileSpec, srtLanguage, probeCacheDir, spoolFileSpec, stageTimer))
+
+
+######## ExtractSubtitlesAsync ################################################
+async def ExtractSubtitlesAsync(
+    vidFileSpec, srtLanguage, probeCacheDir=None, limiter=None, spoolFileSpec=None, stageTimer=None
+):
+    return await RunFFStepsAsync(
+        ExtractSubtitlesSteps(vidFileSpec, srtLanguage, probeCacheDir, spoolFileSpec, stageTimer), limiter=limiter
+    )
+
+
+######## ExtractSubtitlesSteps ################################################
+# the steps (see ffrunner.FFJobs) of ExtractSubtitles. however many languages are wanted, their
+# streams are all written (each to its own SRT file) by a single ffmpeg, so the container is
+# only read once
+def ExtractSubtitlesSteps(vidFileSpec, srtLanguage, probeCacheDir=None, spoolFileSpec=None, stageTimer=None):
+    srtLanguages = [srtLanguage] if isinstance(srtLanguage, str) else list(srtLanguage)
+    result = OrderedDict([(x, "") for x in srtLanguages])
+    with TimedStage(stageTimer, 'probe'):
+        probe = yield from MediaProbeSteps(vidFileSpec, probeCacheDir)
+    if probe:
         subFileParts = os.path.splitext(vidFileSpec)
-        subFileSpec = subFileParts[0] + "." + srtLanguage + ".srt"
-        ffmpegCmd = (
-            "ffmpeg -hide_banner -nostats -loglevel error -y -i \""
-            + vidFileSpec
-            + f"\" -map 0:{stream} \""
-            + subFileSpec
-            + "\""
-        )
-        ffmpegResult = delegator.run(ffmpegCmd, block=True)
-        if (ffmpegResult.return_code != 0) or (not os.path.isfile(subFileSpec)):
-            subFileSpec = ""
-    return subFileSpec
+        outputs = OrderedDict()
+        for lang in srtLanguages:
+            language, forceIndex = SplitLanguageIfForced(lang)
+            stream = probe.TextSubtitleStream(language) if not forceIndex else forceIndex
+            if stream is not None:
+                subFileSpec = subFileParts[0] + "." + language + ".srt"
+                if outputs.setdefault(subFileSpec, stream) == stream:
+                    result[lang] = subFileSpec
+
+        if outputs:
+            ffmpegArgs = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y', '-i', vidFileSpec]
+            for subFileSpec, stream in outputs.items():
+                ffmpegArgs += ['-map', f'0:{stream}', '-vn', '-an', '-dn', subFileSpec]
+            if spoolFileSpec:
+                ffmpegArgs += ['-map', '0:v?', '-map', '0:a?', '-c', 'copy', spoolFileSpec]
+            with TimedStage(stageTimer, 'extract', streams=len(outputs), spool=bool(spoolFileSpec)) as stage:
+                [ffmpegResult] = yield FFJobs([FFJob(ffmpegArgs)])
+                for lang, subFileSpec in result.items():
+                    if subFileSpec and ((ffmpegResult.return_code != 0) or (not os.path.isfile(subFileSpec))):
+                        result[lang] = ""
+                if spoolFileSpec and (ffmpegResult.return_code != 0) and os.path.isfile(spoolFileSpec):
+                    os.remove(spoolFileSpec)
+                # ffmpeg reads the whole container to find every subtitle packet
+                stage['bytes_read'] = FileBytes(vidFileSpec)
+                stage['bytes_written'] = FileBytes(*outputs.keys(), spoolFileSpec)
+
+    return result[srtLanguage] if isinstance(srtLanguage, str) else result
 
 
 ######## GetSubtitles #########################################################
-def GetSubtitles(vidFileSpec, srtLanguage, offline=False):
-    subFileSpec = ExtractSubtitles(vidFileSpec, srtLanguage)
-    if not os.path.isfile(subFileSpec):
-        if offline:
-            subFileSpec = ""
-        else:
-            if os.path.isfile(vidFileSpec):
-                subFileParts = os.path.splitext(vidFileSpec)
-                srtLanguage, srtForceIndex = SplitLanguageIfForced(srtLanguage)
-                subFileSpec = subFileParts[0] + "." + str(Language(srtLanguage)) + ".srt"
-                if not os.path.isfile(subFileSpec):
-                    video = Video.fromname(vidFileSpec)
-                    bestSubtitles = download_best_subtitles([video], {Language(srtLanguage)})
-                    savedSub = save_subtitles(video, [bestSubtitles[video][0]])
+# extract (or, unless offline, download) subtitles for srtLanguage, which may be a single language
+# or a list of them (see ExtractSubtitles). see DownloadSubtitles for providerPool and downloader
+def GetSubtitles(
+    vidFileSpec,
+    srtLanguage,
+    offline=False,
+    probeCacheDir=None,
+    spoolFileSpec=None,
+    stageTimer=None,
+    providerPool=None,
+    downloader=None,
+):
+    subFileSpecs = ExtractSubtitles(
+        vidFileSpec,
+        [srtLanguage] if isinstance(srtLanguage, str) else srtLanguage,
+        probeCacheDir,
+        spoolFileSpec,
+        stageTimer,
+    )
+    for lang, subFileSpec in subFileSpecs.items():
+        if (not os.path.isfile(subFileSpec)) and (not offline):
+            with TimedStage(stageTimer, 'download', language=lang) as stage:
+                subFileSpecs[lang] = DownloadSubtitles(vidFileSpec, lang, providerPool, downloader)
+                stage['bytes_written'] = FileBytes(subFileSpecs[lang])
+        elif not os.path.isfile(subFileSpec):
+            subFileSpecs[lang] = ""
+    return subFileSpecs[srtLanguage] if isinstance(srtLanguage, str) else subFileSpecs
+
+
+######## GetSubtitlesAsync ####################################################
+# subliminal is blocking, so downloading is done on a thread
+async def GetSubtitlesAsync(
+    vidFileSpec,
+    srtLanguage,
+    offline=False,
+    probeCacheDir=None,
+    limiter=None,
+    spoolFileSpec=None,
+    stageTimer=None,
+    providerPool=None,
+    downloader=None,
+):
+    import asyncio
+
+    subFileSpecs = await ExtractSubtitlesAsync(
+        vidFileSpec,
+        [srtLanguage] if isinstance(srtLanguage, str) else srtLanguage,
+        probeCacheDir,
+        limiter,
+        spoolFileSpec,
+        stageTimer,
+    )
+    for lang, subFileSpec in subFileSpecs.items():
+        if (not os.path.isfile(subFileSpec)) and (not offline):
+            with TimedStage(stageTimer, 'download', language=lang) as stage:
+                subFileSpecs[lang] = await asyncio.get_running_loop().run_in_executor(
+                    None, DownloadSubtitles, vidFileSpec, lang, providerPool, downloader
+                )
+                stage['bytes_written'] = FileBytes(subFileSpecs[lang])
+        elif not os.path.isfile(subFileSpec):
+            subFileSpecs[lang] = ""
+    return subFileSpecs[srtLanguage] if isinstance(srtLanguage, str) else subFileSpecs
+
+
+######## SpoolFileSpec ########################################################
+# where the video and audio of the input for outVidFileSpec are spooled (see ExtractSubtitles): in
+# spoolDir, otherwise the local temporary directory (not the output's, which may be the same slow or
+# network storage as the input). the name includes a digest of the output's path, so titles with the
+# same name (e.g., from different directories, in cleanvid-batch) don't share a spool file
+def SpoolFileSpec(outVidFileSpec, spoolDir=None):
+    outVidFileSpec = os.path.abspath(outVidFileSpec)
+    outVidDigest = hashlib.sha256(outVidFileSpec.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(
+        spoolDir if spoolDir else tempfile.gettempdir(),
+        f'{os.path.basename(outVidFileSpec)}.{outVidDigest}{SPOOL_SUFFIX}',
+    )
 
-            if subFileSpec and (not os.path.isfile(subFileSpec)):
-                subFileSpec = ""
 
-    return subFileSpec
+######## DownloadSubtitles ####################################################
+# download the best matching subtitles for srtLanguage with subliminal. providerPool (a subliminal
+# ProviderPool) may be specified to reuse its providers (and their sessions) for many downloads,
+# otherwise one is created (and its providers initialized and terminated) for this download alone.
+# downloader (a subsdownloader.SubtitleDownloader, see TitleSubtitleDownloader) has the cache and
+# providers to use, otherwise subliminal's cache is kept in memory and all of its providers are used
+def DownloadSubtitles(vidFileSpec, srtLanguage, providerPool=None, downloader=None):
+    # (a forced stream index only chooses among embedded subtitles)
+    srtLanguage = SplitLanguageIfForced(srtLanguage)[0]
+    if downloader is None:
+        downloader = SubtitleDownloader()
+    return downloader.Download(vidFileSpec, srtLanguage, providerPool)
+
+
+######## SubtitleEncoding #####################################################
+# the encoding of a text file: that of its BOM if it has one, otherwise UTF-8 if it's all valid UTF-8
+# (checked a block at a time, so it's never read into memory whole), otherwise chardet's guess from its
+# first SUBTITLE_DETECT_BYTES_MAX bytes. a BOM or UTF-8 settles most files without any detection
+def SubtitleEncoding(fileSpec, blockSize=1048576):
+    with open(fileSpec, 'rb') as f:
+        head = f.read(4)
+        for bom, encoding in (
+            (codecs.BOM_UTF8, 'utf-8-sig'),
+            (codecs.BOM_UTF32_LE, 'utf-32'),
+            (codecs.BOM_UTF32_BE, 'utf-32'),
+            (codecs.BOM_UTF16_LE, 'utf-16'),
+            (codecs.BOM_UTF16_BE, 'utf-16'),
+        ):
+            if head.startswith(bom):
+                return encoding
+
+        f.seek(0)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            while block := f.read(blockSize):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+
+        import chardet
+
+        f.seek(0)
+        detector = chardet.UniversalDetector()
+        for offset in range(0, SUBTITLE_DETECT_BYTES_MAX, SUBTITLE_DETECT_CHUNK_BYTES):
+            if not (chunk := f.read(SUBTITLE_DETECT_CHUNK_BYTES)):
+                break
+            detector.feed(chunk)
+            if detector.done:
+                break
+        detector.close()
+
+    encoding = detector.result.get('encoding', None) or SUBTITLE_FALLBACK_ENCODING
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = SUBTITLE_FALLBACK_ENCODING
+    return encoding
+
+
+######## OpenSubtitleText #####################################################
+# open a text file of unknown encoding (see SubtitleEncoding) for reading, without its BOM and, with
+# universalEndline, with its line endings normalized
+def OpenSubtitleText(fileSpec, universalEndline=True, encoding=None):
+    return open(
+        fileSpec,
+        'r',
+        encoding=encoding if encoding else SubtitleEncoding(fileSpec),
+        errors='replace',
+        newline=None if universalEndline else '',
+    )
+
+
+######## ReadSubtitleText #####################################################
+# read a text file of unknown encoding, returning its decoded contents (see OpenSubtitleText)
+def ReadSubtitleText(fileSpec, universalEndline=True):
+    with OpenSubtitleText(fileSpec, universalEndline) as f:
+        return f.read()
 
 
 ######## UTF8Convert #########################################################
 # attempt to convert any text file to UTF-* without BOM and normalize line endings
 def UTF8Convert(fileSpec, universalEndline=True):
-    # Read from file
-    with open(fileSpec, 'rb') as f:
-        raw = f.read()
+    text = ReadSubtitleText(fileSpec, universalEndline)
 
-    # Decode
-    raw = raw.decode(chardet.detect(raw)['encoding'])
+    # Write to file
+    with open(fileSpec, 'wb') as f:
+        f.write(text.encode('utf8'))
 
-    # Remove windows line endings
-    if universalEndline:
-        raw = raw.replace('\r\n', '\n')
 
-    # Encode to UTF-8
-    raw = raw.encode('utf8')
+######## ScrubSubtitles #######################################################
+# scan each subtitle (a srtstream.SubtitleCue) for profanity exactly once, yielding (subtitle, scrubbed text,
+# whether it was scrubbed). if stats (a dict) is specified, the number of words replaced is added to its "matches"
+def ScrubSubtitles(subs, matcher, stats=None):
+    if stats is None:
+        for sub in subs:
+            newText = matcher.Sub(sub.text)
+            yield sub, newText, (newText != sub.text)
+    else:
+        stats.setdefault('matches', 0)
+        for sub in subs:
+            newText, matches = matcher.Scrub(sub.text)
+            stats['matches'] += matches
+            yield sub, newText, (newText != sub.text)
+
+
+######## PadSubtitles #########################################################
+# look one subtitle ahead over the output of ScrubSubtitles, yielding (subtitle, scrubbed text, whether
+# it was scrubbed, whether it is included in the clean set). a subtitle is included if:
+#   it contains profanity, OR
+#   we have defined a pad, and
+#     the next subtitle contains profanity and lies within the pad, OR
+#     the previous subtitle contained profanity and lies within the pad
+def PadSubtitles(scrubbedSubs, padMillisec=0):
+    prevNaughtySub = None
+    for (sub, newText, subScrubbed), peek in pairwise(chain(scrubbedSubs, [None])):
+        subIncluded = subScrubbed or (
+            (padMillisec > 0)
+            and (
+                ((peek is not None) and peek[2] and ((peek[0].start - sub.end) <= padMillisec))
+                or ((prevNaughtySub is not None) and ((sub.start - prevNaughtySub.end) <= padMillisec))
+            )
+        )
+        yield sub, newText, subScrubbed, subIncluded
+        prevNaughtySub = sub if subScrubbed else None
+
+
+######## WriteSubRipItem ######################################################
+# write a single subtitle (a srtstream.SubtitleCue), followed by a blank line
+def WriteSubRipItem(subsFile, sub, eol=os.linesep):
+    subString = str(sub)
+    if eol != '\n':
+        subString = subString.replace('\n', eol)
+    subsFile.write(subString)
+    if not subString.endswith(2 * eol):
+        subsFile.write(eol)
+
+
+######## MergeIntervals #######################################################
+# sort and coalesce overlapping or adjacent (start, end) intervals
+def MergeIntervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and (start <= merged[-1][1]):
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+######## MuteFilters ##########################################################
+# ffmpeg audio filters muting each (start, end) millisecond interval of muteIntervals, either:
+#  - MUTE_FILTER_AFADE: a 10ms fade out at the start and fade in at the end of each interval (two
+#    afade filters per interval, the fade in is enabled until the next interval, or finalMillisec)
+#  - MUTE_FILTER_VOLUME: a single volume filter enabled during all of the intervals
+def MuteFilters(muteIntervals, finalMillisec=None, mode=MUTE_FILTER_AFADE):
+    result = []
+    if muteIntervals:
+        if mode == MUTE_FILTER_VOLUME:
+            result.append(
+                "volume=enable='"
+                + '+'.join(
+                    [f"between(t,{format(x[0] / 1000.0, '.3f')},{format(x[1] / 1000.0, '.3f')})" for x in muteIntervals]
+                )
+                + "':volume=0"
+            )
+        elif mode == MUTE_FILTER_AFADE:
+            if finalMillisec is None:
+                finalMillisec = muteIntervals[-1][1]
+            for interval, intervalPeek in pairwise(chain(muteIntervals, [(finalMillisec, None)])):
+                lineStart = format(interval[0] / 1000.0, '.3f')
+                lineEnd = format(interval[1] / 1000.0, '.3f')
+                lineStartPeek = format(intervalPeek[0] / 1000.0, '.3f')
+                result.append(f"afade=enable='between(t,{lineStart},{lineEnd})':t=out:st={lineStart}:d=10ms")
+                result.append(f"afade=enable='between(t,{lineEnd},{lineStartPeek})':t=in:st={lineEnd}:d=10ms")
+        else:
+            raise ValueError(f'Unknown mute filter mode {mode}')
+    return result
 
-    # Remove BOM
-    if raw.startswith(codecs.BOM_UTF8):
-        raw = raw.replace(codecs.BOM_UTF8, '', 1)
 
-    # Write to file
-    with open(fileSpec, 'wb') as f:
-        f.write(raw)
+######## AudioEncodeParams ####################################################
+# the audio parameters (e.g., "-c:a aac -ab 224k -ar 44100") as ffmpeg arguments, with the codec applied
+# to each of the output audio streams outputIdxs (e.g., "-c:a:0 aac -c:a:1 aac") rather than to every
+# audio stream in the output, so the others can be stream-copied
+def AudioEncodeParams(aParams, outputIdxs):
+    result = []
+    params = shlex.split(aParams)
+    idx = 0
+    while idx < len(params):
+        if re.fullmatch(r"-(c|codec):a(:\d+)?", params[idx]) and (idx + 1 < len(params)):
+            result.extend([x for outputIdx in outputIdxs for x in (f'-c:a:{outputIdx}', params[idx + 1])])
+            idx += 2
+        else:
+            result.append(params[idx])
+            idx += 1
+    return result
+
+
+######## AudioStreamMetadata ##################################################
+# filtered (or copied from a separately rendered file), the cleaned audio streams (cleanStreams, the
+# positions of those of audioStreams, which come first in the output) would lose the tags identifying
+# them (see AUDIO_STREAM_METADATA_TAGS), so they're set explicitly
+def AudioStreamMetadata(audioStreams, cleanStreams):
+    return [
+        x
+        for outputIdx, i in enumerate(cleanStreams)
+        for key, value in audioStreams[i].get('tags', {}).items()
+        if key.lower() in AUDIO_STREAM_METADATA_TAGS
+        for x in (f'-metadata:s:a:{outputIdx}', f'{key.lower()}={value}')
+    ]
+
+
+######## AudioStreamIndexes ###################################################
+# the audio stream index(es) to be cleaned, from an index, a list of them or a comma-separated
+# string of them (e.g., "1,3"), or None to choose automatically
+def AudioStreamIndexes(audioStreamIdx):
+    if (audioStreamIdx is None) or (audioStreamIdx == ''):
+        return None
+    elif isinstance(audioStreamIdx, (list, tuple)):
+        return [int(x) for x in audioStreamIdx]
+    elif isinstance(audioStreamIdx, str):
+        return [int(x) for x in audioStreamIdx.split(',') if x.strip()]
+    else:
+        return [int(audioStreamIdx)]
+
+
+######## ReadIncrementalSidecar ##############################################
+# the record of an output video written in incremental mode (see VidCleaner.MultiplexCleanVideo)
+def ReadIncrementalSidecar(sidecarFileSpec):
+    try:
+        with open(sidecarFileSpec, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+######## LoadSwearsMap #######################################################
+# read a profanity file (one word or phrase per line, with an optional "|replacement")
+def LoadSwearsMap(swearsFileSpec):
+    with open(swearsFileSpec) as f:
+        lineMaps = [line.rstrip('\n').split("|") for line in f]
+
+    # built in bulk, rather than a word at a time
+    return CaselessDictionary([(lineMap[0], lineMap[1] if len(lineMap) > 1 else "*****") for lineMap in lineMaps])
 
 
 #################################################################################
@@ -202,9 +764,14 @@ class VidCleaner(object):
     cleanSubsFileSpec = ""
     edlFileSpec = ""
     jsonFileSpec = ""
-    tmpSubsFileSpec = ""
-    assSubsFileSpec = ""
+    filterScriptFileSpec = ""
+    segmentsDirSpec = ""
+    chunksDirSpec = ""
     outputVidFileSpec = ""
+    spoolVidFileSpec = ""
+    cleanAudioFileSpec = ""
+    keepCleanAudio = False
+    extraOutputs = []
     swearsFileSpec = ""
     swearsPadMillisec = 0
     embedSubs = False
@@ -218,15 +785,37 @@ class VidCleaner(object):
     subsLang = SUBTITLE_DEFAULT_LANG
     vParams = VIDEO_DEFAULT_PARAMS
     audioStreamIdx = None
+    audioStreamLang = None
     aParams = AUDIO_DEFAULT_PARAMS
     aDownmix = False
     threadsInput = None
     threadsEncoding = None
     plexAutoSkipJson = ""
     plexAutoSkipId = ""
-    swearsMap = CaselessDictionary({})
+    probeCacheDir = None
+    swearsCacheDir = None
+    swearsMap = None
+    swearsMatcher = None
     muteTimeList = []
+    muteIntervals = []
+    muteFilterMode = MUTE_FILTER_AFADE
+    filterScript = False
+    segmentAudio = False
+    segmentMarginSec = AUDIO_SEGMENT_DEFAULT_MARGIN_SEC
+    chunkedVideo = False
+    chunkSec = VIDEO_CHUNK_DEFAULT_SEC
+    chunkWorkers = None
+    resultCache = None
+    outputFromCache = False
+    incremental = False
+    muteFinalMillisec = None
+    refineMutes = False
+    refineMarginMillisec = 0
+    refineWorkers = None
+    wordAligner = None
     jsonDumpList = None
+    progressCallback = None
+    stageTimer = None
 
     ######## init #################################################################
 
@@ -255,6 +844,31 @@ class VidCleaner(object):
         threadsEncoding=None,
         plexAutoSkipJson="",
         plexAutoSkipId="",
+        probeCacheDir=None,
+        swearsMap=None,
+        swearsCacheDir=None,
+        muteFilterMode=MUTE_FILTER_AFADE,
+        filterScript=False,
+        segmentAudio=False,
+        segmentMarginSec=AUDIO_SEGMENT_DEFAULT_MARGIN_SEC,
+        chunkedVideo=False,
+        chunkSec=VIDEO_CHUNK_DEFAULT_SEC,
+        chunkWorkers=None,
+        resultCacheDir=None,
+        resultCacheMaxMB=RESULT_CACHE_DEFAULT_MAX_MB,
+        incremental=False,
+        progressCallback=None,
+        spoolVidFileSpec=None,
+        stageTimer=None,
+        swearsMatcher=None,
+        extraOutputs=None,
+        cleanAudioFileSpec=None,
+        audioStreamLang=None,
+        refineMutes=False,
+        refineMarginSec=REFINE_DEFAULT_MARGIN_SEC,
+        refineAligner=WORD_ALIGNER_DEFAULT,
+        refineModel=None,
+        refineWorkers=None,
     ):
         if (iVidFileSpec is not None) and os.path.isfile(iVidFileSpec):
             self.inputVidFileSpec = iVidFileSpec
@@ -271,7 +885,8 @@ class VidCleaner(object):
 
         if (oVidFileSpec is not None) and (len(oVidFileSpec) > 0):
             self.outputVidFileSpec = oVidFileSpec
-            if os.path.isfile(self.outputVidFileSpec):
+            # with a result cache or in incremental mode, an existing output video may still be valid (see MultiplexCleanVideo)
+            if os.path.isfile(self.outputVidFileSpec) and (not resultCacheDir) and (not incremental):
                 os.remove(self.outputVidFileSpec)
 
         if (oSubsFileSpec is not None) and (len(oSubsFileSpec) > 0):
@@ -292,11 +907,45 @@ class VidCleaner(object):
         self.hardCode = hardCode
         self.subsLang = subsLang
         self.vParams = vParams
-        self.audioStreamIdx = audioStreamIdx
+        self.audioStreamIdx = AudioStreamIndexes(audioStreamIdx)
+        self.audioStreamLang = audioStreamLang if audioStreamLang else None
         self.aParams = aParams
         self.aDownmix = aDownmix
         self.threadsInput = threadsInput
         self.threadsEncoding = threadsEncoding
+        self.probeCacheDir = probeCacheDir
+        self.swearsMap = swearsMap
+        self.swearsCacheDir = swearsCacheDir
+        self.muteFilterMode = muteFilterMode
+        self.filterScript = filterScript
+        self.segmentAudio = segmentAudio
+        self.segmentMarginSec = segmentMarginSec
+        self.chunkedVideo = chunkedVideo
+        self.chunkSec = chunkSec
+        self.chunkWorkers = chunkWorkers
+        self.resultCache = ResultCache(resultCacheDir, resultCacheMaxMB) if resultCacheDir else None
+        self.incremental = incremental
+        self.progressCallback = progressCallback
+        self.stageTimer = stageTimer
+        self.swearsMatcher = swearsMatcher
+        self.refineMutes = refineMutes
+        self.refineMarginMillisec = round(refineMarginSec * 1000.0)
+        self.refineWorkers = refineWorkers if refineWorkers else (os.cpu_count() or 1)
+        if self.refineMutes:
+            # (before anything is done, if it or what it needs is missing)
+            self.wordAligner = GetWordAligner(refineAligner, refineModel, self.refineWorkers)
+        if (spoolVidFileSpec is not None) and os.path.isfile(spoolVidFileSpec):
+            self.spoolVidFileSpec = spoolVidFileSpec
+        # (output video, downmix) of each extra output (see ExtraOutputsSteps)
+        self.extraOutputs = [(x, bool(downmix)) for x, downmix in extraOutputs] if extraOutputs else []
+        for extraOutput, downmix in self.extraOutputs:
+            if os.path.isfile(extraOutput) and (not resultCacheDir) and (not incremental):
+                os.remove(extraOutput)
+        if cleanAudioFileSpec:
+            self.cleanAudioFileSpec = cleanAudioFileSpec
+            self.keepCleanAudio = True
+        elif self.extraOutputs and self.outputVidFileSpec:
+            self.cleanAudioFileSpec = self.outputVidFileSpec + CLEAN_AUDIO_SUFFIX
         if self.vParams.startswith('base64:'):
             self.vParams = base64.b64decode(self.vParams[7:]).decode('utf-8')
         if self.aParams.startswith('base64:'):
@@ -311,13 +960,33 @@ class VidCleaner(object):
                 os.remove(self.edlFileSpec)
             if os.path.isfile(self.jsonFileSpec):
                 os.remove(self.jsonFileSpec)
-        if os.path.isfile(self.tmpSubsFileSpec):
-            os.remove(self.tmpSubsFileSpec)
-        if os.path.isfile(self.assSubsFileSpec):
-            os.remove(self.assSubsFileSpec)
+        self.RemoveIntermediateFiles()
+
+    ######## RemoveIntermediateFiles ##############################################
+    def RemoveIntermediateFiles(self):
+        if os.path.isfile(self.spoolVidFileSpec):
+            os.remove(self.spoolVidFileSpec)
+        if os.path.isfile(self.filterScriptFileSpec):
+            os.remove(self.filterScriptFileSpec)
+        if os.path.isdir(self.segmentsDirSpec):
+            shutil.rmtree(self.segmentsDirSpec, ignore_errors=True)
+        if os.path.isdir(self.chunksDirSpec):
+            shutil.rmtree(self.chunksDirSpec, ignore_errors=True)
+        if (not self.keepCleanAudio) and os.path.isfile(self.cleanAudioFileSpec):
+            os.remove(self.cleanAudioFileSpec)
 
     ######## CreateCleanSubAndMuteList #################################################
     def CreateCleanSubAndMuteList(self):
+        if (candidates := self.CreateCleanSub()) is not None:
+            with TimedStage(self.stageTimer, 'refine', python=True) as stage:
+                self.muteIntervals = RunFFSteps(self.RefineMuteSteps(candidates, stage), self.progressCallback)
+        self.WriteMuteLists()
+
+    ######## CreateCleanSub ############################################################
+    # scrub the input subtitles, writing the clean subtitles and determining the mute regions (one for each
+    # subtitle with profanity, padded, and any others within the pad of one). returns the subtitles to be
+    # muted as candidates for RefineMuteSteps, if the mute regions are to be refined, otherwise None
+    def CreateCleanSub(self):
         if (self.inputSubsFileSpec is None) or (not os.path.isfile(self.inputSubsFileSpec)):
             raise IOError(
                 errno.ENOENT,
@@ -327,10 +996,6 @@ class VidCleaner(object):
 
         subFileParts = os.path.splitext(self.inputSubsFileSpec)
 
-        self.tmpSubsFileSpec = subFileParts[0] + "_utf8" + subFileParts[1]
-        shutil.copy2(self.inputSubsFileSpec, self.tmpSubsFileSpec)
-        UTF8Convert(self.tmpSubsFileSpec)
-
         if not self.cleanSubsFileSpec:
             self.cleanSubsFileSpec = subFileParts[0] + "_clean" + subFileParts[1]
 
@@ -342,187 +1007,504 @@ class VidCleaner(object):
             cleanSubFileParts = os.path.splitext(self.cleanSubsFileSpec)
             self.jsonFileSpec = cleanSubFileParts[0] + '.json'
 
-        lines = []
+        # a matcher already built for swearsMap (e.g., by a long-running server) is used as is
+        if self.swearsMatcher is not None:
+            matcher = self.swearsMatcher
+        else:
+            if self.swearsMap is None:
+                with TimedStage(self.stageTimer, 'load_swears', python=True) as stage:
+                    self.swearsMap = LoadSwearsMap(self.swearsFileSpec)
+                    stage['bytes_read'] = FileBytes(self.swearsFileSpec)
+            with TimedStage(self.stageTimer, 'matcher', python=True):
+                matcher = GetSwearsMatcher(self.swearsMap, self.swearsCacheDir)
+
+        # the scrubbed subtitles and mute regions depend only on the input subtitles, the profanity
+        # list and the scrubbing options, so with a result cache they're only computed once
+        scrubKey = None
+        scrubMeta = None
+        if self.resultCache:
+            with TimedStage(self.stageTimer, 'scrub_cache', python=True) as stage:
+                scrubKey = CacheKey(
+                    'scrub',
+                    FileDigest(self.inputSubsFileSpec),
+                    matcher.digest,
+                    self.swearsPadMillisec,
+                    self.fullSubs,
+                )
+                if (
+                    (scrubMeta := self.resultCache.Get(scrubKey))
+                    and ('candidates' in scrubMeta)
+                    and (cachedSubsFileSpec := self.resultCache.GetFile(scrubKey, 'clean.srt'))
+                ):
+                    shutil.copyfile(cachedSubsFileSpec, self.cleanSubsFileSpec)
+                else:
+                    scrubMeta = None
+                stage['hit'] = scrubMeta is not None
+
+        if scrubMeta is None:
+            newTimestampPairs = []
+            # [start, end, where its profanity is in it (see WordFractions) and its text (without markup), or
+            # None and None if it has none] of each subtitle to be muted
+            candidates = []
+            lastSubEndMillisec = 0
+            edits = []
+
+            # the input's encoding is detected (if need be) up front, and then it's decoded and parsed as
+            # it's read, rather than converted to a UTF-8 copy or read into memory whole first
+            with TimedStage(self.stageTimer, 'decode', python=True) as stage:
+                subsEncoding = SubtitleEncoding(self.inputSubsFileSpec)
+                stage['bytes_read'] = FileBytes(self.inputSubsFileSpec)
+
+            # each subtitle is read, scanned for profanity and written out once, in a single pass, holding
+            # no more than the subtitle (and the one after it) at a time
+            scrubStage = TimedStage(self.stageTimer, 'scrub', python=True, cues=0, scrubbed_cues=0, included_cues=0)
+            with scrubStage as stage, OpenSubtitleText(self.inputSubsFileSpec, encoding=subsEncoding) as subsFile, open(
+                self.cleanSubsFileSpec, 'w', encoding='utf-8', newline=''
+            ) as cleanSubsFile:
+                for sub, newText, subScrubbed, subIncluded in PadSubtitles(
+                    ScrubSubtitles(StreamSubtitles(subsFile), matcher, stage),
+                    self.swearsPadMillisec,
+                ):
+                    lastSubEndMillisec = sub.end
+                    stage['cues'] += 1
+                    stage['scrubbed_cues'] += int(subScrubbed)
+                    stage['included_cues'] += int(subIncluded)
+                    if subIncluded:
+                        if subScrubbed:
+                            candidates.append(
+                                [
+                                    sub.start,
+                                    sub.end,
+                                    WordFractions(sub.text, matcher.regex),
+                                    SUBTITLE_TAGS_REGEX.sub('', sub.text),
+                                ]
+                            )
+                            edits.append(
+                                {
+                                    'old': sub.text,
+                                    'new': newText,
+                                    'start': FormatSrtTime(sub.start),
+                                    'end': FormatSrtTime(sub.end),
+                                }
+                            )
+                        newSub = sub
+                        newSub.text = newText
+                        WriteSubRipItem(cleanSubsFile, newSub)
+                        if subScrubbed:
+                            newTimestampPairs.append(
+                                (
+                                    max(sub.start - self.swearsPadMillisec, 0),
+                                    sub.end + self.swearsPadMillisec,
+                                )
+                            )
+                        else:
+                            newTimestampPairs.append((sub.start, sub.end))
+                            candidates.append([sub.start, sub.end, None, None])
+                    elif self.fullSubs:
+                        WriteSubRipItem(cleanSubsFile, sub)
+            stage['bytes_written'] = FileBytes(self.cleanSubsFileSpec)
+
+            # overlapping and adjacent mute regions (e.g., padded neighbors) are coalesced, so the
+            # audio filter, EDL and PlexAutoSkip outputs scale with merged regions rather than cues
+            scrubMeta = {
+                'edits': edits,
+                'muteIntervals': MergeIntervals(newTimestampPairs),
+                'candidates': candidates,
+                'lastSubEndMillisec': lastSubEndMillisec,
+            }
+            if self.resultCache:
+                self.resultCache.Put(scrubKey, scrubMeta, {'clean.srt': self.cleanSubsFileSpec})
 
-        with open(self.swearsFileSpec) as f:
-            lines = [line.rstrip('\n') for line in f]
+        if self.jsonDumpList is not None:
+            self.jsonDumpList.extend(scrubMeta['edits'])
+        self.muteIntervals = [tuple(x) for x in scrubMeta['muteIntervals']]
+        # the fade-in after the last mute region ends two seconds past the last subtitle
+        self.muteFinalMillisec = scrubMeta['lastSubEndMillisec'] + 2000
 
-        for line in lines:
-            lineMap = line.split("|")
-            if len(lineMap) > 1:
-                self.swearsMap[lineMap[0]] = lineMap[1]
-            else:
-                self.swearsMap[lineMap[0]] = "*****"
+        return scrubMeta['candidates'] if self.refineMutes and self.muteIntervals else None
 
-        replacer = re.compile(r'\b(' + '|'.join(self.swearsMap.keys()) + r')\b', re.IGNORECASE)
+    ######## WriteMuteLists ############################################################
+    # the mute regions' outputs: the JSON dump, the audio filters and the EDL and PlexAutoSkip files
+    def WriteMuteLists(self):
+        if self.jsonDumpList is not None:
+            with TimedStage(self.stageTimer, 'json_dump', python=True) as stage:
+                self.WriteJsonDump()
+                stage['bytes_written'] = FileBytes(self.jsonFileSpec)
+        with TimedStage(self.stageTimer, 'mute_filters', python=True) as stage:
+            self.muteTimeList = MuteFilters(self.muteIntervals, self.muteFinalMillisec, self.muteFilterMode)
+            stage['mute_intervals'] = len(self.muteIntervals)
+            stage['filters'] = len(self.muteTimeList)
+        if self.edl:
+            with TimedStage(self.stageTimer, 'edl', python=True) as stage:
+                self.WriteEdl()
+                stage['bytes_written'] = FileBytes(self.edlFileSpec)
+        if self.plexAutoSkipId and self.plexAutoSkipJson:
+            with TimedStage(self.stageTimer, 'plex_auto_skip', python=True) as stage:
+                self.WritePlexAutoSkipJson()
+                stage['bytes_written'] = FileBytes(self.plexAutoSkipJson)
+
+    ######## WriteJsonDump #########################################################
+    def WriteJsonDump(self):
+        with open(self.jsonFileSpec, "w") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "now": datetime.now().isoformat(),
+                        "edits": self.jsonDumpList,
+                        "mute": [[x[0] / 1000.0, x[1] / 1000.0] for x in self.muteIntervals],
+                        "media": {
+                            "input": self.inputVidFileSpec,
+                            "output": self.outputVidFileSpec,
+                            "ffprobe": GetFormatAndStreamInfo(self.inputVidFileSpec, self.probeCacheDir),
+                        },
+                        "subtitles": {
+                            "input": self.inputSubsFileSpec,
+                            "output": self.cleanSubsFileSpec,
+                        },
+                    },
+                    indent=4,
+                )
+            )
 
-        subs = pysrt.open(self.tmpSubsFileSpec)
-        newSubs = pysrt.SubRipFile()
-        newTimestampPairs = []
+    ######## WriteEdl ##############################################################
+    def WriteEdl(self):
+        edlLines = [
+            f"{format(startMillisec / 1000.0, '.1f')}\t{format(endMillisec / 1000.0, '.3f')}\t1"
+            for startMillisec, endMillisec in self.muteIntervals
+        ]
+        if len(edlLines) > 0:
+            with open(self.edlFileSpec, 'w') as edlFile:
+                for item in edlLines:
+                    edlFile.write(f"{item}\n")
 
-        # append a dummy sub at the very end so that pairwise can peek and see nothing
-        subs.append(
-            pysrt.SubRipItem(
-                index=len(subs) + 1,
-                start=(subs[-1].end.seconds if subs else 0) + 1,
-                end=(subs[-1].end.seconds if subs else 0) + 2,
-                text='Fin',
-            )
+    ######## WritePlexAutoSkipJson #################################################
+    def WritePlexAutoSkipJson(self):
+        plexDict = json.loads(PLEX_AUTO_SKIP_DEFAULT_CONFIG)
+        plexDict["markers"][self.plexAutoSkipId] = [
+            {"start": startMillisec, "end": endMillisec, "mode": "volume"}
+            for startMillisec, endMillisec in self.muteIntervals
+        ]
+        plexDict["mode"][self.plexAutoSkipId] = "volume"
+        if len(plexDict["markers"][self.plexAutoSkipId]) > 0:
+            with open(self.plexAutoSkipJson, 'w') as f:
+                json.dump(plexDict, f, indent=4)
+
+    ######## MuxKey ################################################################
+    # a key identifying everything that goes into the output video: the input video (by path, size and
+    # modification time), the mute regions, the clean subtitles (if they're embedded or burned in) and
+    # the options and ffmpeg parameters. the profanity list and input subtitles only matter insofar as
+    # they change the mute regions or clean subtitles, so most titles' output remains valid when words are
+    # added to the list
+    def MuxKey(self):
+        return CacheKey(
+            'mux',
+            ProbeCacheKey(self.inputVidFileSpec),
+            os.path.abspath(self.outputVidFileSpec),
+            self.muteIntervals,
+            self.muteFinalMillisec,
+            (
+                FileDigest(self.cleanSubsFileSpec)
+                if (self.embedSubs or self.hardCode) and os.path.isfile(self.cleanSubsFileSpec)
+                else None
+            ),
+            self.subsOnly,
+            self.embedSubs,
+            self.subsLang,
+            self.reEncodeVideo,
+            self.reEncodeAudio,
+            self.hardCode,
+            self.vParams,
+            self.audioStreamIdx,
+            self.audioStreamLang,
+            self.aParams,
+            self.aDownmix,
+            self.muteFilterMode,
+            self.segmentAudio,
+            self.segmentMarginSec,
+            self.chunkedVideo,
+            self.chunkSec,
+            [[os.path.abspath(x), downmix] for x, downmix in self.extraOutputs],
+            os.path.abspath(self.cleanAudioFileSpec) if self.keepCleanAudio else None,
         )
 
-        # for each subtitle in the set
-        # if text contains profanity...
-        # OR if the next text contains profanity and lies within the pad ...
-        # OR if the previous text contained profanity and lies within the pad ...
-        # then include the subtitle in the new set
-        prevNaughtySub = None
-        for sub, subPeek in pairwise(subs):
-            newText = replacer.sub(lambda x: self.swearsMap[x.group()], sub.text)
-            newTextPeek = (
-                replacer.sub(lambda x: self.swearsMap[x.group()], subPeek.text) if (subPeek is not None) else None
+    ######## CreateCleanSubAndMuteListAsync ######################################
+    # scrubbing is pure Python, so it's run on a thread rather than blocking the event loop. it can't be
+    # interrupted, so if this is cancelled the thread is allowed to finish before the cancellation propagates.
+    # refining the mute regions runs ffmpeg processes, each subject to limiter (see ffrunner.RunFFAsync)
+    async def CreateCleanSubAndMuteListAsync(self, limiter=None):
+        import asyncio
+
+        async def _onThread(func):
+            future = asyncio.get_running_loop().run_in_executor(None, func)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                await asyncio.wait([future])
+                raise
+
+        if (self.jsonDumpList is not None) or self.refineMutes:
+            # the JSON dump includes the probe, and refining needs the audio streams, which are probed here
+            # rather than (blocking) on the thread or the event loop
+            await GetMediaProbeAsync(self.inputVidFileSpec, self.probeCacheDir, limiter)
+            await GetMediaProbeAsync(self.MediaInput(), self.probeCacheDir, limiter)
+        if (candidates := await _onThread(self.CreateCleanSub)) is not None:
+            with TimedStage(self.stageTimer, 'refine', python=True) as stage:
+                self.muteIntervals = await RunFFStepsAsync(
+                    self.RefineMuteSteps(candidates, stage), self.progressCallback, limiter
+                )
+        await _onThread(self.WriteMuteLists)
+
+    ######## RefineAudioStream ####################################################
+    # the position among the input's audioStreams of the one whose speech the mute regions are refined by:
+    # the (first) one to be cleaned, if they're specified, otherwise the default one
+    def RefineAudioStream(self, audioStreams):
+        if (self.audioStreamIdx is not None) or self.audioStreamLang or (len(audioStreams) == 1):
+            return self.AudioStreamSelection(audioStreams)[0]
+        return next((i for i, x in enumerate(audioStreams) if x.get('disposition', {}).get('default', 0)), 0)
+
+    ######## RefineMuteSteps ######################################################
+    # the steps (see ffrunner.FFJobs) refining the mute region of each subtitle with profanity (of candidates,
+    # see CreateCleanSub) to just the profanity in it. only the audio during those subtitles (and
+    # REFINE_CONTEXT_MILLISEC either side) is decoded, by ffmpeg processes of REFINE_BATCH_CUES subtitles each,
+    # refineWorkers (--refine-workers) at once, and each round of them is aligned by the word aligner (see
+    # wordaligner.EnergyAligner) and discarded before the next, so no more than that is ever held. with a result
+    # cache, the title's alignments are kept (by aligner and subtitle), so a re-run (e.g., with another --pad or
+    # profanity list) only decodes and aligns subtitles it hasn't before. subtitles in which too little speech is
+    # found (or whose audio can't be decoded) keep their whole mute regions. returns the mute regions, and adds
+    # what was done to stage's counters
+    def RefineMuteSteps(self, candidates, stage=None):
+        stage = stage if stage is not None else dict()
+        inputProbe = GetMediaProbe(self.inputVidFileSpec, self.probeCacheDir)
+        audioStreams = inputProbe.Streams('audio') if inputProbe else []
+        audioStreamOnlyIndex = self.RefineAudioStream(audioStreams) if audioStreams else None
+        toRefine = [x for x in candidates if x[2] is not None]
+        stage['candidates'] = len(toRefine)
+        stage['refined'] = 0
+        stage['decoded_seconds'] = 0.0
+        stage['decode_failures'] = 0
+
+        # the alignment of each subtitle (see wordaligner.EnergyAligner.Align), by the subtitle
+        cueKeys = [json.dumps(x) for x in toRefine]
+        alignments = dict()
+        alignKey = None
+        if self.resultCache and (audioStreamOnlyIndex is not None):
+            alignKey = CacheKey(
+                'align',
+                ProbeCacheKey(self.inputVidFileSpec),
+                audioStreamOnlyIndex,
+                self.wordAligner.digest,
+                self.refineMarginMillisec,
             )
-            # this sub contains profanity, or
-            if (
-                (newText != sub.text)
-                or
-                # we have defined a pad, and
-                (
-                    (self.swearsPadMillisec > 0)
-                    and (newTextPeek is not None)
-                    and
-                    # the next sub contains profanity and is within pad seconds of this one, or
-                    (
-                        (
-                            (newTextPeek != subPeek.text)
-                            and ((subPeek.start.ordinal - sub.end.ordinal) <= self.swearsPadMillisec)
-                        )
-                        or
-                        # the previous sub contained profanity and is within pad seconds of this one
-                        (
-                            (prevNaughtySub is not None)
-                            and ((sub.start.ordinal - prevNaughtySub.end.ordinal) <= self.swearsPadMillisec)
+            if alignMeta := self.resultCache.Get(alignKey):
+                alignments = alignMeta.get('alignments', dict())
+            stage['cached'] = len([x for x in cueKeys if x in alignments])
+
+        toAlign = [i for i, x in enumerate(cueKeys) if x not in alignments]
+        if toAlign and (audioStreamOnlyIndex is not None):
+            workers = self.refineWorkers
+            with tempfile.TemporaryDirectory(prefix='cleanvid_refine_') as refineDirSpec:
+                for roundStart in range(0, len(toAlign), REFINE_BATCH_CUES * workers):
+                    roundCues = toAlign[roundStart : roundStart + REFINE_BATCH_CUES * workers]
+                    jobs = []
+                    batches = []
+                    for batchStart in range(0, len(roundCues), REFINE_BATCH_CUES):
+                        batch = roundCues[batchStart : batchStart + REFINE_BATCH_CUES]
+                        batchFirst = roundStart + batchStart + 1
+                        inputArgs = []
+                        outputArgs = []
+                        for inputIdx, cueIdx in enumerate(batch):
+                            start, end, fractions, text = toRefine[cueIdx]
+                            decodeStart = max(0, start - REFINE_CONTEXT_MILLISEC)
+                            inputArgs += ['-ss', format(decodeStart / 1000.0, '.3f')]
+                            inputArgs += ['-t', format((end + REFINE_CONTEXT_MILLISEC - decodeStart) / 1000.0, '.3f')]
+                            inputArgs += ['-i', self.MediaInput()]
+                            outputArgs += ['-map', f'{inputIdx}:a:{audioStreamOnlyIndex}', '-ac', '1']
+                            outputArgs += ['-ar', str(REFINE_SAMPLE_RATE), '-c:a', 'pcm_s16le', '-f', 's16le']
+                            outputArgs += [os.path.join(refineDirSpec, f'{cueIdx}.pcm')]
+                        batches.append(batch)
+                        jobs.append(
+                            self.FFmpegJob(
+                                ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y']
+                                + ([] if self.threadsInput is None else ['-threads', str(int(self.threadsInput))])
+                                + inputArgs
+                                + outputArgs,
+                                f'refine {batchFirst}-{batchFirst + len(batch) - 1}/{len(toAlign)}',
+                                duration=max([(toRefine[x][1] - toRefine[x][0]) / 1000.0 for x in batch]),
+                            )
                         )
+                    ffmpegResults = yield FFJobs(jobs, workers=workers)
+
+                    pcmFileSpecs = []
+                    for batch, ffmpegResult in zip(batches, ffmpegResults):
+                        batchFileSpecs = [os.path.join(refineDirSpec, f'{x}.pcm') for x in batch]
+                        if (ffmpegResult.return_code != 0) or (not all([os.path.isfile(x) for x in batchFileSpecs])):
+                            # (these subtitles just aren't refined, so this is only reported, on stderr)
+                            stage['decode_failures'] += 1
+                            print(ffmpegResult.cmd, file=sys.stderr)
+                            print(ffmpegResult.err, file=sys.stderr)
+                            pcmFileSpecs.extend([None] * len(batch))
+                        else:
+                            stage['decoded_seconds'] += (
+                                sum([os.path.getsize(x) for x in batchFileSpecs]) / 2 / REFINE_SAMPLE_RATE
+                            )
+                            pcmFileSpecs.extend(batchFileSpecs)
+
+                    # (the aligner may take a while, so it's run on a thread by RunFFStepsAsync)
+                    roundAlignments = yield FFCall(
+                        self.wordAligner.Align,
+                        [toRefine[x] for x in roundCues],
+                        pcmFileSpecs,
+                        self.refineMarginMillisec,
+                        stage,
                     )
-                )
-            ):
-                subScrubbed = newText != sub.text
-                if subScrubbed and (self.jsonDumpList is not None):
-                    self.jsonDumpList.append(
-                        {
-                            'old': sub.text,
-                            'new': newText,
-                            'start': str(sub.start),
-                            'end': str(sub.end),
-                        }
-                    )
-                newSub = sub
-                newSub.text = newText
-                newSubs.append(newSub)
-                if subScrubbed:
-                    prevNaughtySub = sub
-                    newTimes = [
-                        pysrt.SubRipTime.from_ordinal(sub.start.ordinal - self.swearsPadMillisec).to_time(),
-                        pysrt.SubRipTime.from_ordinal(sub.end.ordinal + self.swearsPadMillisec).to_time(),
-                    ]
-                else:
-                    prevNaughtySub = None
-                    newTimes = [sub.start.to_time(), sub.end.to_time()]
-                newTimestampPairs.append(newTimes)
+                    for cueIdx, pcmFileSpec, alignment in zip(roundCues, pcmFileSpecs, roundAlignments):
+                        # (a subtitle whose audio couldn't be decoded isn't remembered as not alignable)
+                        if pcmFileSpec:
+                            alignments[cueKeys[cueIdx]] = alignment
+                            os.remove(pcmFileSpec)
+
+            if alignKey:
+                self.resultCache.Put(alignKey, {'alignments': alignments})
+
+        # the subtitles within the pad of one with profanity are muted whole, as they are without refining,
+        # as are those with profanity that couldn't be aligned
+        intervals = [(start, end) for start, end, fractions, text in candidates if fractions is None]
+        for (start, end, fractions, text), cueKey in zip(toRefine, cueKeys):
+            if (cueIntervals := alignments.get(cueKey, None)) is None:
+                cueIntervals = [(start, end)]
             else:
-                if self.fullSubs:
-                    newSubs.append(sub)
-                prevNaughtySub = None
-
-        newSubs.save(self.cleanSubsFileSpec)
-        if self.jsonDumpList is not None:
-            with open(self.jsonFileSpec, "w") as f:
-                f.write(
-                    json.dumps(
-                        {
-                            "now": datetime.now().isoformat(),
-                            "edits": self.jsonDumpList,
-                            "media": {
-                                "input": self.inputVidFileSpec,
-                                "output": self.outputVidFileSpec,
-                                "ffprobe": GetFormatAndStreamInfo(self.inputVidFileSpec),
-                            },
-                            "subtitles": {
-                                "input": self.inputSubsFileSpec,
-                                "output": self.cleanSubsFileSpec,
-                            },
-                        },
-                        indent=4,
-                    )
-                )
-
-        self.muteTimeList = []
-        edlLines = []
-        plexDict = json.loads(PLEX_AUTO_SKIP_DEFAULT_CONFIG) if self.plexAutoSkipId and self.plexAutoSkipJson else None
-
-        if plexDict:
-            plexDict["markers"][self.plexAutoSkipId] = []
-            plexDict["mode"][self.plexAutoSkipId] = "volume"
-
-        # Append one at the very end of the file to work with pairwise
-        newTimes = [pysrt.SubRipTime.from_ordinal(subs[-1].end.ordinal).to_time(), None]
-        newTimestampPairs.append(newTimes)
-
-        for timePair, timePairPeek in pairwise(newTimestampPairs):
-            lineStart = (
-                (timePair[0].hour * 60.0 * 60.0)
-                + (timePair[0].minute * 60.0)
-                + timePair[0].second
-                + (timePair[0].microsecond / 1000000.0)
-            )
-            lineEnd = (
-                (timePair[1].hour * 60.0 * 60.0)
-                + (timePair[1].minute * 60.0)
-                + timePair[1].second
-                + (timePair[1].microsecond / 1000000.0)
-            )
-            lineStartPeek = (
-                (timePairPeek[0].hour * 60.0 * 60.0)
-                + (timePairPeek[0].minute * 60.0)
-                + timePairPeek[0].second
-                + (timePairPeek[0].microsecond / 1000000.0)
-            )
-            self.muteTimeList.append(
-                "afade=enable='between(t,"
-                + format(lineStart, '.3f')
-                + ","
-                + format(lineEnd, '.3f')
-                + ")':t=out:st="
-                + format(lineStart, '.3f')
-                + ":d=10ms"
-            )
-            self.muteTimeList.append(
-                "afade=enable='between(t,"
-                + format(lineEnd, '.3f')
-                + ","
-                + format(lineStartPeek, '.3f')
-                + ")':t=in:st="
-                + format(lineEnd, '.3f')
-                + ":d=10ms"
-            )
-            if self.edl:
-                edlLines.append(f"{format(lineStart, '.1f')}\t{format(lineEnd, '.3f')}\t1")
-            if plexDict:
-                plexDict["markers"][self.plexAutoSkipId].append(
-                    {"start": round(lineStart * 1000.0), "end": round(lineEnd * 1000.0), "mode": "volume"}
-                )
-        if self.edl and (len(edlLines) > 0):
-            with open(self.edlFileSpec, 'w') as edlFile:
-                for item in edlLines:
-                    edlFile.write(f"{item}\n")
-        if plexDict and (len(plexDict["markers"][self.plexAutoSkipId]) > 0):
-            json.dump(
-                plexDict,
-                open(self.plexAutoSkipJson, 'w'),
-                indent=4,
+                stage['refined'] += 1
+            intervals.extend(
+                [(max(x[0] - self.swearsPadMillisec, 0), x[1] + self.swearsPadMillisec) for x in cueIntervals]
             )
+        result = MergeIntervals(intervals)
+        stage['mute_seconds'] = sum([x[1] - x[0] for x in self.muteIntervals]) / 1000.0
+        stage['refined_mute_seconds'] = sum([x[1] - x[0] for x in result]) / 1000.0
+        return result
 
     ######## MultiplexCleanVideo ###################################################
     def MultiplexCleanVideo(self):
+        try:
+            if self.stageTimer and (not self.subsOnly):
+                # probed up front so that it's timed on its own, the steps' own probes are then answered from the cache
+                with TimedStage(self.stageTimer, 'probe'):
+                    GetMediaProbe(self.inputVidFileSpec, self.probeCacheDir)
+                    probe = GetMediaProbe(self.MediaInput(), self.probeCacheDir)
+                    if probe and self.chunkedVideo and (self.reEncodeVideo or self.hardCode):
+                        probe.KeyframeTimes()
+            with TimedStage(self.stageTimer, 'multiplex', bytes_read=FileBytes(self.MediaInput())) as stage:
+                RunFFSteps(self.MultiplexSteps(), self.progressCallback)
+                self.MultiplexStageCounters(stage)
+        finally:
+            self.RemoveIntermediateFiles()
+
+    ######## MultiplexCleanVideoAsync ##############################################
+    # the asyncio counterpart of MultiplexCleanVideo, whose ffmpeg processes are each subject to limiter
+    # (see ffrunner.RunFFAsync). if this is cancelled, the running processes are killed and the partial
+    # output video and intermediate files are removed
+    async def MultiplexCleanVideoAsync(self, limiter=None):
+        try:
+            if self.stageTimer and (not self.subsOnly):
+                # probed up front so that it's timed on its own, the steps' own probes are then answered from the cache
+                with TimedStage(self.stageTimer, 'probe'):
+                    await GetMediaProbeAsync(self.inputVidFileSpec, self.probeCacheDir, limiter)
+                    probe = await GetMediaProbeAsync(self.MediaInput(), self.probeCacheDir, limiter)
+                    if probe and self.chunkedVideo and (self.reEncodeVideo or self.hardCode):
+                        await probe.KeyframeTimesAsync(limiter)
+            with TimedStage(self.stageTimer, 'multiplex', bytes_read=FileBytes(self.MediaInput())) as stage:
+                await RunFFStepsAsync(self.MultiplexSteps(), self.progressCallback, limiter)
+                self.MultiplexStageCounters(stage)
+        finally:
+            self.RemoveIntermediateFiles()
+
+    ######## MultiplexStageCounters ###############################################
+    # what MultiplexCleanVideo did, for its stage record (see stagetimer.StageTimer). its bytes_read is the
+    # size of its input, which (other than for a subtitle-only title) ffmpeg reads in its entirety
+    def MultiplexStageCounters(self, stage):
+        stage['reused'] = self.outputFromCache
+        stage['unaltered'] = self.unalteredVideo
+        if self.unalteredVideo:
+            stage['bytes_read'] = 0
+        stage['bytes_written'] = (
+            FileBytes(self.outputVidFileSpec) if (not self.outputFromCache) and (not self.unalteredVideo) else 0
+        )
+        stage['mute_intervals'] = len(self.muteIntervals)
+
+    ######## MediaInput ###########################################################
+    # the file the video and audio are read from to be multiplexed: the local spool of the input's
+    # video and audio written while its subtitles were extracted, if there is one, otherwise the input
+    def MediaInput(self):
+        return self.spoolVidFileSpec if os.path.isfile(self.spoolVidFileSpec) else self.inputVidFileSpec
+
+    ######## AudioStreamSelection #################################################
+    # the positions among the input's audioStreams (e.g., 1 for 0:a:1) of those to be cleaned: those with
+    # the specified audio stream index(es), those tagged with the specified language, or the only one
+    def AudioStreamSelection(self, audioStreams):
+        if len(audioStreams) == 0:
+            raise ValueError(f'No audio streams found in {self.inputVidFileSpec}')
+        if self.audioStreamIdx is not None:
+            result = []
+            for audioStreamIdx in self.audioStreamIdx:
+                audioStreamOnlyIndex = next(
+                    (i for i, stream in enumerate(audioStreams) if stream.get('index', -1) == audioStreamIdx), None
+                )
+                if audioStreamOnlyIndex is None:
+                    raise ValueError(f'Audio stream index {audioStreamIdx} is invalid for {self.inputVidFileSpec}')
+                if audioStreamOnlyIndex not in result:
+                    result.append(audioStreamOnlyIndex)
+        elif self.audioStreamLang:
+            result = [
+                i
+                for i, stream in enumerate(audioStreams)
+                if stream.get('tags', {}).get('language', '') == self.audioStreamLang
+            ]
+            if not result:
+                raise ValueError(f'No {self.audioStreamLang} audio streams found in {self.inputVidFileSpec}')
+        elif len(audioStreams) == 1:
+            if 'index' not in audioStreams[0]:
+                raise ValueError(f'Could not determine audio stream index for {self.inputVidFileSpec}')
+            result = [0]
+        else:
+            raise ValueError(
+                f'Multiple audio streams, specify audio stream index(es) with --audio-stream-index or language with --audio-stream-language'
+            )
+        return sorted(result)
+
+    ######## MultiplexSteps #######################################################
+    # the steps (see ffrunner.FFJobs) of MultiplexCleanVideo
+    def MultiplexSteps(self):
+        muxKey = None
+        sidecarFileSpec = self.outputVidFileSpec + INCREMENTAL_SIDECAR_SUFFIX if self.outputVidFileSpec else ""
+        if (self.resultCache or self.incremental) and self.outputVidFileSpec:
+            muxKey = self.MuxKey()
+            if os.path.isfile(self.outputVidFileSpec):
+                # the output video from a previous run is still valid if nothing that went into it has
+                # changed (according to the result cache or the sidecar file it was recorded in), and
+                # it hasn't been changed itself since then
+                outputStat = os.stat(self.outputVidFileSpec)
+                outputRecord = [outputStat.st_size, outputStat.st_mtime_ns]
+                if (
+                    (
+                        self.resultCache
+                        and (muxMeta := self.resultCache.Get(muxKey))
+                        and (muxMeta.get('output', None) == outputRecord)
+                    )
+                    or (
+                        self.incremental
+                        and (sidecar := ReadIncrementalSidecar(sidecarFileSpec))
+                        and (sidecar.get('key', None) == muxKey)
+                        and (sidecar.get('output', None) == outputRecord)
+                    )
+                ) and all(
+                    [os.path.isfile(x) for x, downmix in self.extraOutputs]
+                    + [os.path.isfile(self.cleanAudioFileSpec) if self.keepCleanAudio and (not self.subsOnly) else True]
+                ):
+                    self.outputFromCache = True
+                    return
+                os.remove(self.outputVidFileSpec)
+            if os.path.isfile(sidecarFileSpec):
+                os.remove(sidecarFileSpec)
+
         # if we're don't *have* to generate a new video file, don't
         # we need to generate a video file if any of the following are true:
         # - we were explicitly asked to re-encode
@@ -536,117 +1518,454 @@ class VidCleaner(object):
             or self.embedSubs
             or ((not self.subsOnly) and (len(self.muteTimeList) > 0))
         ):
+            videoFilter = None
             if self.reEncodeVideo or self.hardCode:
                 if self.hardCode and os.path.isfile(self.cleanSubsFileSpec):
-                    self.assSubsFileSpec = self.cleanSubsFileSpec + '.ass'
-                    subConvCmd = f"ffmpeg -hide_banner -nostats -loglevel error -y -i {self.cleanSubsFileSpec} {self.assSubsFileSpec}"
-                    subConvResult = delegator.run(subConvCmd, block=True)
-                    if (subConvResult.return_code == 0) and os.path.isfile(self.assSubsFileSpec):
-                        videoArgs = f"{self.vParams} -vf \"ass={self.assSubsFileSpec}\""
-                    else:
-                        print(subConvCmd)
-                        print(subConvResult.err)
-                        raise ValueError(f'Could not process {self.cleanSubsFileSpec}')
+                    # the subtitles filter renders the (UTF-8) SRT directly, without converting it to ASS first
+                    videoFilter = f"subtitles={FilterArgEscape(self.cleanSubsFileSpec)}"
+                    videoArgs = shlex.split(self.vParams) + ['-vf', videoFilter]
                 else:
-                    videoArgs = self.vParams
+                    videoArgs = shlex.split(self.vParams)
             else:
-                videoArgs = "-c:v copy"
-
-            audioStreamOnlyIndex = 0
-            if audioStreams := GetAudioStreamsInfo(self.inputVidFileSpec).get('streams', []):
-                if len(audioStreams) > 0:
-                    if self.audioStreamIdx is None:
-                        if len(audioStreams) == 1:
-                            if 'index' in audioStreams[0]:
-                                self.audioStreamIdx = audioStreams[0]['index']
-                            else:
-                                raise ValueError(f'Could not determine audio stream index for {self.inputVidFileSpec}')
-                        else:
-                            raise ValueError(
-                                f'Multiple audio streams, specify audio stream index with --audio-stream-index'
-                            )
-                    elif any(stream.get('index', -1) == self.audioStreamIdx for stream in audioStreams):
-                        audioStreamOnlyIndex = next(
-                            (
-                                i
-                                for i, stream in enumerate(audioStreams)
-                                if stream.get('index', -1) == self.audioStreamIdx
-                            ),
-                            0,
-                        )
+                videoArgs = ['-c:v', 'copy']
+
+            videoArgsInput = []
+            videoMap = ['-map', '0:v']
+            nextInputIdx = 1
+            if self.chunkedVideo and (self.reEncodeVideo or self.hardCode):
+                with TimedStage(self.stageTimer, 'chunk_video'):
+                    chunkListFileSpec = yield from self.ChunkedEncodeVideoSteps(videoFilter)
+                if chunkListFileSpec:
+                    # the video has already been encoded, just copy it
+                    videoArgsInput = ['-f', 'concat', '-safe', '0', '-i', chunkListFileSpec]
+                    videoMap = ['-map', f'{nextInputIdx}:v']
+                    videoArgs = ['-c:v', 'copy']
+                    nextInputIdx += 1
+            probe = GetMediaProbe(self.inputVidFileSpec, self.probeCacheDir)
+            audioStreams = probe.Streams('audio') if probe else []
+            # the audio streams to be cleaned come first in the output (in their order in the input),
+            # followed by the input's others, which are copied as they are
+            cleanStreams = self.AudioStreamSelection(audioStreams)
+            audioUnchangedMapList = [
+                x for i in range(len(audioStreams)) if i not in cleanStreams for x in ('-map', f'0:a:{i}')
+            ]
+            audioUnchangedParams = [
+                x for outputIdx in range(len(cleanStreams), len(audioStreams)) for x in (f'-c:a:{outputIdx}', 'copy')
+            ]
+            audioMetadata = AudioStreamMetadata(audioStreams, cleanStreams)
+            # only those of the streams to be cleaned which are more than stereo are downmixed
+            downmixStreams = [
+                i for i in cleanStreams if self.aDownmix and (int(audioStreams[i].get('channels', 0)) > 2)
+            ]
+
+            segmentListFileSpec = None
+            if (
+                self.segmentAudio
+                and (not self.subsOnly)
+                and (not self.reEncodeAudio)
+                and (not downmixStreams)
+                and (len(cleanStreams) == 1)
+            ):
+                with TimedStage(self.stageTimer, 'segment_audio'):
+                    segmentListFileSpec = yield from self.SegmentedCleanAudioSteps(cleanStreams[0])
+
+            if segmentListFileSpec:
+                # the cleaned audio stream has already been stitched together, just copy it
+                audioArgsInput = ['-f', 'concat', '-safe', '0', '-i', segmentListFileSpec]
+                audioFilter = []
+                audioMap = ['-map', f'{nextInputIdx}:a']
+                audioParams = ['-c:a:0', 'copy']
+                nextInputIdx += 1
+            else:
+                audioArgsInput = []
+                # a single graph with a chain for each of the streams to be cleaned, applying the same mute
+                # filters to all of them, so they're decoded, filtered and encoded in one pass
+                filterChains = OrderedDict()
+                for i in cleanStreams:
+                    filters = ([AUDIO_DOWNMIX_FILTER] if i in downmixStreams else []) + (
+                        self.muteTimeList if not self.subsOnly else []
+                    )
+                    if filters:
+                        filterChains[i] = f'[0:a:{i}]{",".join(filters)}[a{i}]'
+                if filterChains:
+                    filterGraph = ';'.join(filterChains.values())
+                    if self.filterScript or (len(filterGraph) > FILTER_COMPLEX_ARG_MAX):
+                        # a long graph goes in a file rather than on the command line
+                        self.filterScriptFileSpec = self.outputVidFileSpec + '.filter_complex'
+                        with open(self.filterScriptFileSpec, 'w') as f:
+                            f.write(filterGraph)
+                        audioFilter = ['-filter_complex_script', self.filterScriptFileSpec]
                     else:
-                        raise ValueError(
-                            f'Audio stream index {self.audioStreamIdx} is invalid for {self.inputVidFileSpec}'
-                        )
+                        audioFilter = ['-filter_complex', filterGraph]
                 else:
-                    raise ValueError(f'No audio streams found in {self.inputVidFileSpec}')
-            else:
-                raise ValueError(f'Could not determine audio streams in {self.inputVidFileSpec}')
-            self.aParams = re.sub(r"-c:a(\s+)", rf"-c:a:{str(audioStreamOnlyIndex)}\1", self.aParams)
-            audioUnchangedMapList = ' '.join(
-                f'-map 0:a:{i}' if i != audioStreamOnlyIndex else '' for i in range(len(audioStreams))
-            )
+                    audioFilter = []
+                audioMap = [x for i in cleanStreams for x in ('-map', f'[a{i}]' if i in filterChains else f'0:a:{i}')]
+                audioParams = AudioEncodeParams(self.aParams, range(len(cleanStreams)))
+
+            if self.cleanAudioFileSpec and (not self.subsOnly):
+                # the cleaned audio stream(s) are rendered once, and copied from there into the output video (and
+                # each of the extra outputs, see ExtraOutputsSteps) rather than filtered and encoded for each
+                with TimedStage(self.stageTimer, 'clean_audio') as stage:
+                    yield from self.CleanAudioSteps(segmentListFileSpec, audioFilter, audioMap, audioParams)
+                    stage['bytes_written'] = FileBytes(self.cleanAudioFileSpec)
+                if not segmentListFileSpec:
+                    nextInputIdx += 1
+                # (in place of the segment list, if there was one)
+                audioArgsInput = ['-i', self.cleanAudioFileSpec]
+                audioFilter = []
+                audioMap = ['-map', f'{nextInputIdx - 1}:a']
+                audioParams = ['-c:a', 'copy']
 
-            if self.aDownmix and HasAudioMoreThanStereo(self.inputVidFileSpec):
-                self.muteTimeList.insert(0, AUDIO_DOWNMIX_FILTER)
-            if (not self.subsOnly) and (len(self.muteTimeList) > 0):
-                audioFilter = f' -filter_complex "[0:a:{audioStreamOnlyIndex}]{",".join(self.muteTimeList)}[a{audioStreamOnlyIndex}]"'
-            else:
-                audioFilter = " "
             if self.embedSubs and os.path.isfile(self.cleanSubsFileSpec):
                 outFileParts = os.path.splitext(self.outputVidFileSpec)
-                subsArgsInput = f" -i \"{self.cleanSubsFileSpec}\" "
-                subsArgsEmbed = f" -map 1:s -c:s {'mov_text' if outFileParts[1] == '.mp4' else 'srt'} -disposition:s:0 default -metadata:s:s:0 language={self.subsLang} "
+                subsArgsInput = ['-i', self.cleanSubsFileSpec]
+                subsArgsEmbed = ['-map', f'{nextInputIdx}:s']
+                subsArgsEmbed += ['-c:s', 'mov_text' if outFileParts[1] == '.mp4' else 'srt']
+                subsArgsEmbed += ['-disposition:s:0', 'default', '-metadata:s:s:0', f'language={self.subsLang}']
             else:
-                subsArgsInput = ""
-                subsArgsEmbed = " -sn "
-
-            ffmpegCmd = (
-                f"ffmpeg -hide_banner -nostats -loglevel error -y {'' if self.threadsInput is None else ('-threads '+ str(int(self.threadsInput)))} -i \""
-                + self.inputVidFileSpec
-                + "\""
-                + subsArgsInput
-                + audioFilter
-                + f' -map 0:v -map "[a{audioStreamOnlyIndex}]" {audioUnchangedMapList} '
-                + subsArgsEmbed
-                + videoArgs
-                + f" {self.aParams} {'' if self.threadsEncoding is None else ('-threads '+ str(int(self.threadsEncoding)))} \""
-                + self.outputVidFileSpec
-                + "\""
-            )
-            ffmpegResult = delegator.run(ffmpegCmd, block=True)
+                subsArgsInput = []
+                subsArgsEmbed = ['-sn']
+
+            with TimedStage(self.stageTimer, 'mux'):
+                try:
+                    [ffmpegResult] = yield FFJobs(
+                        [
+                            self.FFmpegJob(
+                                ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y']
+                                + ([] if self.threadsInput is None else ['-threads', str(int(self.threadsInput))])
+                                + ['-i', self.MediaInput()]
+                                + videoArgsInput
+                                + audioArgsInput
+                                + subsArgsInput
+                                + audioFilter
+                                + videoMap
+                                + audioMap
+                                + audioUnchangedMapList
+                                + subsArgsEmbed
+                                + videoArgs
+                                + audioParams
+                                + audioUnchangedParams
+                                + audioMetadata
+                                + ([] if self.threadsEncoding is None else ['-threads', str(int(self.threadsEncoding))])
+                                + [self.outputVidFileSpec],
+                                'multiplex',
+                            )
+                        ]
+                    )
+                except BaseException:
+                    # interrupted (e.g., cancelled), so whatever ffmpeg had written is incomplete
+                    if os.path.isfile(self.outputVidFileSpec):
+                        os.remove(self.outputVidFileSpec)
+                    raise
             if (ffmpegResult.return_code != 0) or (not os.path.isfile(self.outputVidFileSpec)):
-                print(ffmpegCmd)
+                print(ffmpegResult.cmd)
                 print(ffmpegResult.err)
                 raise ValueError(f'Could not process {self.inputVidFileSpec}')
+            if self.extraOutputs:
+                with TimedStage(self.stageTimer, 'remux', outputs=len(self.extraOutputs)) as stage:
+                    yield from self.ExtraOutputsSteps(audioStreams, cleanStreams, downmixStreams)
+                    stage['bytes_written'] = FileBytes(*[x for x, downmix in self.extraOutputs])
+            if muxKey:
+                outputStat = os.stat(self.outputVidFileSpec)
+                outputRecord = [outputStat.st_size, outputStat.st_mtime_ns]
+                if self.resultCache:
+                    self.resultCache.Put(muxKey, {'output': outputRecord})
+                if self.incremental:
+                    with open(sidecarFileSpec, 'w') as f:
+                        json.dump(
+                            {
+                                "now": datetime.now().isoformat(),
+                                "key": muxKey,
+                                "output": outputRecord,
+                                "mute": [[x[0] / 1000.0, x[1] / 1000.0] for x in self.muteIntervals],
+                            },
+                            f,
+                            indent=4,
+                        )
         else:
             self.unalteredVideo = True
 
+    ######## CleanAudioSteps ######################################################
+    # the steps (see ffrunner.FFJobs) rendering the cleaned audio stream(s) to cleanAudioFileSpec: filtered
+    # and encoded as they would be for the output video (audioFilter, audioMap and audioParams, from
+    # MultiplexSteps), or (with segmentListFileSpec, see SegmentedCleanAudioSteps) its already re-encoded
+    # segments joined
+    def CleanAudioSteps(self, segmentListFileSpec, audioFilter, audioMap, audioParams):
+        if segmentListFileSpec:
+            audioArgs = ['-f', 'concat', '-safe', '0', '-i', segmentListFileSpec, '-map', '0:a', '-c:a', 'copy']
+        else:
+            audioArgs = ['-i', self.MediaInput()] + audioFilter + audioMap + audioParams
+        try:
+            [ffmpegResult] = yield FFJobs(
+                [
+                    self.FFmpegJob(
+                        ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y']
+                        + ([] if self.threadsInput is None else ['-threads', str(int(self.threadsInput))])
+                        + audioArgs
+                        + ['-vn', '-sn', '-dn']
+                        + ([] if self.threadsEncoding is None else ['-threads', str(int(self.threadsEncoding))])
+                        + [self.cleanAudioFileSpec],
+                        'clean audio',
+                    )
+                ]
+            )
+        except BaseException:
+            if os.path.isfile(self.cleanAudioFileSpec):
+                os.remove(self.cleanAudioFileSpec)
+            raise
+        if (ffmpegResult.return_code != 0) or (not os.path.isfile(self.cleanAudioFileSpec)):
+            print(ffmpegResult.cmd)
+            print(ffmpegResult.err)
+            raise ValueError(f'Could not render the cleaned audio of {self.inputVidFileSpec}')
+
+    ######## ExtraOutputsSteps ####################################################
+    # the steps (see ffrunner.FFJobs) writing the extra output videos (e.g., an MP4 alongside an MKV), all
+    # at once. each is remuxed from the output video (its video and other audio streams), the cleaned audio
+    # stream(s) rendered by CleanAudioSteps and the clean subtitles (in the extra output's container's format),
+    # so nothing is encoded again but the audio of an extra output to be downmixed (those of the cleanStreams
+    # which are more than stereo, and weren't already downmixed, as downmixStreams, for the output video)
+    def ExtraOutputsSteps(self, audioStreams, cleanStreams, downmixStreams):
+        cleanAudio = os.path.isfile(self.cleanAudioFileSpec) and (not self.subsOnly)
+        # by their position in the output
+        downmixOutputIdxs = [
+            outputIdx
+            for outputIdx, i in enumerate(cleanStreams)
+            if (i not in downmixStreams) and (int(audioStreams[i].get('channels', 0)) > 2)
+        ]
+        jobs = []
+        for extraOutput, downmix in self.extraOutputs:
+            outputArgs = ['-i', self.outputVidFileSpec]
+            if cleanAudio:
+                outputArgs += ['-i', self.cleanAudioFileSpec]
+            if self.embedSubs and os.path.isfile(self.cleanSubsFileSpec):
+                outputArgs += ['-i', self.cleanSubsFileSpec]
+            outputArgs += ['-map', '0:v']
+            if cleanAudio:
+                # the output video's first audio streams are the cleaned ones, the rest are the input's others
+                outputArgs += ['-map', '1:a']
+                outputArgs += [x for i in range(len(cleanStreams), len(audioStreams)) for x in ('-map', f'0:a:{i}')]
+                outputArgs += AudioStreamMetadata(audioStreams, cleanStreams)
+            else:
+                outputArgs += ['-map', '0:a']
+            if self.embedSubs and os.path.isfile(self.cleanSubsFileSpec):
+                outputArgs += ['-map', f'{2 if cleanAudio else 1}:s']
+                outputArgs += ['-c', 'copy']
+                outputArgs += ['-c:s', 'mov_text' if os.path.splitext(extraOutput)[1] == '.mp4' else 'srt']
+                outputArgs += ['-disposition:s:0', 'default', '-metadata:s:s:0', f'language={self.subsLang}']
+            else:
+                outputArgs += ['-c', 'copy', '-sn']
+            if downmix and downmixOutputIdxs:
+                outputArgs += [x for i in downmixOutputIdxs for x in (f'-filter:a:{i}', AUDIO_DOWNMIX_FILTER)]
+                outputArgs += AudioEncodeParams(self.aParams, downmixOutputIdxs)
+            jobs.append(
+                self.FFmpegJob(
+                    ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y'] + outputArgs + [extraOutput],
+                    f'remux {os.path.basename(extraOutput)}',
+                )
+            )
+        try:
+            # remuxing is bound by I/O rather than CPU, so they're all written at once
+            ffmpegResults = yield FFJobs(jobs, workers=len(jobs))
+        except BaseException:
+            for extraOutput, downmix in self.extraOutputs:
+                if os.path.isfile(extraOutput):
+                    os.remove(extraOutput)
+            raise
+        for (extraOutput, downmix), ffmpegResult in zip(self.extraOutputs, ffmpegResults):
+            if (ffmpegResult.return_code != 0) or (not os.path.isfile(extraOutput)):
+                print(ffmpegResult.cmd)
+                print(ffmpegResult.err)
+                raise ValueError(f'Could not write {extraOutput} for {self.inputVidFileSpec}')
+
+    ######## FFmpegJob ############################################################
+    # an ffmpeg job for this title, its progress labeled with the output file and stage. duration
+    # defaults to the input's, for the percent complete
+    def FFmpegJob(self, argv, stage, duration=None):
+        if self.progressCallback and (duration is None):
+            probe = GetMediaProbe(self.inputVidFileSpec, self.probeCacheDir)
+            duration = probe.Duration() if probe else None
+        return FFJob(argv, label=f'{os.path.basename(self.outputVidFileSpec)} ({stage})', duration=duration)
+
+    ######## SegmentedCleanAudioSteps ##############################################
+    # rather than decoding, filtering and re-encoding the whole audio stream, split it (stream-copied,
+    # at packet boundaries) into spans around the muted regions and the spans in between, re-encode
+    # only the former in the stream's original format, and return a concat demuxer list file which
+    # stitches them all back together. returns None if the stream can't be handled this way.
+    def SegmentedCleanAudioSteps(self, audioStreamOnlyIndex):
+        probe = GetMediaProbe(self.MediaInput(), self.probeCacheDir)
+        audioStreams = probe.Streams('audio') if probe else []
+        if (not self.muteIntervals) or (audioStreamOnlyIndex >= len(audioStreams)):
+            return None
+        audioStream = audioStreams[audioStreamOnlyIndex]
+        codecName = audioStream.get('codec_name', '')
+        encoder = AUDIO_SEGMENT_ENCODERS.get(codecName, codecName if codecName.startswith('pcm_') else None)
+        if not encoder:
+            return None
+        encodeArgs = ['-c:a', encoder]
+        if sampleRate := audioStream.get('sample_rate', None):
+            encodeArgs += ['-ar', str(sampleRate)]
+        if channels := audioStream.get('channels', None):
+            encodeArgs += ['-ac', str(channels)]
+        if (encoder != 'flac') and (not encoder.startswith('pcm_')):
+            bitRate = audioStream.get('bit_rate', None) or next(
+                iter([v for k, v in audioStream.get('tags', {}).items() if k.upper().startswith('BPS')]), None
+            )
+            if bitRate:
+                encodeArgs += ['-b:a', str(bitRate)]
+
+        # the spans to be re-encoded extend past each muted region by the margin
+        marginMillisec = round(self.segmentMarginSec * 1000.0)
+        dirtySpans = MergeIntervals(
+            [(max(x[0] - marginMillisec, 0), x[1] + marginMillisec) for x in self.muteIntervals]
+        )
+        segmentTimes = sorted(set([t for span in dirtySpans for t in span if t > 0]))
+
+        self.segmentsDirSpec = tempfile.mkdtemp(
+            prefix=os.path.basename(self.outputVidFileSpec) + '_segments_',
+            dir=os.path.dirname(os.path.abspath(self.outputVidFileSpec)),
+        )
+        segmentCsvFileSpec = os.path.join(self.segmentsDirSpec, 'segments.csv')
+        [splitResult] = yield FFJobs(
+            [
+                self.FFmpegJob(
+                    ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y', '-i', self.MediaInput()]
+                    + ['-map', f'0:a:{audioStreamOnlyIndex}', '-c', 'copy', '-f', 'segment']
+                    + ['-segment_format', 'matroska', '-reset_timestamps', '1']
+                    + (
+                        ['-segment_times', ','.join([format(t / 1000.0, '.3f') for t in segmentTimes])]
+                        if segmentTimes
+                        else []
+                    )
+                    + ['-segment_list', segmentCsvFileSpec, '-segment_list_type', 'csv']
+                    + [os.path.join(self.segmentsDirSpec, 'segment%06d.mka')],
+                    'split audio',
+                )
+            ]
+        )
+        if (splitResult.return_code != 0) or (not os.path.isfile(segmentCsvFileSpec)):
+            print(splitResult.cmd)
+            print(splitResult.err)
+            raise ValueError(f'Could not split audio of {self.inputVidFileSpec}')
+
+        concatLines = ['ffconcat version 1.0']
+        with open(segmentCsvFileSpec, 'r') as f:
+            segments = [x.strip().split(',') for x in f if x.strip()]
+        for segmentName, segmentStart, segmentEnd in segments:
+            startMillisec = round(float(segmentStart) * 1000.0)
+            endMillisec = round(float(segmentEnd) * 1000.0)
+            # muted regions falling in this segment, relative to its start
+            segmentMutes = [
+                (max(x[0], startMillisec) - startMillisec, min(x[1], endMillisec) - startMillisec)
+                for x in self.muteIntervals
+                if (x[0] < endMillisec) and (x[1] > startMillisec)
+            ]
+            if segmentMutes:
+                cleanSegmentName = os.path.splitext(segmentName)[0] + '_clean.mka'
+                [encodeResult] = yield FFJobs(
+                    [
+                        self.FFmpegJob(
+                            ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y']
+                            + ['-i', os.path.join(self.segmentsDirSpec, segmentName)]
+                            + [
+                                '-af',
+                                ','.join(MuteFilters(segmentMutes, endMillisec - startMillisec, self.muteFilterMode)),
+                            ]
+                            + encodeArgs
+                            + [os.path.join(self.segmentsDirSpec, cleanSegmentName)],
+                            f'audio {os.path.splitext(segmentName)[0]}',
+                        )
+                    ]
+                )
+                if (encodeResult.return_code != 0) or (
+                    not os.path.isfile(os.path.join(self.segmentsDirSpec, cleanSegmentName))
+                ):
+                    print(encodeResult.cmd)
+                    print(encodeResult.err)
+                    raise ValueError(f'Could not process audio segment {segmentName} of {self.inputVidFileSpec}')
+                segmentName = cleanSegmentName
+            # explicit durations keep any encoder delay in a re-encoded span from accumulating
+            concatLines.append(f"file '{segmentName}'")
+            concatLines.append(f"duration {format((endMillisec - startMillisec) / 1000.0, '.3f')}")
+
+        segmentListFileSpec = os.path.join(self.segmentsDirSpec, 'segments.ffconcat')
+        with open(segmentListFileSpec, 'w') as f:
+            f.write('\n'.join(concatLines) + '\n')
+        return segmentListFileSpec
+
+    ######## ChunkedEncodeVideoSteps ###############################################
+    # rather than encoding the whole video stream with a single ffmpeg process, split it at keyframes
+    # into chunks of about chunkSec seconds, encode the chunks in parallel (each its own ffmpeg
+    # process) and return a concat demuxer list file which stitches them back together. videoFilter
+    # (e.g., burning in subtitles) is applied to each chunk with its timestamps shifted back to where
+    # the chunk lies in the original, so time-based filters line up. returns None if the video's
+    # keyframes can't be determined.
+    def ChunkedEncodeVideoSteps(self, videoFilter=None):
+        probe = GetMediaProbe(self.MediaInput(), self.probeCacheDir)
+        keyframeTimes = (yield from probe.KeyframeTimesSteps()) if probe else []
+        if not keyframeTimes:
+            return None
+
+        # ffmpeg's -ss (and the timestamps ffmpeg's filters see) are relative to the start of the file
+        startTime = probe.StartTime()
+        keyframeTimes = [max(x - startTime, 0.0) for x in keyframeTimes]
+        chunkStartTimes = [keyframeTimes[0]]
+        for keyframeTime in keyframeTimes[1:]:
+            if keyframeTime >= (chunkStartTimes[-1] + self.chunkSec):
+                chunkStartTimes.append(keyframeTime)
+
+        cpuCount = os.cpu_count() or 1
+        chunkWorkers = self.chunkWorkers if self.chunkWorkers else max(1, cpuCount // 4)
+        chunkThreads = self.threadsEncoding if self.threadsEncoding else max(1, cpuCount // chunkWorkers)
+
+        self.chunksDirSpec = tempfile.mkdtemp(
+            prefix=os.path.basename(self.outputVidFileSpec) + '_chunks_',
+            dir=os.path.dirname(os.path.abspath(self.outputVidFileSpec)),
+        )
+
+        chunkFileSpecs = []
+        chunkJobs = []
+        for chunkIdx, chunkStart in enumerate(chunkStartTimes):
+            chunkEnd = chunkStartTimes[chunkIdx + 1] if (chunkIdx + 1) < len(chunkStartTimes) else None
+            chunkFileSpecs.append(os.path.join(self.chunksDirSpec, f'chunk{chunkIdx:06d}.mkv'))
+            chunkJobs.append(
+                self.FFmpegJob(
+                    ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y', '-ss', f'{chunkStart:.6f}']
+                    + ['-i', self.MediaInput()]
+                    + (['-t', f'{(chunkEnd - chunkStart):.6f}'] if chunkEnd is not None else [])
+                    + ['-map', '0:v:0', '-an', '-sn', '-dn']
+                    + shlex.split(self.vParams)
+                    + (
+                        ['-vf', f"setpts=PTS-STARTPTS+round({chunkStart:.6f}/TB),{videoFilter},setpts=PTS-STARTPTS"]
+                        if videoFilter
+                        else []
+                    )
+                    + ['-threads', str(chunkThreads), chunkFileSpecs[-1]],
+                    f'video chunk {chunkIdx}',
+                    (chunkEnd - chunkStart) if chunkEnd is not None else None,
+                )
+            )
+
+        encodeResults = yield FFJobs(chunkJobs, chunkWorkers)
+        for chunkIdx, (encodeResult, chunkFileSpec) in enumerate(zip(encodeResults, chunkFileSpecs)):
+            if (encodeResult.return_code != 0) or (not os.path.isfile(chunkFileSpec)):
+                print(encodeResult.cmd)
+                print(encodeResult.err)
+                raise ValueError(f'Could not encode chunk {chunkIdx} of {self.inputVidFileSpec}')
+
+        chunkListFileSpec = os.path.join(self.chunksDirSpec, 'chunks.ffconcat')
+        with open(chunkListFileSpec, 'w') as f:
+            f.write('ffconcat version 1.0\n')
+            for chunkIdx, chunkFileSpec in enumerate(chunkFileSpecs):
+                f.write(f"file '{os.path.basename(chunkFileSpec)}'\n")
+                # explicit durations so each chunk starts exactly where the last one stopped
+                if (chunkIdx + 1) < len(chunkStartTimes):
+                    f.write(f"duration {(chunkStartTimes[chunkIdx + 1] - chunkStartTimes[chunkIdx]):.6f}\n")
+        return chunkListFileSpec
+
 
 #################################################################################
-def RunCleanvid():
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        '-s',
-        '--subs',
-        help='.srt subtitle file (will attempt auto-download if unspecified and not --offline)',
-        metavar='<srt>',
-    )
-    parser.add_argument('-i', '--input', required=True, help='input video file', metavar='<input video>')
-    parser.add_argument('-o', '--output', help='output video file', metavar='<output video>')
-    parser.add_argument(
-        '--plex-auto-skip-json',
-        help='custom JSON file for PlexAutoSkip (also implies --subs-only)',
-        metavar='<output JSON>',
-        dest="plexAutoSkipJson",
-    )
-    parser.add_argument(
-        '--plex-auto-skip-id',
-        help='content identifier for PlexAutoSkip (also implies --subs-only)',
-        metavar='<content identifier>',
-        dest="plexAutoSkipId",
-    )
-    parser.add_argument('--subs-output', help='output subtitle file', metavar='<output srt>', dest="subsOut")
+# command-line options common to cleaning a single title (RunCleanvid) and many (RunCleanvidBatch)
+def AddCleaningArguments(parser):
     parser.add_argument(
         '-w',
         '--swears',
@@ -722,17 +2041,19 @@ def RunCleanvid():
     )
     parser.add_argument(
         '--audio-stream-index',
-        help='Index of audio stream to process',
-        metavar='<int>',
+        help='Index(es) of audio stream(s) to process (comma-separated, all filtered in one pass with the same mute regions)',
+        metavar='<int>[,<int>...]',
         dest="audioStreamIdx",
-        type=int,
+        type=str,
         default=None,
     )
     parser.add_argument(
-        '--audio-stream-list',
-        help='Show list of audio streams (to get index for --audio-stream-index)',
-        action='store_true',
-        dest="audioStreamIdxList",
+        '--audio-stream-language',
+        help='Process all audio streams tagged with this language (e.g., eng), if --audio-stream-index is not specified',
+        metavar='<language>',
+        dest="audioStreamLang",
+        type=str,
+        default=None,
     )
     parser.add_argument(
         '--threads-input',
@@ -758,9 +2079,186 @@ def RunCleanvid():
         type=int,
         default=None,
     )
+    parser.add_argument(
+        '--probe-cache',
+        help='directory in which to cache ffprobe results (keyed on file path, size and modification time)',
+        metavar='<directory>',
+        dest="probeCache",
+        default=None,
+    )
+    parser.add_argument(
+        '--swears-cache',
+        help='directory in which to cache compiled profanity matchers (keyed on the profanity list contents)',
+        metavar='<directory>',
+        dest="swearsCache",
+        default=None,
+    )
+    parser.add_argument(
+        '--subs-cache',
+        help='directory in which to cache subtitle provider lookups and the titles no subtitles were found for',
+        metavar='<directory>',
+        dest="subsCache",
+        default=None,
+    )
+    parser.add_argument(
+        '--subs-not-found-hours',
+        help=f'hours before a title no subtitles were found for is queried again, with --subs-cache (default is {SUBTITLE_NOT_FOUND_DEFAULT_HOURS}, 0 to always query)',
+        metavar='<hours>',
+        dest="subsNotFoundHours",
+        type=float,
+        default=SUBTITLE_NOT_FOUND_DEFAULT_HOURS,
+    )
+    parser.add_argument(
+        '--subs-providers',
+        help='comma-separated subliminal providers to download subtitles from (default is all of them)',
+        metavar='<providers>',
+        dest="subsProviders",
+        default=None,
+    )
+    parser.add_argument(
+        '--refine-mutes',
+        help='narrow each subtitle\'s mute region to the profanity in it, by where it is in the subtitle\'s text and where the speech is in its audio (requires numpy)',
+        dest='refineMutes',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--refine-margin',
+        help=f'seconds a refined mute region extends (to the nearest pause) past the profanity\'s estimated start and end (default is {REFINE_DEFAULT_MARGIN_SEC})',
+        metavar='<float>',
+        dest="refineMargin",
+        type=float,
+        default=REFINE_DEFAULT_MARGIN_SEC,
+    )
+    parser.add_argument(
+        '--refine-aligner',
+        help=f'how --refine-mutes places the profanity in a subtitle\'s audio ("{WORD_ALIGNER_DEFAULT}" by the speech found in it, "vosk" by the words an offline vosk speech recognizer hears in it, which requires vosk and --refine-model)',
+        choices=list(WORD_ALIGNERS.keys()),
+        dest="refineAligner",
+        default=WORD_ALIGNER_DEFAULT,
+    )
+    parser.add_argument(
+        '--refine-model',
+        help='speech recognition model (directory) for --refine-aligner',
+        metavar='<dir>',
+        dest="refineModel",
+        default=None,
+    )
+    parser.add_argument(
+        '--refine-workers',
+        help='number of processes decoding (and, with "--refine-aligner vosk", recognizing) audio at once for --refine-mutes (default is the CPU count)',
+        metavar='<int>',
+        dest="refineWorkers",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--mute-filter',
+        help=f'audio filter used to mute ("{MUTE_FILTER_AFADE}" fades out/in around each region, "{MUTE_FILTER_VOLUME}" uses a single volume filter for all regions)',
+        choices=[MUTE_FILTER_AFADE, MUTE_FILTER_VOLUME],
+        dest="muteFilterMode",
+        default=MUTE_FILTER_AFADE,
+    )
+    parser.add_argument(
+        '--filter-script',
+        help='always pass the audio filter graph to ffmpeg in a file (-filter_complex_script) rather than on the command line',
+        dest='filterScript',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--segment-audio',
+        help='only re-encode the spans of audio around muted regions, stream-copying the rest (falls back to re-encoding the whole stream when downmixing, when --re-encode-audio is specified or when the audio codec can\'t be re-encoded in its original format)',
+        dest='segmentAudio',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--segment-margin',
+        help=f'seconds of audio re-encoded on either side of a muted region with --segment-audio (default is {AUDIO_SEGMENT_DEFAULT_MARGIN_SEC})',
+        metavar='<float>',
+        dest="segmentMargin",
+        type=float,
+        default=AUDIO_SEGMENT_DEFAULT_MARGIN_SEC,
+    )
+    parser.add_argument(
+        '--chunked-video',
+        help='when re-encoding video (--re-encode-video or --burn), split it at keyframes and encode the chunks in parallel',
+        dest='chunkedVideo',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        help=f'approximate length (seconds) of each chunk with --chunked-video (default is {VIDEO_CHUNK_DEFAULT_SEC})',
+        metavar='<float>',
+        dest="chunkSec",
+        type=float,
+        default=VIDEO_CHUNK_DEFAULT_SEC,
+    )
+    parser.add_argument(
+        '--chunk-workers',
+        help='number of chunks to encode at once with --chunked-video (default is a quarter of the CPU count)',
+        metavar='<int>',
+        dest="chunkWorkers",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--result-cache',
+        help='directory in which to cache scrubbed subtitles and mute lists, and record valid output videos, so unchanged titles are skipped on later runs',
+        metavar='<directory>',
+        dest="resultCache",
+        default=None,
+    )
+    parser.add_argument(
+        '--result-cache-size',
+        help=f'maximum size (megabytes) of --result-cache, least recently used entries are evicted first (default is {RESULT_CACHE_DEFAULT_MAX_MB})',
+        metavar='<int>',
+        dest="resultCacheSize",
+        type=int,
+        default=RESULT_CACHE_DEFAULT_MAX_MB,
+    )
+    parser.add_argument(
+        '--incremental',
+        help=f'record the mute regions of each output video in a sidecar file ("<output video>{INCREMENTAL_SIDECAR_SUFFIX}") and only recreate the output video when they (or the options used to create it) change',
+        dest='incremental',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--progress',
+        help='report the progress (position, fps and speed) of each ffmpeg job to stderr',
+        dest='progress',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--single-pass',
+        help='while extracting embedded subtitles, also copy the video and audio to a local spool file to be multiplexed from, so the input video is only read once (e.g., for files on network storage)',
+        dest='singlePass',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--spool-dir',
+        help='directory for the --single-pass spool file (default is the system\'s temporary directory)',
+        metavar='<directory>',
+        dest='spoolDir',
+    )
+    parser.add_argument(
+        '--stage-report',
+        help='JSON file to write the wall and CPU time, bytes read and written and other counts (subtitle cues, profanity matches, mute regions, etc.) of each stage of processing to',
+        metavar='<output JSON>',
+        dest='stageReport',
+    )
+    parser.add_argument(
+        '--profile',
+        help='profile the Python stages (e.g., decoding and scrubbing subtitles) with cProfile and tracemalloc, writing the raw profile to this file and including a summary in --stage-report',
+        metavar='<output profile>',
+        dest='profile',
+    )
     parser.set_defaults(
-        audioStreamIdxList=False,
+        chunkedVideo=False,
+        incremental=False,
+        progress=False,
+        singlePass=False,
         edl=False,
+        filterScript=False,
+        segmentAudio=False,
         embedSubs=False,
         fullSubs=False,
         hardCode=False,
@@ -769,47 +2267,34 @@ def RunCleanvid():
         reEncodeVideo=False,
         subsOnly=False,
     )
-    args = parser.parse_args()
-
-    if args.audioStreamIdxList:
-        audioStreamsInfo = GetAudioStreamsInfo(args.input)
-        # e.g.:
-        #   1: aac, 44100 Hz, stereo, eng
-        #   3: opus, 48000 Hz, stereo, jpn
-        print(
-            '\n'.join(
-                [
-                    f"{x['index']}: {x.get('codec_name', 'unknown codec')}, {x.get('sample_rate', 'unknown')} Hz, {x.get('channel_layout', 'unknown channel layout')}, {x.get('tags', {}).get('language', 'unknown language')}"
-                    for x in audioStreamsInfo.get("streams", [])
-                ]
-            )
-        )
 
-    else:
-        inFile = args.input
-        outFile = args.output
-        subsFile = args.subs
-        lang = args.lang
-        plexFile = args.plexAutoSkipJson
-        if inFile:
-            inFileParts = os.path.splitext(inFile)
-            if not outFile:
-                outFile = inFileParts[0] + "_clean" + inFileParts[1]
-            if not subsFile:
-                subsFile = GetSubtitles(inFile, lang, args.offline)
-            if args.plexAutoSkipId and not plexFile:
-                plexFile = inFileParts[0] + "_PlexAutoSkip_clean.json"
-
-        if plexFile and not args.plexAutoSkipId:
-            raise ValueError(
-                f'Content ID must be specified if creating a PlexAutoSkip JSON file (https://github.com/mdhiggins/PlexAutoSkip/wiki/Identifiers)'
-            )
 
-        cleaner = VidCleaner(
+#################################################################################
+# a VidCleaner for a single title with the cleaning options in args
+def TitleCleaner(
+    args,
+    inFile,
+    outFile,
+    subsFile,
+    subsOut=None,
+    plexFile=None,
+    plexAutoSkipId=None,
+    swearsMap=None,
+    progressCallback=None,
+    spoolFileSpec=None,
+    stageTimer=None,
+    swearsMatcher=None,
+    extraOutputs=None,
+    cleanAudioFileSpec=None,
+):
+    if (progressCallback is None) and args.progress:
+        progressCallback = PrintProgress
+    try:
+        return VidCleaner(
             inFile,
             subsFile,
             outFile,
-            args.subsOut,
+            subsOut,
             args.swears,
             args.pad,
             args.embedSubs,
@@ -817,7 +2302,7 @@ def RunCleanvid():
             args.subsOnly,
             args.edl,
             args.json,
-            lang,
+            args.lang,
             args.reEncodeVideo,
             args.reEncodeAudio,
             args.hardCode,
@@ -828,10 +2313,232 @@ def RunCleanvid():
             args.threadsInput if args.threadsInput is not None else args.threads,
             args.threadsEncoding if args.threadsEncoding is not None else args.threads,
             plexFile,
-            args.plexAutoSkipId,
+            plexAutoSkipId,
+            args.probeCache,
+            swearsMap,
+            args.swearsCache,
+            args.muteFilterMode,
+            args.filterScript,
+            args.segmentAudio,
+            args.segmentMargin,
+            args.chunkedVideo,
+            args.chunkSec,
+            args.chunkWorkers,
+            args.resultCache,
+            args.resultCacheSize,
+            args.incremental,
+            progressCallback,
+            spoolFileSpec,
+            stageTimer,
+            swearsMatcher,
+            extraOutputs,
+            cleanAudioFileSpec,
+            args.audioStreamLang,
+            args.refineMutes,
+            args.refineMargin,
+            args.refineAligner,
+            args.refineModel,
+            args.refineWorkers,
+        )
+    except BaseException:
+        # the spool is only any use to this title's VidCleaner
+        if spoolFileSpec and os.path.isfile(spoolFileSpec):
+            os.remove(spoolFileSpec)
+        raise
+
+
+#################################################################################
+# the (output video, downmix) extra outputs of a title (see VidCleaner.ExtraOutputsSteps) from lists of
+# the output videos to be remuxed as they are and those to be downmixed
+def ExtraOutputs(extraOutputs=None, extraOutputsDownmix=None):
+    return [(x, False) for x in (extraOutputs or [])] + [(x, True) for x in (extraOutputsDownmix or [])]
+
+
+#################################################################################
+# the --single-pass spool file for a title (see ExtractSubtitles), or None if there won't be
+# an output video to multiplex it into
+def TitleSpoolFileSpec(args, outFile):
+    # (cleanvid-batch has no --plex-auto-skip-id)
+    if args.singlePass and outFile and (not (args.subsOnly or args.edl or getattr(args, 'plexAutoSkipId', None))):
+        return SpoolFileSpec(outFile, args.spoolDir)
+    else:
+        return None
+
+
+#################################################################################
+# the SubtitleDownloader (see subsdownloader) with the subtitle cache and provider options in args
+def TitleSubtitleDownloader(args):
+    return SubtitleDownloader(args.subsCache, args.subsNotFoundHours, SubtitleProviders(args))
+
+
+#################################################################################
+# the subliminal providers named by args (or None for all of them)
+def SubtitleProviders(args):
+    return [x.strip() for x in args.subsProviders.split(',') if x.strip()] if args.subsProviders else None
+
+
+#################################################################################
+# the StageTimer for a title, if its stages are to be reported or profiled
+def TitleStageTimer(args):
+    if args.stageReport or args.profile:
+        return StageTimer(profile=bool(args.profile))
+    else:
+        return None
+
+
+#################################################################################
+# a title's stage report (see TitleStageTimer), optionally written to reportFileSpec, with its
+# raw profile (if it was profiled) written to profileFileSpec
+def TitleStageReport(stageTimer, reportFileSpec=None, profileFileSpec=None, **extra):
+    if stageTimer:
+        if profileFileSpec:
+            stageTimer.WriteProfile(profileFileSpec)
+        report = stageTimer.Report(**extra)
+        if reportFileSpec:
+            with open(reportFileSpec, 'w') as f:
+                json.dump(report, f, indent=4)
+        return report
+    else:
+        return None
+
+
+#################################################################################
+# clean a single title with the cleaning options in args
+def CleanTitle(args, inFile, outFile, subsFile, *cleanerArgs, **cleanerKwargs):
+    cleaner = TitleCleaner(args, inFile, outFile, subsFile, *cleanerArgs, **cleanerKwargs)
+    cleaner.CreateCleanSubAndMuteList()
+    cleaner.MultiplexCleanVideo()
+    return cleaner
+
+
+#################################################################################
+# the asyncio counterpart of CleanTitle. limiter (e.g., an asyncio.Semaphore) bounds how many
+# ffmpeg processes are run at once across all of the titles sharing it
+async def CleanTitleAsync(args, inFile, outFile, subsFile, *cleanerArgs, limiter=None, **cleanerKwargs):
+    cleaner = TitleCleaner(args, inFile, outFile, subsFile, *cleanerArgs, **cleanerKwargs)
+    await cleaner.CreateCleanSubAndMuteListAsync(limiter)
+    await cleaner.MultiplexCleanVideoAsync(limiter)
+    return cleaner
+
+
+#################################################################################
+def RunCleanvid():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-s',
+        '--subs',
+        help='.srt subtitle file (will attempt auto-download if unspecified and not --offline)',
+        metavar='<srt>',
+    )
+    parser.add_argument('-i', '--input', required=True, help='input video file', metavar='<input video>')
+    parser.add_argument('-o', '--output', help='output video file', metavar='<output video>')
+    parser.add_argument(
+        '--plex-auto-skip-json',
+        help='custom JSON file for PlexAutoSkip (also implies --subs-only)',
+        metavar='<output JSON>',
+        dest="plexAutoSkipJson",
+    )
+    parser.add_argument(
+        '--plex-auto-skip-id',
+        help='content identifier for PlexAutoSkip (also implies --subs-only)',
+        metavar='<content identifier>',
+        dest="plexAutoSkipId",
+    )
+    parser.add_argument('--subs-output', help='output subtitle file', metavar='<output srt>', dest="subsOut")
+    parser.add_argument(
+        '--extra-output',
+        help='another output video file (e.g., an .mp4 alongside an .mkv output), remuxed from the output video and its cleaned audio stream without encoding either again (may be specified more than once)',
+        metavar='<output video>',
+        dest="extraOutputs",
+        action='append',
+    )
+    parser.add_argument(
+        '--extra-output-downmix',
+        help='like --extra-output, but with the cleaned audio stream downmixed to stereo (if it isn\'t already)',
+        metavar='<output video>',
+        dest="extraOutputsDownmix",
+        action='append',
+    )
+    parser.add_argument(
+        '--clean-audio',
+        help=f'render the cleaned audio stream once to this file, and copy it from there into the output video(s) (implied, with an intermediate "<output video>{CLEAN_AUDIO_SUFFIX}", by --extra-output)',
+        metavar='<output audio>',
+        dest="cleanAudio",
+    )
+    parser.add_argument(
+        '--audio-stream-list',
+        help='Show list of audio streams (to get index for --audio-stream-index)',
+        action='store_true',
+        dest="audioStreamIdxList",
+    )
+    AddCleaningArguments(parser)
+    parser.set_defaults(audioStreamIdxList=False)
+    args = parser.parse_args()
+
+    if args.audioStreamIdxList:
+        audioStreamsInfo = GetAudioStreamsInfo(args.input, args.probeCache)
+        # e.g.:
+        #   1: aac, 44100 Hz, stereo, eng
+        #   3: opus, 48000 Hz, stereo, jpn
+        print(
+            '\n'.join(
+                [
+                    f"{x['index']}: {x.get('codec_name', 'unknown codec')}, {x.get('sample_rate', 'unknown')} Hz, {x.get('channel_layout', 'unknown channel layout')}, {x.get('tags', {}).get('language', 'unknown language')}"
+                    for x in audioStreamsInfo.get("streams", [])
+                ]
+            )
         )
-        cleaner.CreateCleanSubAndMuteList()
-        cleaner.MultiplexCleanVideo()
+
+    else:
+        inFile = args.input
+        outFile = args.output
+        subsFile = args.subs
+        lang = args.lang
+        plexFile = args.plexAutoSkipJson
+        spoolFile = None
+        stageTimer = TitleStageTimer(args)
+        try:
+            if inFile:
+                inFileParts = os.path.splitext(inFile)
+                if not outFile:
+                    outFile = inFileParts[0] + "_clean" + inFileParts[1]
+                if not subsFile:
+                    spoolFile = TitleSpoolFileSpec(args, outFile)
+                    subsFile = GetSubtitles(
+                        inFile,
+                        lang,
+                        args.offline,
+                        args.probeCache,
+                        spoolFile,
+                        stageTimer,
+                        downloader=TitleSubtitleDownloader(args),
+                    )
+                if args.plexAutoSkipId and not plexFile:
+                    plexFile = inFileParts[0] + "_PlexAutoSkip_clean.json"
+
+            if plexFile and not args.plexAutoSkipId:
+                raise ValueError(
+                    f'Content ID must be specified if creating a PlexAutoSkip JSON file (https://github.com/mdhiggins/PlexAutoSkip/wiki/Identifiers)'
+                )
+
+            CleanTitle(
+                args,
+                inFile,
+                outFile,
+                subsFile,
+                args.subsOut,
+                plexFile,
+                args.plexAutoSkipId,
+                spoolFileSpec=spoolFile,
+                stageTimer=stageTimer,
+                extraOutputs=ExtraOutputs(args.extraOutputs, args.extraOutputsDownmix),
+                cleanAudioFileSpec=args.cleanAudio,
+            )
+        finally:
+            # a failed title's report shows how far it got
+            TitleStageReport(
+                stageTimer, args.stageReport, args.profile, input=inFile, output=outFile, subtitles=subsFile
+            )
 
 
 #################################################################################
@@ -0,0 +1,363 @@
+import shlex
+import subprocess
+import sys
+import threading
+from collections import deque
+
+# asyncio and concurrent.futures are only imported (see RunFFAsync, RunFFSteps and RunFFStepsAsync) when
+# they're needed, so that they don't slow down the start of a run that doesn't use them
+
+# how much of a process's stderr is kept (ffmpeg can be very chatty; only the end is useful for errors)
+FF_STDERR_TAIL_LINES = 200
+# the longest line of output RunFFAsync will read (e.g., from ffprobe)
+FF_ASYNC_LINE_MAX = 1048576
+
+
+######## ParseProgressValue ###################################################
+# ffmpeg's -progress values are strings, with "N/A" for unknown
+def ParseProgressValue(key, value):
+    value = value.strip()
+    if value in ('', 'N/A'):
+        return None
+    try:
+        if key == 'speed':
+            return float(value.rstrip('x'))
+        elif key in ('fps', 'bitrate_kbps'):
+            return float(value)
+        elif key in ('frame', 'total_size', 'out_time_us', 'out_time_ms', 'dup_frames', 'drop_frames'):
+            return int(value)
+    except ValueError:
+        return None
+    return value
+
+
+#################################################################################
+# the result of a finished process, with the same attributes delegator's commands had
+class FFResult(object):
+    argv = None
+    return_code = None
+    out = ""
+    err = ""
+    progress = None
+
+    def __init__(self, argv, return_code, out, err, progress):
+        self.argv = argv
+        self.return_code = return_code
+        self.out = out
+        self.err = err
+        self.progress = progress
+
+    ######## cmd ##################################################################
+    # the command as it could be pasted into a shell, for error messages
+    @property
+    def cmd(self):
+        return shlex.join(self.argv)
+
+
+#################################################################################
+# assembles ffmpeg's "-progress" output (blocks of key=value lines, each ending with
+# "progress=continue|end") into report dicts
+class ProgressParser(object):
+    label = None
+    duration = None
+    report = None
+
+    def __init__(self, label=None, duration=None):
+        self.label = label
+        self.duration = duration
+        self.report = dict()
+
+    ######## Feed #################################################################
+    # returns the completed report if line ends one, otherwise None
+    def Feed(self, line):
+        key, sep, value = line.partition('=')
+        if not sep:
+            return None
+        key = key.strip()
+        self.report[key] = ParseProgressValue(key, value)
+        if key != 'progress':
+            return None
+        report = self.report
+        self.report = dict()
+        outTimeUs = report.get('out_time_us', None)
+        report['out_time'] = (outTimeUs / 1000000.0) if outTimeUs is not None else None
+        report['job'] = self.label
+        if self.duration and (report['out_time'] is not None):
+            report['percent'] = min(100.0, max(0.0, 100.0 * report['out_time'] / self.duration))
+        return report
+
+
+######## RunFF ################################################################
+# run an ffmpeg/ffprobe argv (no shell, so file names are passed through verbatim) to completion.
+# - stderr is drained by a thread into a ring buffer of its last stderrTailLines lines
+# - with outputCallback, each line of stdout is passed to outputCallback as it's read
+# - otherwise with progressCallback, ffmpeg is asked to report "-progress" on stdout (so argv must be
+#   ffmpeg's, see FFJob.progress), and each report is passed to progressCallback as a dict ("frame",
+#   "fps", "speed", "out_time" (seconds), etc., plus "job" (label) and, if duration (seconds) is known,
+#   "percent")
+# - otherwise stdout is returned in the result's "out"
+# the process is killed if this is interrupted (e.g., by KeyboardInterrupt or a callback's exception)
+def RunFF(
+    argv,
+    progressCallback=None,
+    outputCallback=None,
+    label=None,
+    duration=None,
+    stderrTailLines=FF_STDERR_TAIL_LINES,
+):
+    argv = [str(x) for x in argv]
+    if outputCallback:
+        progressCallback = None
+    elif progressCallback:
+        argv = argv[:1] + ['-progress', 'pipe:1', '-nostats'] + argv[1:]
+
+    errTail = deque(maxlen=stderrTailLines)
+    outLines = []
+    progress = None
+    parser = ProgressParser(label, duration)
+    proc = subprocess.Popen(
+        argv,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+    )
+    try:
+
+        def _drainStderr():
+            for line in proc.stderr:
+                errTail.append(line.rstrip('\n'))
+
+        errThread = threading.Thread(target=_drainStderr, daemon=True)
+        errThread.start()
+
+        for line in proc.stdout:
+            if outputCallback:
+                outputCallback(line.rstrip('\n'))
+            elif progressCallback:
+                if (report := parser.Feed(line)) is not None:
+                    progress = report
+                    progressCallback(progress)
+            else:
+                outLines.append(line)
+
+        proc.wait()
+        errThread.join()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+    return FFResult(argv, proc.returncode, ''.join(outLines), '\n'.join(errTail), progress)
+
+
+######## RunFFAsync ###########################################################
+# the asyncio counterpart of RunFF. if limiter (an asyncio.Semaphore shared by any number of jobs)
+# is specified, the process isn't started until the limiter is acquired, which bounds how many
+# run at once. if this is cancelled, the process is killed before the cancellation propagates
+async def RunFFAsync(
+    argv,
+    progressCallback=None,
+    outputCallback=None,
+    label=None,
+    duration=None,
+    stderrTailLines=FF_STDERR_TAIL_LINES,
+    limiter=None,
+):
+    import asyncio
+
+    if limiter is not None:
+        async with limiter:
+            return await RunFFAsync(argv, progressCallback, outputCallback, label, duration, stderrTailLines)
+
+    argv = [str(x) for x in argv]
+    if outputCallback:
+        progressCallback = None
+    elif progressCallback:
+        argv = argv[:1] + ['-progress', 'pipe:1', '-nostats'] + argv[1:]
+
+    errTail = deque(maxlen=stderrTailLines)
+    outLines = []
+    progress = None
+    parser = ProgressParser(label, duration)
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=FF_ASYNC_LINE_MAX,
+    )
+    errTask = None
+    try:
+
+        async def _drainStderr():
+            async for line in proc.stderr:
+                errTail.append(line.decode('utf-8', errors='replace').rstrip('\n'))
+
+        errTask = asyncio.ensure_future(_drainStderr())
+
+        async for line in proc.stdout:
+            line = line.decode('utf-8', errors='replace')
+            if outputCallback:
+                outputCallback(line.rstrip('\n'))
+            elif progressCallback:
+                if (report := parser.Feed(line)) is not None:
+                    progress = report
+                    progressCallback(progress)
+            else:
+                outLines.append(line)
+
+        await proc.wait()
+        await errTask
+    finally:
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+        if errTask and (not errTask.done()):
+            errTask.cancel()
+
+    return FFResult(argv, proc.returncode, ''.join(outLines), '\n'.join(errTail), progress)
+
+
+#################################################################################
+# an ffmpeg/ffprobe invocation (see RunFF for the meaning of its attributes). progress is whether it
+# reports its progress (only ffmpeg can, so it's False for ffprobe)
+class FFJob(object):
+    argv = None
+    label = None
+    duration = None
+    outputCallback = None
+    progress = True
+
+    def __init__(self, argv, label=None, duration=None, outputCallback=None, progress=True):
+        self.argv = argv
+        self.label = label
+        self.duration = duration
+        self.outputCallback = outputCallback
+        self.progress = progress
+
+
+#################################################################################
+# yielded by a "steps" generator (e.g., VidCleaner.MultiplexSteps) when it needs jobs run: they're
+# run, at most workers at a time, and the list of their FFResults is sent back. the generator
+# itself never runs a process, so the same steps can be driven by RunFFSteps (blocking) or
+# RunFFStepsAsync (asyncio), and the generator's return value is theirs
+class FFJobs(object):
+    jobs = None
+    workers = 1
+
+    def __init__(self, jobs, workers=1):
+        self.jobs = jobs
+        self.workers = max(1, workers)
+
+
+#################################################################################
+# yielded by a "steps" generator when it has (blocking) Python work to do between jobs, e.g. analyzing
+# their output: func(*args) is called and its return value sent back. RunFFSteps calls it directly, and
+# RunFFStepsAsync on a thread, so the event loop isn't blocked by it
+class FFCall(object):
+    func = None
+    args = None
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+
+######## RunFFSteps ###########################################################
+def RunFFSteps(steps, progressCallback=None):
+    def _run(job):
+        return RunFF(
+            job.argv,
+            progressCallback=progressCallback if job.progress else None,
+            outputCallback=job.outputCallback,
+            label=job.label,
+            duration=job.duration,
+        )
+
+    try:
+        results = None
+        while True:
+            request = steps.send(results)
+            if isinstance(request, FFCall):
+                results = request.func(*request.args)
+            elif (request.workers > 1) and (len(request.jobs) > 1):
+                from concurrent.futures import ThreadPoolExecutor
+
+                # the heavy lifting happens in the ffmpeg processes, so threads are enough to drive them
+                with ThreadPoolExecutor(max_workers=request.workers) as executor:
+                    results = list(executor.map(_run, request.jobs))
+            else:
+                results = [_run(job) for job in request.jobs]
+    except StopIteration as e:
+        return e.value
+    finally:
+        steps.close()
+
+
+######## RunFFStepsAsync ######################################################
+# the asyncio counterpart of RunFFSteps. each process is also subject to limiter (see RunFFAsync)
+async def RunFFStepsAsync(steps, progressCallback=None, limiter=None):
+    import asyncio
+
+    async def _run(job, workers):
+        async with workers:
+            return await RunFFAsync(
+                job.argv,
+                progressCallback=progressCallback if job.progress else None,
+                outputCallback=job.outputCallback,
+                label=job.label,
+                duration=job.duration,
+                limiter=limiter,
+            )
+
+    try:
+        results = None
+        while True:
+            request = steps.send(results)
+            if isinstance(request, FFCall):
+                # (like CreateCleanSubAndMuteListAsync's scrubbing, it can't be interrupted, so it's allowed
+                # to finish before a cancellation propagates)
+                future = asyncio.get_running_loop().run_in_executor(None, request.func, *request.args)
+                try:
+                    results = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    await asyncio.wait([future])
+                    raise
+                continue
+            workers = asyncio.Semaphore(request.workers)
+            tasks = [asyncio.ensure_future(_run(job, workers)) for job in request.jobs]
+            try:
+                results = list(await asyncio.gather(*tasks))
+            except BaseException:
+                # don't leave sibling jobs running (gather doesn't cancel them if one fails)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+    except StopIteration as e:
+        return e.value
+    finally:
+        steps.close()
+
+
+######## PrintProgress ########################################################
+# a progressCallback which writes one line per report to stderr
+def PrintProgress(progress):
+    fields = [f"{progress['job']}:" if progress.get('job', None) else None]
+    if progress.get('percent', None) is not None:
+        fields.append(f"{progress['percent']:.1f}%")
+    if progress.get('out_time', None) is not None:
+        fields.append(f"time={progress['out_time']:.2f}")
+    if progress.get('fps', None) is not None:
+        fields.append(f"fps={progress['fps']:.1f}")
+    if progress.get('speed', None) is not None:
+        fields.append(f"speed={progress['speed']:.2f}x")
+    print(' '.join([x for x in fields if x]), file=sys.stderr, flush=True)
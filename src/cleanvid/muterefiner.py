@@ -0,0 +1,154 @@
+import math
+import re
+from itertools import accumulate
+
+# numpy is an optional dependency (pip install "cleanvid[refine]"), only imported (see ImportNumpy) when
+# mute regions are to be refined
+
+# the audio is analyzed as 16-bit mono PCM at this rate, in frames of this many milliseconds
+REFINE_SAMPLE_RATE = 16000
+REFINE_FRAME_MILLISEC = 10
+# decoded on either side of a subtitle, for its background level and for cutting just past its ends
+REFINE_CONTEXT_MILLISEC = 500
+# how far from a word's estimated boundaries it may actually be, so the mute region extends that far past
+# them (to the quietest point, see RefineCue)
+REFINE_DEFAULT_MARGIN_SEC = 0.25
+# how many subtitles' audio each ffmpeg process decodes
+REFINE_BATCH_CUES = 32
+# a frame is speech if it's louder than both the subtitle's background (its 10th percentile) by
+# REFINE_SPEECH_ABOVE_FLOOR_DB and its loudest (95th percentile) less REFINE_SPEECH_BELOW_PEAK_DB
+REFINE_SPEECH_ABOVE_FLOOR_DB = 6.0
+REFINE_SPEECH_BELOW_PEAK_DB = 30.0
+# pauses shorter than this don't break up speech, and bursts shorter than this aren't speech
+REFINE_SPEECH_GAP_MILLISEC = 150
+REFINE_SPEECH_MIN_MILLISEC = 50
+# a subtitle in which less speech than this is found keeps its whole mute region
+REFINE_SPEECH_MIN_TOTAL_MILLISEC = 200
+
+# markup (e.g., "<i>" or "{\an8}") isn't spoken
+SUBTITLE_TAGS_REGEX = re.compile(r'<[^>]*>|\{[^}]*\}')
+# a word (e.g., "don't") of a subtitle
+SUBTITLE_WORD_REGEX = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+
+######## ImportNumpy ##########################################################
+def ImportNumpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('Refining mute regions requires numpy (e.g., pip install "cleanvid[refine]")') from None
+    return numpy
+
+
+######## WordFractions ########################################################
+# where in text (a subtitle) each match of regex (e.g., a SwearsMatcher's) lies, as (start, end) fractions
+# of its spoken length: the letters and digits before the match's start and end over all of them (markup,
+# spaces and punctuation take next to no time to say)
+def WordFractions(text, regex):
+    plain = SUBTITLE_TAGS_REGEX.sub('', text)
+    spoken = list(accumulate([int(x.isalnum()) for x in plain], initial=0))
+    if spoken[-1] == 0:
+        return []
+    return [
+        (round(spoken[match.start()] / spoken[-1], 4), round(spoken[match.end()] / spoken[-1], 4))
+        for match in regex.finditer(plain)
+    ]
+
+
+######## CueWords #############################################################
+# the words of text (a subtitle), lowercased, each with its (start, end) fractions of text's spoken length
+# (as in WordFractions), for matching them to the words a speech recognizer hears
+def CueWords(text):
+    plain = SUBTITLE_TAGS_REGEX.sub('', text)
+    spoken = list(accumulate([int(x.isalnum()) for x in plain], initial=0))
+    if spoken[-1] == 0:
+        return []
+    return [
+        (
+            match.group().lower(),
+            round(spoken[match.start()] / spoken[-1], 4),
+            round(spoken[match.end()] / spoken[-1], 4),
+        )
+        for match in SUBTITLE_WORD_REGEX.finditer(plain)
+    ]
+
+
+######## FrameEnergies ########################################################
+# the energy (dB relative to full scale) of each REFINE_FRAME_MILLISEC frame of each of pcms (arrays of
+# 16-bit samples), computed for all of them at once
+def FrameEnergies(np, pcms):
+    frameSamples = REFINE_SAMPLE_RATE * REFINE_FRAME_MILLISEC // 1000
+    frameCounts = [len(x) // frameSamples for x in pcms]
+    if sum(frameCounts) == 0:
+        return [np.zeros(0) for x in pcms]
+    frames = np.concatenate([x[: n * frameSamples] for x, n in zip(pcms, frameCounts)]).astype(np.float32)
+    frames = frames.reshape(-1, frameSamples) / 32768.0
+    energies = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    return np.split(energies, np.cumsum(frameCounts)[:-1])
+
+
+######## SpeechRuns ###########################################################
+# the (start, end) frame indexes of mask's runs of True
+def SpeechRuns(np, mask):
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges[0::2], edges[1::2]
+
+
+######## SpeechMask ###########################################################
+# which of the frames (by energy, see FrameEnergies) are speech: loud enough relative to the rest of them,
+# with short pauses within speech filled in and short bursts dropped
+def SpeechMask(np, energies):
+    floor, peak = np.percentile(energies, [10, 95])
+    speech = energies > max(floor + REFINE_SPEECH_ABOVE_FLOOR_DB, peak - REFINE_SPEECH_BELOW_PEAK_DB)
+    starts, ends = SpeechRuns(np, speech)
+    for gapStart, gapEnd in zip(ends[:-1], starts[1:]):
+        if (gapEnd - gapStart) * REFINE_FRAME_MILLISEC < REFINE_SPEECH_GAP_MILLISEC:
+            speech[gapStart:gapEnd] = True
+    starts, ends = SpeechRuns(np, speech)
+    for runStart, runEnd in zip(starts, ends):
+        if (runEnd - runStart) * REFINE_FRAME_MILLISEC < REFINE_SPEECH_MIN_MILLISEC:
+            speech[runStart:runEnd] = False
+    return speech
+
+
+######## RefineCue ############################################################
+# the mute regions (in milliseconds) for the words at fractions (see WordFractions) of a subtitle spoken from
+# cueStart to cueEnd, from the energies of its audio's frames (see FrameEnergies), the first of which starts
+# at frameStart. each word is placed by spreading the subtitle's text over the speech found during it (rather
+# than its whole duration, pauses and all), and its region extends marginMillisec past that: to the last
+# pause before it (or the quietest frame, if it's all speech) and the first pause after. returns None if too
+# little speech was found to go by
+def RefineCue(np, energies, frameStart, cueStart, cueEnd, fractions, marginMillisec):
+    if len(energies) == 0:
+        return None
+    speech = SpeechMask(np, energies)
+    cueFirst = min(len(speech), max(0, (cueStart - frameStart) // REFINE_FRAME_MILLISEC))
+    cueLast = min(len(speech), max(cueFirst, math.ceil((cueEnd - frameStart) / REFINE_FRAME_MILLISEC)))
+    cueSpeech = speech[cueFirst:cueLast]
+    speechFrames = int(np.count_nonzero(cueSpeech))
+    if speechFrames * REFINE_FRAME_MILLISEC < REFINE_SPEECH_MIN_TOTAL_MILLISEC:
+        return None
+    # the fraction of the subtitle's speech that's been spoken by the end of each of its frames
+    spoken = np.cumsum(cueSpeech) / speechFrames
+    marginFrames = max(1, round(marginMillisec / REFINE_FRAME_MILLISEC))
+    result = []
+    for startFraction, endFraction in fractions:
+        wordFirst = cueFirst + int(np.searchsorted(spoken, startFraction, side='right'))
+        wordLast = cueFirst + int(np.searchsorted(spoken, endFraction, side='left')) + 1
+        before = slice(max(0, wordFirst - marginFrames), min(len(speech), wordFirst + 1))
+        after = slice(min(len(speech), max(0, wordLast - 1)), min(len(speech), wordLast + marginFrames))
+        if len(pauses := np.flatnonzero(~speech[before])) > 0:
+            cutFirst = before.start + int(pauses[-1])
+        else:
+            cutFirst = before.start + int(np.argmin(energies[before])) if before.stop > before.start else wordFirst
+        if len(pauses := np.flatnonzero(~speech[after])) > 0:
+            cutLast = after.start + int(pauses[0]) + 1
+        else:
+            cutLast = after.start + int(np.argmin(energies[after])) + 1 if after.stop > after.start else wordLast
+        result.append(
+            (
+                max(0, frameStart + cutFirst * REFINE_FRAME_MILLISEC),
+                frameStart + max(cutLast, cutFirst + 1) * REFINE_FRAME_MILLISEC,
+            )
+        )
+    return result
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# bump if what's stored in (or how keys are computed for) cache entries changes
+RESULT_CACHE_VERSION = 2
+RESULT_CACHE_DEFAULT_MAX_MB = 1024
+RESULT_CACHE_ENTRY_META = 'entry.json'
+
+
+######## FileDigest ###########################################################
+def FileDigest(fileSpec, blockSize=1048576):
+    digest = hashlib.sha256()
+    with open(fileSpec, 'rb') as f:
+        while block := f.read(blockSize):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+######## CacheKey #############################################################
+# a cache key from any JSON-serializable values
+def CacheKey(*parts):
+    return hashlib.sha256(
+        json.dumps([RESULT_CACHE_VERSION] + list(parts), sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+#################################################################################
+# a content-addressed cache of results on disk. each entry is a directory (named for its key)
+# holding a JSON metadata file and any number of files. the total size is capped, with the least
+# recently used entries evicted first.
+class ResultCache(object):
+    cacheDir = ""
+    maxBytes = 0
+
+    ######## init #################################################################
+    def __init__(self, cacheDir, maxMegabytes=RESULT_CACHE_DEFAULT_MAX_MB):
+        self.cacheDir = cacheDir
+        self.maxBytes = int(maxMegabytes * 1024 * 1024)
+        os.makedirs(self.cacheDir, exist_ok=True)
+
+    ######## EntryDir #############################################################
+    def EntryDir(self, key):
+        return os.path.join(self.cacheDir, key)
+
+    ######## Get ##################################################################
+    # returns the metadata stored for key (or None), marking the entry as recently used
+    def Get(self, key):
+        metaFileSpec = os.path.join(self.EntryDir(key), RESULT_CACHE_ENTRY_META)
+        try:
+            with open(metaFileSpec, 'r') as f:
+                meta = json.load(f)
+            os.utime(metaFileSpec)
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    ######## GetFile ##############################################################
+    # returns the path of a file stored with key (or None)
+    def GetFile(self, key, name):
+        fileSpec = os.path.join(self.EntryDir(key), name)
+        return fileSpec if os.path.isfile(fileSpec) else None
+
+    ######## Put ##################################################################
+    # store meta and copies of files ({name: path}) under key, replacing any existing entry
+    def Put(self, key, meta, files=None):
+        tmpDir = tempfile.mkdtemp(prefix=f'.{key}_', dir=self.cacheDir)
+        try:
+            for name, fileSpec in (files or {}).items():
+                shutil.copyfile(fileSpec, os.path.join(tmpDir, name))
+            with open(os.path.join(tmpDir, RESULT_CACHE_ENTRY_META), 'w') as f:
+                json.dump(meta, f)
+            entryDir = self.EntryDir(key)
+            if os.path.isdir(entryDir):
+                shutil.rmtree(entryDir, ignore_errors=True)
+            os.rename(tmpDir, entryDir)
+        except OSError:
+            # e.g., another process stored the same entry first
+            shutil.rmtree(tmpDir, ignore_errors=True)
+        self.Evict()
+
+    ######## Evict ################################################################
+    # remove least recently used entries until the cache is within its size cap
+    def Evict(self):
+        entries = []
+        totalBytes = 0
+        for name in os.listdir(self.cacheDir):
+            entryDir = os.path.join(self.cacheDir, name)
+            metaFileSpec = os.path.join(entryDir, RESULT_CACHE_ENTRY_META)
+            if name.startswith('.') or (not os.path.isfile(metaFileSpec)):
+                continue
+            try:
+                entryBytes = sum([os.path.getsize(os.path.join(entryDir, x)) for x in os.listdir(entryDir)])
+                entries.append((os.path.getmtime(metaFileSpec), entryBytes, entryDir))
+                totalBytes += entryBytes
+            except OSError:
+                pass
+        for lastUsed, entryBytes, entryDir in sorted(entries):
+            if totalBytes <= self.maxBytes:
+                break
+            shutil.rmtree(entryDir, ignore_errors=True)
+            totalBytes -= entryBytes
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import signal
+import stat
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from subliminal import ProviderPool
+
+try:
+    from cleanvid.batch import STATUS_DONE, STATUS_FAILED, ApplyBatchWorkerPlan, CleanBatchItem
+    from cleanvid.cleanvid import AddCleaningArguments, LoadSwearsMap, SubtitleProviders, TitleSubtitleDownloader
+    from cleanvid.swearsmatcher import GetSwearsMatcher
+except ImportError:
+    from batch import STATUS_DONE, STATUS_FAILED, ApplyBatchWorkerPlan, CleanBatchItem
+    from cleanvid import AddCleaningArguments, LoadSwearsMap, SubtitleProviders, TitleSubtitleDownloader
+    from swearsmatcher import GetSwearsMatcher
+
+SERVER_DEFAULT_HOST = '127.0.0.1'
+SERVER_DEFAULT_PORT = 8731
+# how many finished jobs are remembered (for GET /jobs/<id>) before the oldest are forgotten
+SERVER_JOB_HISTORY_MAX = 1000
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+
+
+#################################################################################
+# an argument parser for a job's options, which raises ValueError rather than exiting
+class JobArgumentParser(argparse.ArgumentParser):
+    def error(self, message):
+        raise ValueError(message)
+
+
+#################################################################################
+# a subliminal ProviderPool shared by all of the server's jobs, so that each provider is initialized
+# (and logged in to, and its HTTP session opened) once rather than for every download. providers
+# aren't thread-safe, so downloads are done one at a time
+class SharedProviderPool(ProviderPool):
+    lock = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.RLock()
+
+    def list_subtitles(self, *args, **kwargs):
+        with self.lock:
+            return super().list_subtitles(*args, **kwargs)
+
+    def download_subtitle(self, *args, **kwargs):
+        with self.lock:
+            return super().download_subtitle(*args, **kwargs)
+
+    def download_best_subtitles(self, *args, **kwargs):
+        with self.lock:
+            return super().download_best_subtitles(*args, **kwargs)
+
+
+#################################################################################
+# profanity lists (and the matchers built from them), each read once and kept until its file changes
+class SwearsLists(object):
+    cacheDir = None
+    lists = None
+    lock = None
+
+    ######## init #################################################################
+    def __init__(self, cacheDir=None):
+        self.cacheDir = cacheDir
+        self.lists = dict()
+        self.lock = threading.Lock()
+
+    ######## Get ##################################################################
+    # returns (swears map, matcher) for swearsFileSpec
+    def Get(self, swearsFileSpec):
+        swearsFileSpec = os.path.realpath(swearsFileSpec)
+        fileStat = os.stat(swearsFileSpec)
+        fileKey = (fileStat.st_size, fileStat.st_mtime_ns)
+        with self.lock:
+            entry = self.lists.get(swearsFileSpec, None)
+            if (entry is None) or (entry[0] != fileKey):
+                swearsMap = LoadSwearsMap(swearsFileSpec)
+                entry = (fileKey, swearsMap, GetSwearsMatcher(swearsMap, self.cacheDir))
+                self.lists[swearsFileSpec] = entry
+        return entry[1], entry[2]
+
+    ######## Count ################################################################
+    def Count(self):
+        with self.lock:
+            return len(self.lists)
+
+
+#################################################################################
+# accepts cleaning jobs and runs them, at most workers at a time, keeping the profanity lists,
+# matchers and subtitle providers warm between them. each job's options are the cleaning options
+# the server was started with, overridden by any the job specifies
+class CleanServer(object):
+    args = None
+    workers = 1
+    executor = None
+    jobs = None
+    lock = None
+    swearsLists = None
+    providerPool = None
+    downloader = None
+    started = None
+
+    ######## init #################################################################
+    def __init__(self, args):
+        self.args = args
+        # (planned from a copy, so that the rest of the plan is made for each job from its own options, see
+        # Submit)
+        self.workers = ApplyBatchWorkerPlan(argparse.Namespace(**vars(args)))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.swearsLists = SwearsLists(args.swearsCache)
+        # (the subtitle providers and cache are the server's, whatever a job's options say)
+        self.providerPool = SharedProviderPool(providers=SubtitleProviders(args))
+        self.downloader = TitleSubtitleDownloader(args)
+        self.started = datetime.now().isoformat()
+        # the default profanity list is ready before the first job arrives
+        self.swearsLists.Get(args.swears)
+
+    ######## Close ################################################################
+    def Close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.providerPool.terminate()
+
+    ######## JobArgs ##############################################################
+    def JobArgs(self, options):
+        parser = JobArgumentParser(prog='cleanvid-server job', add_help=False)
+        AddCleaningArguments(parser)
+        parser.set_defaults(**vars(self.args))
+        return parser.parse_args([str(x) for x in options])
+
+    ######## Submit ###############################################################
+    # queue a job described by request (see README), returning a snapshot of its record and its future
+    def Submit(self, request):
+        if (not isinstance(request, dict)) or (not request.get('input', None)):
+            raise ValueError('"input" (the input video file) is required')
+        options = request.get('options', [])
+        if not isinstance(options, list):
+            raise ValueError('"options" must be a list of command-line options')
+        for key in ('extraOutputs', 'extraOutputsDownmix'):
+            if not isinstance(request.get(key, None) or [], list):
+                raise ValueError(f'"{key}" must be a list of output video files')
+        args = self.JobArgs(options)
+        # the job's share of the machine, with the server running workers jobs at once
+        args.jobs = self.workers
+        ApplyBatchWorkerPlan(args)
+
+        inFile = request['input']
+        if not os.path.isfile(inFile):
+            raise ValueError(f'{inFile} not found')
+        inFileParts = os.path.splitext(inFile)
+        outFile = request.get('output', None) or (inFileParts[0] + "_clean" + inFileParts[1])
+        plexFile = request.get('plexAutoSkipJson', None)
+        plexAutoSkipId = request.get('plexAutoSkipId', None)
+        if plexAutoSkipId and not plexFile:
+            plexFile = inFileParts[0] + "_PlexAutoSkip_clean.json"
+        if plexFile and not plexAutoSkipId:
+            raise ValueError('Content ID must be specified if creating a PlexAutoSkip JSON file')
+        item = {
+            'input': inFile,
+            'output': outFile,
+            'subs': request.get('subs', None),
+            'subsOut': request.get('subsOutput', None),
+            'plexFile': plexFile,
+            'plexAutoSkipId': plexAutoSkipId,
+            'extraOutputs': request.get('extraOutputs', None),
+            'extraOutputsDownmix': request.get('extraOutputsDownmix', None),
+            'cleanAudio': request.get('cleanAudio', None),
+        }
+        swearsMap, swearsMatcher = self.swearsLists.Get(args.swears)
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': STATUS_QUEUED,
+            'submitted': datetime.now().isoformat(),
+            'input': inFile,
+            'output': outFile,
+        }
+        with self.lock:
+            self.jobs[job['id']] = job
+            self.ForgetJobs()
+            future = self.executor.submit(self.RunJob, job, item, args, swearsMap, swearsMatcher)
+            return dict(job), future
+
+    ######## RunJob ###############################################################
+    def RunJob(self, job, item, args, swearsMap, swearsMatcher):
+        with self.lock:
+            job['status'] = STATUS_RUNNING
+        result = CleanBatchItem(
+            item, args, swearsMap, swearsMatcher, None if args.offline else self.providerPool, self.downloader
+        )
+        with self.lock:
+            job.update(result)
+            return dict(job)
+
+    ######## ForgetJobs ###########################################################
+    # drop the oldest finished jobs past SERVER_JOB_HISTORY_MAX (called with lock held)
+    def ForgetJobs(self):
+        finished = [k for k, v in self.jobs.items() if v['status'] in (STATUS_DONE, STATUS_FAILED)]
+        for jobId in finished[: max(0, len(finished) - SERVER_JOB_HISTORY_MAX)]:
+            del self.jobs[jobId]
+
+    ######## Job ##################################################################
+    def Job(self, jobId):
+        with self.lock:
+            job = self.jobs.get(jobId, None)
+            return dict(job) if job is not None else None
+
+    ######## Jobs #################################################################
+    def Jobs(self):
+        with self.lock:
+            return [{k: v.get(k, None) for k in ('id', 'status', 'input', 'output')} for v in self.jobs.values()]
+
+    ######## Status ###############################################################
+    def Status(self):
+        with self.lock:
+            statuses = [v['status'] for v in self.jobs.values()]
+        return {
+            'started': self.started,
+            'workers': self.workers,
+            'jobs': {x: statuses.count(x) for x in (STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED)},
+            'swears_lists': self.swearsLists.Count(),
+        }
+
+
+#################################################################################
+# the HTTP API (see README):
+#   POST /jobs        submit a job (returns its record, once it's finished if "wait" is true)
+#   GET  /jobs        list the jobs
+#   GET  /jobs/<id>   a job's record
+#   GET  /status      the server's status
+class CleanRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'cleanvid-server'
+
+    ######## Reply ################################################################
+    def Reply(self, status, body):
+        data = json.dumps(body, indent=4).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    ######## Path #################################################################
+    def Path(self):
+        return self.path.split('?', 1)[0].rstrip('/')
+
+    ######## do_GET ###############################################################
+    def do_GET(self):
+        path = self.Path()
+        cleanServer = self.server.cleanServer
+        if path == '/status':
+            self.Reply(HTTPStatus.OK, cleanServer.Status())
+        elif path == '/jobs':
+            self.Reply(HTTPStatus.OK, cleanServer.Jobs())
+        elif path.startswith('/jobs/') and (job := cleanServer.Job(path[len('/jobs/') :])):
+            self.Reply(HTTPStatus.OK, job)
+        else:
+            self.Reply(HTTPStatus.NOT_FOUND, {'error': f'{path} not found'})
+
+    ######## do_POST ##############################################################
+    def do_POST(self):
+        path = self.Path()
+        if path != '/jobs':
+            self.Reply(HTTPStatus.NOT_FOUND, {'error': f'{path} not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            job, future = self.server.cleanServer.Submit(request)
+        except (ValueError, OSError) as e:
+            self.Reply(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+            return
+        if request.get('wait', False):
+            self.Reply(HTTPStatus.OK, future.result())
+        else:
+            self.Reply(HTTPStatus.ACCEPTED, job)
+
+    ######## address_string #######################################################
+    # a UNIX socket's clients have no address
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'local'
+
+    ######## log_message ##########################################################
+    def log_message(self, format, *args):
+        if self.server.cleanServer.args.verbose:
+            super().log_message(format, *args)
+
+
+#################################################################################
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+#################################################################################
+def ServerArgumentParser():
+    parser = argparse.ArgumentParser(description='run cleanvid as a server, accepting cleaning jobs over HTTP')
+    parser.add_argument(
+        '--socket',
+        help='UNIX socket to listen on (rather than --host and --port)',
+        metavar='<socket file>',
+        dest='socket',
+    )
+    parser.add_argument(
+        '--host',
+        help=f'address to listen on (default is "{SERVER_DEFAULT_HOST}")',
+        metavar='<address>',
+        dest='host',
+        default=SERVER_DEFAULT_HOST,
+    )
+    parser.add_argument(
+        '--port',
+        help=f'port to listen on (default is {SERVER_DEFAULT_PORT})',
+        metavar='<int>',
+        dest='port',
+        type=int,
+        default=SERVER_DEFAULT_PORT,
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        help='number of jobs to process at once (default is based on CPU count and ffmpeg threads per job)',
+        metavar='<int>',
+        dest='jobs',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--verbose', help='log requests and include tracebacks for failed jobs', dest='verbose', action='store_true'
+    )
+    AddCleaningArguments(parser)
+    parser.set_defaults(verbose=False)
+    return parser
+
+
+#################################################################################
+def RunCleanvidServer():
+    args = ServerArgumentParser().parse_args()
+
+    cleanServer = CleanServer(args)
+    if args.socket:
+        # a socket left behind by a previous server
+        if os.path.exists(args.socket) and stat.S_ISSOCK(os.stat(args.socket).st_mode):
+            os.remove(args.socket)
+        httpd = UnixHTTPServer(args.socket, CleanRequestHandler)
+    else:
+        httpd = ThreadingHTTPServer((args.host, args.port), CleanRequestHandler)
+    httpd.cleanServer = cleanServer
+
+    # e.g., "docker stop"
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(
+        f"listening on {args.socket if args.socket else f'{args.host}:{args.port}'} ({cleanServer.workers} workers)",
+        file=sys.stderr,
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        cleanServer.Close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+#################################################################################
+if __name__ == '__main__':
+    RunCleanvidServer()
+
+#################################################################################
@@ -0,0 +1,101 @@
+import re
+
+# a streaming reader and writer of SubRip (.srt) subtitles. a file is read one subtitle at a time (so memory use
+# doesn't grow with its length, e.g. for concatenated multi-episode dumps), into compact SubtitleCue records with
+# integer millisecond times. it's as lenient as pysrt's (which it replaced): a subtitle is a run of non-blank
+# lines, its index line is optional, time fields are split on any of ":,." and their leading digits taken, and
+# subtitles which can't be parsed are skipped
+
+SRT_TIMESTAMP_SEPARATOR = '-->'
+SRT_TIME_SEPARATOR_REGEX = re.compile(r'[:.,]')
+SRT_INTEGER_REGEX = re.compile(r'^(\d+)')
+
+
+######## ParseSrtInt ##########################################################
+def ParseSrtInt(digits):
+    try:
+        return int(digits)
+    except ValueError:
+        if match := SRT_INTEGER_REGEX.match(digits):
+            return int(match.group())
+        return 0
+
+
+######## ParseSrtTime #########################################################
+# "HH:MM:SS,mmm" to milliseconds, or None if it isn't a time
+def ParseSrtTime(value):
+    fields = SRT_TIME_SEPARATOR_REGEX.split(value)
+    if len(fields) != 4:
+        return None
+    hours, minutes, seconds, millisec = [ParseSrtInt(x) for x in fields]
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + millisec
+
+
+######## FormatSrtTime ########################################################
+# milliseconds to "HH:MM:SS,mmm" (negative times as zero)
+def FormatSrtTime(millisec):
+    seconds, millisec = divmod(max(0, millisec), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d},{millisec:03d}'
+
+
+#################################################################################
+# a subtitle: its index (as it was in the file), start and end (milliseconds), position (any display
+# coordinates following its end time) and text
+class SubtitleCue(object):
+    __slots__ = ('index', 'start', 'end', 'position', 'text')
+
+    def __init__(self, index, start, end, text='', position=''):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+        self.position = position
+
+    ######## str ##################################################################
+    # the subtitle as it's written to an .srt file (with a trailing newline, but not the blank line after it)
+    def __str__(self):
+        position = f' {self.position}' if self.position.strip() else ''
+        return f'{self.index}\n{FormatSrtTime(self.start)} --> {FormatSrtTime(self.end)}{position}\n{self.text}\n'
+
+
+######## ParseSubtitleCue #####################################################
+# a SubtitleCue from the (non-blank) lines of one subtitle, or None if they aren't one. index is used if it
+# has no index line
+def ParseSubtitleCue(lines, index=None):
+    if len(lines) < 2:
+        return None
+    lines = [x.rstrip() for x in lines]
+    if SRT_TIMESTAMP_SEPARATOR not in lines[0]:
+        index = lines.pop(0)
+    timestamps = lines[0].split(SRT_TIMESTAMP_SEPARATOR)
+    if len(timestamps) != 2:
+        return None
+    endAndPosition = timestamps[1].lstrip().split(' ', 1)
+    start = ParseSrtTime(timestamps[0].strip())
+    end = ParseSrtTime(endAndPosition[0].strip())
+    if (start is None) or (end is None):
+        return None
+    position = endAndPosition[1].strip() if len(endAndPosition) > 1 else ''
+    return SubtitleCue(index, start, end, '\n'.join(lines[1:]), position)
+
+
+######## StreamSubtitles ######################################################
+# yield a SubtitleCue for each subtitle in lines (any iterable of them, e.g. a text file), as each is read.
+# a subtitle without an index line is given its position (from 1) among them
+def StreamSubtitles(lines):
+    cueLines = []
+    cueCount = 0
+    for line in lines:
+        if line.strip():
+            cueLines.append(line)
+        elif cueLines:
+            cueCount += 1
+            if (cue := ParseSubtitleCue(cueLines, str(cueCount))) is not None:
+                yield cue
+            cueLines = []
+    if cueLines:
+        cueCount += 1
+        if (cue := ParseSubtitleCue(cueLines, str(cueCount))) is not None:
+            yield cue
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# cProfile, pstats and tracemalloc are only imported when profiling (see --profile), as most runs don't
+
+# how many functions (by cumulative time) of the Python stages' profile are included in the report
+STAGE_PROFILE_TOP_FUNCTIONS = 30
+
+
+#################################################################################
+# records the wall and CPU time (and any counters, e.g., bytes read/written or subtitle cues) of each
+# stage of cleaning a title. CPU time is split into this process's (the Python stages, e.g., scrubbing)
+# and its child processes' (ffmpeg/ffprobe, counted as they exit). with several titles or ffmpeg jobs
+# running at once, the CPU times of stages that overlap can't be told apart and include each other's
+#
+# if profile is set, the Python stages (those started with python=True) are run under cProfile, and
+# their memory use traced with tracemalloc
+class StageTimer(object):
+    stages = None
+    profile = False
+    profiler = None
+    started = None
+    lock = None
+
+    ######## init #################################################################
+    def __init__(self, profile=False):
+        self.stages = []
+        self.profile = profile
+        self.profiler = None
+        self.started = datetime.now().isoformat()
+        self.lock = threading.Lock()
+        if profile:
+            import cProfile
+            import tracemalloc
+
+            self.profiler = cProfile.Profile()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    ######## Stage ################################################################
+    # a context manager timing the stage name, yielding its record (a dict) to which counters can be added
+    @contextmanager
+    def Stage(self, name, python=False, **counters):
+        stage = {'stage': name}
+        stage.update(counters)
+        profiling = False
+        if python and self.profiler:
+            import tracemalloc
+
+            tracemalloc.reset_peak()
+            try:
+                self.profiler.enable()
+                profiling = True
+            except ValueError:
+                # another profiler is already active (e.g., a concurrent stage on another thread)
+                profiling = False
+        childTimes = os.times()
+        cpuStart = time.process_time()
+        wallStart = time.perf_counter()
+        try:
+            yield stage
+        except BaseException as e:
+            stage['error'] = type(e).__name__
+            raise
+        finally:
+            stage['wall_seconds'] = round(time.perf_counter() - wallStart, 6)
+            stage['cpu_seconds'] = round(time.process_time() - cpuStart, 6)
+            childTimesEnd = os.times()
+            stage['child_cpu_seconds'] = round(
+                (childTimesEnd.children_user - childTimes.children_user)
+                + (childTimesEnd.children_system - childTimes.children_system),
+                6,
+            )
+            if profiling:
+                self.profiler.disable()
+            if python and self.profiler:
+                import tracemalloc
+
+                if tracemalloc.is_tracing():
+                    stage['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+            with self.lock:
+                self.stages.append(stage)
+
+    ######## Totals ###############################################################
+    # each stage's times summed over however many times it was run
+    def Totals(self):
+        totals = dict()
+        with self.lock:
+            stages = list(self.stages)
+        for stage in stages:
+            total = totals.setdefault(stage['stage'], {'count': 0})
+            total['count'] += 1
+            for key in ('wall_seconds', 'cpu_seconds', 'child_cpu_seconds'):
+                total[key] = round(total.get(key, 0.0) + stage.get(key, 0.0), 6)
+        return totals
+
+    ######## ProfileSummary #######################################################
+    # the functions taking the most cumulative time in the profiled (Python) stages
+    def ProfileSummary(self, top=STAGE_PROFILE_TOP_FUNCTIONS):
+        result = []
+        if self.profiler:
+            import io
+            import pstats
+
+            stats = pstats.Stats(self.profiler, stream=io.StringIO())
+            stats.sort_stats(pstats.SortKey.CUMULATIVE)
+            for func in stats.fcn_list[:top]:
+                primitiveCalls, calls, totalTime, cumulativeTime, callers = stats.stats[func]
+                result.append(
+                    {
+                        'function': f"{func[0]}:{func[1]}({func[2]})",
+                        'calls': calls,
+                        'total_seconds': round(totalTime, 6),
+                        'cumulative_seconds': round(cumulativeTime, 6),
+                    }
+                )
+        return result
+
+    ######## Report ###############################################################
+    def Report(self, **extra):
+        with self.lock:
+            stages = list(self.stages)
+        report = {
+            'started': self.started,
+            'finished': datetime.now().isoformat(),
+        }
+        report.update(extra)
+        report['stages'] = stages
+        report['totals'] = self.Totals()
+        if self.profiler:
+            report['profile'] = self.ProfileSummary()
+        return report
+
+    ######## WriteReport ##########################################################
+    def WriteReport(self, fileSpec, **extra):
+        with open(fileSpec, 'w') as f:
+            json.dump(self.Report(**extra), f, indent=4)
+
+    ######## WriteProfile #########################################################
+    # the raw profile of the Python stages, for pstats, snakeviz, etc.
+    def WriteProfile(self, fileSpec):
+        if self.profiler:
+            self.profiler.dump_stats(fileSpec)
+
+
+######## TimedStage ###########################################################
+# StageTimer.Stage, or (if stageTimer is None) just a record nobody will read
+@contextmanager
+def TimedStage(stageTimer, name, python=False, **counters):
+    if stageTimer is None:
+        yield dict(counters)
+    else:
+        with stageTimer.Stage(name, python, **counters) as stage:
+            yield stage
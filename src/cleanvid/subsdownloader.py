@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# subliminal and babelfish are slow to import, so they're only imported once something is to be downloaded
+
+SUBTITLE_CACHE_DBM_FILE = 'subliminal.dbm'
+SUBTITLE_CACHE_NOT_FOUND_FILE = 'not_found.json'
+# how long the providers' cached lookups (e.g., a show's ID) are kept
+SUBTITLE_CACHE_EXPIRATION_SECONDS = 30 * 24 * 60 * 60
+SUBTITLE_NOT_FOUND_DEFAULT_HOURS = 24
+
+# subliminal's cache region is global to the process, and can only be configured once
+_subtitleCacheLock = threading.Lock()
+
+
+######## ConfigureSubtitleCache ###############################################
+# configure subliminal's (dogpile.cache) region, which its providers and refiners use to remember
+# lookups (e.g., a show's ID) between queries: persisted to a DBM file under cacheDir if specified,
+# otherwise in memory for the life of the process. the first configuration in a process wins
+def ConfigureSubtitleCache(cacheDir=None):
+    from subliminal import region
+
+    with _subtitleCacheLock:
+        if not region.is_configured:
+            if cacheDir:
+                os.makedirs(cacheDir, exist_ok=True)
+                region.configure(
+                    'dogpile.cache.dbm',
+                    expiration_time=SUBTITLE_CACHE_EXPIRATION_SECONDS,
+                    arguments={'filename': os.path.join(cacheDir, SUBTITLE_CACHE_DBM_FILE)},
+                )
+            else:
+                region.configure('dogpile.cache.memory')
+    return region
+
+
+######## DownloadedSubtitleFileSpec ###########################################
+# where subliminal saves srtLanguage's (e.g., "eng") subtitles for vidFileSpec: alongside it, named
+# for the language's two-letter code (e.g., "movie.en.srt")
+def DownloadedSubtitleFileSpec(vidFileSpec, srtLanguage):
+    from babelfish import Language
+
+    return os.path.splitext(vidFileSpec)[0] + "." + str(Language(srtLanguage)) + ".srt"
+
+
+#################################################################################
+# downloads subtitles with subliminal, for one title or many at once. the titles of a download are all
+# queried through one provider pool (so each provider is initialized, and its session established,
+# once rather than once per title), which queries its providers concurrently
+#
+# if cacheDir is specified, subliminal's cache (see ConfigureSubtitleCache) is kept there, as are
+# the titles for which no subtitles were found, which aren't queried again until notFoundHours
+# have passed (0 to always query them). providers are the names of the subliminal providers to
+# query (default is all of them), which may include any registered with subliminal.provider_manager
+class SubtitleDownloader(object):
+    cacheDir = None
+    notFoundSeconds = 0
+    providers = None
+    lock = None
+
+    ######## init #################################################################
+    def __init__(self, cacheDir=None, notFoundHours=SUBTITLE_NOT_FOUND_DEFAULT_HOURS, providers=None):
+        self.cacheDir = cacheDir
+        self.notFoundSeconds = max(0.0, float(notFoundHours or 0)) * 60 * 60
+        self.providers = list(providers) if providers else None
+        self.lock = threading.Lock()
+
+    ######## NotFoundKey ##########################################################
+    # subliminal matches subtitles to a title by its name, so a title is remembered by its name and size
+    # (and the providers that were asked)
+    def NotFoundKey(self, vidFileSpec, srtLanguage):
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    os.path.realpath(vidFileSpec),
+                    os.path.getsize(vidFileSpec),
+                    srtLanguage,
+                    sorted(self.providers) if self.providers else None,
+                ]
+            ).encode('utf-8')
+        ).hexdigest()
+
+    ######## LoadNotFound #########################################################
+    # {key: when the title was last queried} for the titles no subtitles were found for (which haven't expired)
+    def LoadNotFound(self):
+        result = {}
+        if self.cacheDir and (self.notFoundSeconds > 0):
+            try:
+                with open(os.path.join(self.cacheDir, SUBTITLE_CACHE_NOT_FOUND_FILE), 'r') as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = {}
+            now = time.time()
+            result = {
+                k: v for k, v in result.items() if isinstance(v, (int, float)) and ((now - v) < self.notFoundSeconds)
+            }
+        return result
+
+    ######## SaveNotFound #########################################################
+    # merged with what's on disk (other processes may have added to it) just before it's replaced
+    def SaveNotFound(self, notFound):
+        if self.cacheDir and (self.notFoundSeconds > 0) and notFound:
+            with self.lock:
+                merged = self.LoadNotFound()
+                merged.update(notFound)
+                notFoundFileSpec = os.path.join(self.cacheDir, SUBTITLE_CACHE_NOT_FOUND_FILE)
+                try:
+                    os.makedirs(self.cacheDir, exist_ok=True)
+                    tmpFileSpec = f"{notFoundFileSpec}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmpFileSpec, 'w') as f:
+                        json.dump(merged, f)
+                    os.replace(tmpFileSpec, notFoundFileSpec)
+                except OSError:
+                    pass
+
+    ######## Download #############################################################
+    def Download(self, vidFileSpec, srtLanguage, providerPool=None):
+        return self.DownloadMany([vidFileSpec], srtLanguage, providerPool).get(vidFileSpec, "")
+
+    ######## DownloadMany #########################################################
+    # download the best matching subtitles in srtLanguage (e.g., "eng") for each of vidFileSpecs, saving
+    # each alongside its title (see DownloadedSubtitleFileSpec), and return {vidFileSpec: subtitle file
+    # (or "" if none was found)}. titles which already have a downloaded subtitle file aren't queried
+    #
+    # providerPool (a subliminal ProviderPool) may be specified to use (and keep) its providers,
+    # otherwise one is created for (and terminated after) this download
+    def DownloadMany(self, vidFileSpecs, srtLanguage, providerPool=None):
+        from babelfish import Language
+        from subliminal import AsyncProviderPool, Video, save_subtitles
+
+        ConfigureSubtitleCache(self.cacheDir)
+        languages = {Language(srtLanguage)}
+        result = dict()
+        todo = []
+        notFound = self.LoadNotFound()
+        for vidFileSpec in vidFileSpecs:
+            result[vidFileSpec] = ""
+            if os.path.isfile(vidFileSpec):
+                subFileSpec = DownloadedSubtitleFileSpec(vidFileSpec, srtLanguage)
+                if os.path.isfile(subFileSpec):
+                    result[vidFileSpec] = subFileSpec
+                elif (notFoundKey := self.NotFoundKey(vidFileSpec, srtLanguage)) not in notFound:
+                    todo.append((vidFileSpec, subFileSpec, notFoundKey))
+
+        if todo:
+            newNotFound = dict()
+            pool = providerPool if providerPool is not None else AsyncProviderPool(providers=self.providers)
+            try:
+                for vidFileSpec, subFileSpec, notFoundKey in todo:
+                    video = Video.fromname(vidFileSpec)
+                    failedProviders = set(pool.failed_providers)
+                    bestSubtitles = pool.download_best_subtitles(
+                        pool.list_subtitles(video, languages - video.subtitle_languages), video, languages
+                    )
+                    if bestSubtitles:
+                        save_subtitles(video, [bestSubtitles[0]])
+                    if os.path.isfile(subFileSpec):
+                        result[vidFileSpec] = subFileSpec
+                    elif (not pool.discarded_providers) and (not (pool.failed_providers - failedProviders)):
+                        # only remembered if every provider answered (and none had any)
+                        newNotFound[notFoundKey] = time.time()
+            finally:
+                if providerPool is None:
+                    pool.terminate()
+            self.SaveNotFound(newNotFound)
+
+        return result
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import re
+
+# bump if the generated pattern or the serialized layout changes, so stale serialized matchers are rebuilt
+SWEARS_MATCHER_VERSION = 1
+
+
+######## SwearsDigest #########################################################
+# a digest of a swears map's (case-insensitive) words and their replacements
+def SwearsDigest(swearsMap):
+    digest = hashlib.sha256()
+    for key, value in sorted([(str(k).lower(), str(v)) for k, v in swearsMap.items()]):
+        digest.update(key.encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(value.encode('utf-8'))
+        digest.update(b'\x01')
+    return digest.hexdigest()
+
+
+######## TriePattern ##########################################################
+# build a regular expression alternation from a prefix trie of the words. shared prefixes
+# are only compared once and, at any position, longer words are tried before shorter ones.
+# words are matched literally (regular expression characters are escaped)
+def TriePattern(words):
+    trie = dict()
+    for word in words:
+        if word:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, dict())
+            node[''] = True
+
+    def _pattern(node):
+        terminal = '' in node
+        branches = [re.escape(char) + _pattern(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        singleChars = all([len(branch) == 1 for branch in branches])
+        if len(branches) == 1:
+            result = branches[0]
+            if terminal:
+                result = (f'(?:{result})' if len(result) > 1 else result) + '?'
+        elif singleChars:
+            result = '[' + ''.join(branches) + ']' + ('?' if terminal else '')
+        else:
+            result = '(?:' + '|'.join(branches) + ')' + ('?' if terminal else '')
+        return result
+
+    return _pattern(trie) if trie else ''
+
+
+#################################################################################
+class SwearsMatcher(object):
+    digest = ""
+    pattern = ""
+    replacements = None
+    regex = None
+
+    ######## init #################################################################
+    def __init__(self, swearsMap):
+        self.digest = SwearsDigest(swearsMap)
+        # case-folded word -> replacement, so a match needs one lookup and no CaselessDictionary
+        self.replacements = {str(k).lower(): v for k, v in swearsMap.items()}
+        triePattern = TriePattern(self.replacements.keys())
+        # (?!) never matches, for an empty list
+        self.pattern = r'\b(' + triePattern + r')\b' if triePattern else r'(?!)'
+        self.regex = re.compile(self.pattern, re.IGNORECASE)
+
+    ######## pickling ############################################################
+    # only the pattern is kept, it's recompiled when unpickled/loaded
+    def __getstate__(self):
+        return {
+            'version': SWEARS_MATCHER_VERSION,
+            'digest': self.digest,
+            'pattern': self.pattern,
+            'replacements': self.replacements,
+        }
+
+    def __setstate__(self, state):
+        if state.get('version', None) != SWEARS_MATCHER_VERSION:
+            raise ValueError(f'Incompatible swears matcher version {state.get("version", None)}')
+        self.digest = state['digest']
+        self.pattern = state['pattern']
+        self.replacements = state['replacements']
+        self.regex = re.compile(self.pattern, re.IGNORECASE)
+
+    ######## Replace ##############################################################
+    def Replace(self, match):
+        return self.replacements[match.group().lower()]
+
+    ######## Scrub ################################################################
+    # returns the scrubbed text and the number of words replaced
+    def Scrub(self, text):
+        return self.regex.subn(self.Replace, text)
+
+    ######## Sub ##################################################################
+    def Sub(self, text):
+        return self.regex.sub(self.Replace, text)
+
+    ######## Save #################################################################
+    def Save(self, fileSpec):
+        tmpFileSpec = f"{fileSpec}.{os.getpid()}.tmp"
+        with open(tmpFileSpec, 'w') as f:
+            json.dump(self.__getstate__(), f)
+        os.replace(tmpFileSpec, fileSpec)
+
+    ######## Load #################################################################
+    @staticmethod
+    def Load(fileSpec):
+        with open(fileSpec, 'r') as f:
+            state = json.load(f)
+        matcher = SwearsMatcher.__new__(SwearsMatcher)
+        matcher.__setstate__(state)
+        return matcher
+
+
+# matchers already built by this process, keyed on SwearsDigest
+_swearsMatcherCache = dict()
+
+
+######## GetSwearsMatcher #####################################################
+# get the matcher for swearsMap, reusing one already built by this process or serialized
+# (if cacheDir is specified) by a previous run with the same word list
+def GetSwearsMatcher(swearsMap, cacheDir=None):
+    digest = SwearsDigest(swearsMap)
+    if digest in _swearsMatcherCache:
+        return _swearsMatcherCache[digest]
+
+    matcher = None
+    cacheFileSpec = os.path.join(cacheDir, f'swears_{digest}.json') if cacheDir else None
+    if cacheFileSpec and os.path.isfile(cacheFileSpec):
+        try:
+            matcher = SwearsMatcher.Load(cacheFileSpec)
+            if matcher.digest != digest:
+                matcher = None
+        except (OSError, ValueError, KeyError):
+            matcher = None
+
+    if matcher is None:
+        matcher = SwearsMatcher(swearsMap)
+        if cacheFileSpec:
+            try:
+                os.makedirs(cacheDir, exist_ok=True)
+                matcher.Save(cacheFileSpec)
+            except OSError:
+                pass
+
+    _swearsMatcherCache[digest] = matcher
+    return matcher
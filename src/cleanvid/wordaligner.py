@@ -0,0 +1,247 @@
+import difflib
+import errno
+import json
+import os
+import threading
+
+try:
+    from cleanvid.muterefiner import (
+        REFINE_CONTEXT_MILLISEC,
+        REFINE_SAMPLE_RATE,
+        CueWords,
+        FrameEnergies,
+        ImportNumpy,
+        RefineCue,
+    )
+except ImportError:
+    from muterefiner import (
+        REFINE_CONTEXT_MILLISEC,
+        REFINE_SAMPLE_RATE,
+        CueWords,
+        FrameEnergies,
+        ImportNumpy,
+        RefineCue,
+    )
+
+# vosk (pip install "cleanvid[vosk]") and concurrent.futures are only imported when the vosk aligner is used
+
+WORD_ALIGNER_ENERGY = 'energy'
+WORD_ALIGNER_VOSK = 'vosk'
+WORD_ALIGNER_DEFAULT = WORD_ALIGNER_ENERGY
+# bump if an aligner's results for the same audio change, so cached alignments (see VidCleaner.RefineMuteSteps)
+# aren't reused
+WORD_ALIGNER_VERSION = 1
+# a recognized word's mute region extends this far past its start and end (recognizers' word boundaries tend to
+# clip the very start and end of a word)
+WORD_ALIGNED_MARGIN_MILLISEC = 50
+# how much audio (bytes of 16-bit PCM) the recognizer is fed at a time
+VOSK_CHUNK_BYTES = 8000
+
+# (aligner name, model, workers) -> aligner, shared by every title cleaned in the process (see GetWordAligner)
+_wordAligners = dict()
+_wordAlignersLock = threading.Lock()
+
+
+######## CueAudio #############################################################
+# the 16-bit PCM audio (as decoded by VidCleaner.RefineMuteSteps: REFINE_CONTEXT_MILLISEC either side of the
+# subtitle, at REFINE_SAMPLE_RATE) in pcmFileSpec, and the time (milliseconds) at which it starts
+def CueAudio(np, pcmFileSpec, start):
+    return np.fromfile(pcmFileSpec, dtype='<i2'), max(0, start - REFINE_CONTEXT_MILLISEC)
+
+
+#################################################################################
+# places the profanity in each subtitle by the speech found in its audio and where the profanity falls in its
+# text (see muterefiner.RefineCue). this is the default aligner, and the one any other falls back to for words
+# it can't place itself
+#
+# an aligner's Align takes the subtitles to be refined ([start, end, fractions, text] each, see
+# VidCleaner.CreateCleanSub) and the files their audio was decoded to (None if it couldn't be), and returns the
+# mute regions (milliseconds) of each one's profanity (one for each of its fractions), or None for a subtitle
+# that should be muted whole. it adds what it did to counters. aligners are registered by name in
+# WORD_ALIGNERS, and their digest (which, with the subtitles, identifies their results) must change if their
+# results would
+class EnergyAligner(object):
+    name = WORD_ALIGNER_ENERGY
+    model = None
+    workers = 1
+
+    ######## init #################################################################
+    # workers is how many processes the aligner may use (this one only uses the calling thread)
+    def __init__(self, model=None, workers=None):
+        # (before anything is done, if it's missing)
+        ImportNumpy()
+        self.model = model
+        self.workers = workers if workers else (os.cpu_count() or 1)
+
+    ######## digest ###############################################################
+    @property
+    def digest(self):
+        return [self.name, WORD_ALIGNER_VERSION]
+
+    ######## Align ################################################################
+    def Align(self, cues, pcmFileSpecs, marginMillisec, counters=None):
+        np = ImportNumpy()
+        decoded = [i for i, x in enumerate(pcmFileSpecs) if x]
+        audio = [CueAudio(np, pcmFileSpecs[i], cues[i][0]) for i in decoded]
+        result = [None] * len(cues)
+        for i, energies, (pcm, frameStart) in zip(decoded, FrameEnergies(np, [x[0] for x in audio]), audio):
+            start, end, fractions, text = cues[i]
+            if fractions:
+                result[i] = RefineCue(np, energies, frameStart, start, end, fractions, marginMillisec)
+        return result
+
+
+######## ImportVosk ###########################################################
+def ImportVosk():
+    try:
+        import vosk
+    except ImportError:
+        raise ImportError('Aligning words with vosk requires vosk (e.g., pip install "cleanvid[vosk]")') from None
+    return vosk
+
+
+# the model loaded by each VoskAligner worker process (see VoskWorkerInit)
+_voskModel = None
+
+
+######## VoskWorkerInit #######################################################
+def VoskWorkerInit(model):
+    global _voskModel
+    vosk = ImportVosk()
+    vosk.SetLogLevel(-1)
+    _voskModel = vosk.Model(model)
+
+
+######## VoskWords ############################################################
+# the words (and their start and end, in seconds) a vosk recognizer hears in 16-bit PCM audio, listening only
+# for those of vocabulary (if its model supports runtime grammars, otherwise for any)
+def VoskWords(pcm, vocabulary):
+    vosk = ImportVosk()
+    recognizer = vosk.KaldiRecognizer(_voskModel, REFINE_SAMPLE_RATE, json.dumps(sorted(vocabulary) + ['[unk]']))
+    recognizer.SetWords(True)
+    results = []
+    for offset in range(0, len(pcm), VOSK_CHUNK_BYTES):
+        if recognizer.AcceptWaveform(pcm[offset : offset + VOSK_CHUNK_BYTES]):
+            results.append(recognizer.Result())
+    results.append(recognizer.FinalResult())
+    return [
+        (x['word'], float(x['start']), float(x['end']))
+        for x in [y for result in results for y in json.loads(result).get('result', [])]
+        if x.get('word', '[unk]') != '[unk]'
+    ]
+
+
+######## VoskAlignCue #########################################################
+# align a subtitle's profanity (in a VoskAligner worker process): the words heard in its audio are matched up,
+# in order, with those of its text (see muterefiner.CueWords), and the mute region of each of its fractions is
+# that of the words of the text it spans, if they were all heard, otherwise as EnergyAligner would place it.
+# returns (mute regions or None, how many of the fractions were placed by the words heard)
+def VoskAlignCue(cue, pcmFileSpec, marginMillisec):
+    np = ImportNumpy()
+    start, end, fractions, text = cue
+    if not fractions:
+        return None, 0
+    pcm, frameStart = CueAudio(np, pcmFileSpec, start)
+    cueWords = CueWords(text or '')
+    heard = VoskWords(pcm.tobytes(), set([x[0] for x in cueWords])) if cueWords else []
+
+    # the time (milliseconds) each of the text's words was heard, for those that were
+    timings = dict()
+    matcher = difflib.SequenceMatcher(None, [x[0] for x in cueWords], [x[0] for x in heard], autojunk=False)
+    for block in matcher.get_matching_blocks():
+        for i in range(block.size):
+            word, wordStart, wordEnd = heard[block.b + i]
+            timings[block.a + i] = (frameStart + round(wordStart * 1000.0), frameStart + round(wordEnd * 1000.0))
+
+    fallback = None
+    result = []
+    aligned = 0
+    for startFraction, endFraction in fractions:
+        spanned = [i for i, x in enumerate(cueWords) if (x[1] < endFraction) and (x[2] > startFraction)]
+        if spanned and all([i in timings for i in spanned]):
+            result.append(
+                (
+                    max(0, min([timings[i][0] for i in spanned]) - WORD_ALIGNED_MARGIN_MILLISEC),
+                    max([timings[i][1] for i in spanned]) + WORD_ALIGNED_MARGIN_MILLISEC,
+                )
+            )
+            aligned += 1
+        else:
+            if fallback is None:
+                energies = FrameEnergies(np, [pcm])[0]
+                fallback = RefineCue(np, energies, frameStart, start, end, fractions, marginMillisec) or []
+            if not fallback:
+                return None, 0
+            result.append(fallback[len(result)])
+    return result, aligned
+
+
+#################################################################################
+# places the profanity in each subtitle by the words an offline (CPU-only) vosk speech recognizer hears in its
+# audio, listening only for the subtitle's own words. model is the directory of a vosk model (e.g., from
+# https://alphacephei.com/vosk/models), which each of a pool of worker processes (workers of them, kept
+# for the life of the aligner) loads once. words it doesn't hear are placed as EnergyAligner would
+class VoskAligner(EnergyAligner):
+    name = WORD_ALIGNER_VOSK
+    pool = None
+    poolLock = None
+
+    ######## init #################################################################
+    def __init__(self, model=None, workers=None):
+        super().__init__(model, workers)
+        ImportVosk()
+        if (not model) or (not os.path.isdir(model)):
+            raise IOError(errno.ENOENT, "vosk model directory unspecified or not found", model)
+        self.model = os.path.realpath(model)
+        self.poolLock = threading.Lock()
+
+    ######## digest ###############################################################
+    @property
+    def digest(self):
+        return [self.name, WORD_ALIGNER_VERSION, self.model, os.path.getmtime(self.model)]
+
+    ######## Pool #################################################################
+    # the worker processes, started (spawned, as the process may have other threads) when first needed
+    def Pool(self):
+        with self.poolLock:
+            if self.pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=VoskWorkerInit,
+                    initargs=(self.model,),
+                )
+            return self.pool
+
+    ######## Align ################################################################
+    def Align(self, cues, pcmFileSpecs, marginMillisec, counters=None):
+        counters = counters if counters is not None else dict()
+        decoded = [i for i, x in enumerate(pcmFileSpecs) if x]
+        futures = [self.Pool().submit(VoskAlignCue, cues[i], pcmFileSpecs[i], marginMillisec) for i in decoded]
+        result = [None] * len(cues)
+        for i, future in zip(decoded, futures):
+            result[i], aligned = future.result()
+            counters['aligned_words'] = counters.get('aligned_words', 0) + aligned
+        return result
+
+
+# the aligners, by name (see EnergyAligner)
+WORD_ALIGNERS = {
+    WORD_ALIGNER_ENERGY: EnergyAligner,
+    WORD_ALIGNER_VOSK: VoskAligner,
+}
+
+
+######## GetWordAligner #######################################################
+# the aligner named name (see WORD_ALIGNERS) with model and workers. it's created once per process, so that (e.g., in
+# cleanvid-batch or cleanvid-server) its worker processes and their loaded models are reused by every title
+def GetWordAligner(name=WORD_ALIGNER_DEFAULT, model=None, workers=None):
+    if name not in WORD_ALIGNERS:
+        raise ValueError(f'Unknown word aligner {name} (expected one of {", ".join(WORD_ALIGNERS.keys())})')
+    with _wordAlignersLock:
+        if (name, model, workers) not in _wordAligners:
+            _wordAligners[(name, model, workers)] = WORD_ALIGNERS[name](model, workers)
+        return _wordAligners[(name, model, workers)]
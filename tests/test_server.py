@@ -0,0 +1,49 @@
+import os
+
+import cleanvid.server
+from cleanvid.batch import STATUS_DONE, CleanBatchItem
+from cleanvid.server import CleanServer, ServerArgumentParser
+
+SUBTITLES = '1\n00:00:01,000 --> 00:00:02,500\nwhat the hell\n\n2\n00:00:03,000 --> 00:00:04,000\nhello\n\n'
+
+
+######## test_server_job ######################################################
+# a CleanServer, built from the server's own options, runs a subtitle-only job with the server's CPU plan
+def test_server_job(tmp_path, monkeypatch):
+    jobArgs = []
+
+    def _cleanBatchItem(item, args, *rest):
+        jobArgs.append(args)
+        return CleanBatchItem(item, args, *rest)
+
+    monkeypatch.setattr(cleanvid.server, 'CleanBatchItem', _cleanBatchItem)
+    inFile = tmp_path / 'title.mkv'
+    inFile.write_bytes(b'')
+    subsFile = tmp_path / 'title.srt'
+    subsFile.write_text(SUBTITLES)
+
+    args = ServerArgumentParser().parse_args(['--offline', '-j', '2', '--subs-cache', str(tmp_path / 'subs')])
+    cleanServer = CleanServer(args)
+    try:
+        assert cleanServer.workers == 2
+        job, future = cleanServer.Submit(
+            {'input': str(inFile), 'subs': str(subsFile), 'options': ['--subs-only', '--chunk-workers', '3']}
+        )
+        result = future.result(timeout=60)
+    finally:
+        cleanServer.Close()
+
+    assert result['id'] == job['id']
+    assert result['status'] == STATUS_DONE, result.get('error', None)
+    cleanSubsFile = tmp_path / 'title_clean.srt'
+    assert os.path.isfile(cleanSubsFile)
+    assert 'hell' not in cleanSubsFile.read_text()
+    # each job is planned for its own options, as one of the server's workers
+    assert len(jobArgs) == 1
+    assert jobArgs[0].jobs == 2
+    assert jobArgs[0].chunkWorkers == 3
+    assert jobArgs[0].threads == 1
+    assert jobArgs[0].refineWorkers >= 1
+    # the server's own options aren't planned, only each job's
+    assert args.threads is None
+    assert args.refineWorkers is None